@@ -0,0 +1,124 @@
+# Copyright (C) 2026  The Software Heritage developers
+# See the AUTHORS file at the top-level directory of this distribution
+# License: GNU General Public License version 3, or any later version
+# See top-level LICENSE file for more information
+
+from contextlib import contextmanager
+import os
+import time
+from typing import Iterator, Optional, Union
+
+from swh.core.statsd import statsd
+
+BATCH_SIZE_METRIC = "swh_indexer_batch_size"
+
+
+def current_memory() -> Optional[int]:
+    """Returns the resident memory of this process in bytes, or None where it
+    is unknown (ie. outside Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class AdaptiveBatchSize:
+    """Batch size tuned from the duration of the previous batches, and the
+    memory used by the process after them, with additive increase and
+    multiplicative decrease (like TCP congestion control):
+
+    * when a batch took more than ``target_duration`` seconds, or the process
+      used more than ``max_memory`` bytes after it, the size is multiplied by
+      ``decrease_factor``;
+    * otherwise, when the batch was full, the size is increased by
+      ``increment`` (by default, a tenth of the initial size);
+
+    always staying between ``min_size`` and ``max_size``. The chosen size is
+    sent as a statsd gauge, tagged with ``name``.
+
+    Sample configuration (in the ``adaptive_batch_size`` section of the indexer
+    configuration, with a subsection for each tuned batch size):
+
+    .. code-block:: yaml
+
+        adaptive_batch_size:
+          journal_client:
+            min_size: 10
+            max_size: 2000
+            target_duration: 30
+            max_memory: 2000000000
+
+    >>> batch_size = AdaptiveBatchSize("example", initial=100, max_size=120)
+    >>> batch_size.update(nb_objects=100, duration=1.0)
+    110
+    >>> batch_size.update(nb_objects=50, duration=1.0)  # not full
+    110
+    >>> batch_size.update(nb_objects=110, duration=1.0)
+    120
+    >>> batch_size.update(nb_objects=120, duration=60.0)
+    60
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int,
+        min_size: int = 1,
+        max_size: int = 10000,
+        target_duration: float = 10.0,
+        max_memory: Optional[int] = None,
+        increment: Optional[int] = None,
+        decrease_factor: float = 0.5,
+    ) -> None:
+        if not 0 < min_size <= max_size:
+            raise ValueError(
+                f"Invalid bounds of batch size {name}: {min_size} to {max_size}"
+            )
+        if not 0 < decrease_factor < 1:
+            raise ValueError(f"Invalid decrease factor: {decrease_factor}")
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_duration = target_duration
+        self.max_memory = max_memory
+        self.increment = increment or max(1, initial // 10)
+        self.decrease_factor = decrease_factor
+        self.size = min(max(initial, min_size), max_size)
+
+    def update(
+        self, nb_objects: int, duration: float, memory: Optional[int] = None
+    ) -> int:
+        """Updates the size from the number of objects of the last batch, how
+        long it took, and the memory used after it; and returns the new size."""
+        if duration > self.target_duration or (
+            self.max_memory is not None
+            and memory is not None
+            and memory > self.max_memory
+        ):
+            self.size = max(self.min_size, int(self.size * self.decrease_factor))
+        elif nb_objects >= self.size:
+            # only grow when the size is what limits batches
+            self.size = min(self.max_size, self.size + self.increment)
+        statsd.gauge(BATCH_SIZE_METRIC, self.size, tags={"name": self.name})
+        return self.size
+
+    @contextmanager
+    def measure(self, nb_objects: int) -> Iterator[None]:
+        """Calls :meth:`update` with the duration of the block, when it
+        completes."""
+        start = time.monotonic()
+        yield
+        self.update(nb_objects, time.monotonic() - start, current_memory())
+
+
+BatchSize = Union[int, AdaptiveBatchSize]
+"""Either a fixed batch size, or an adaptive one"""
+
+
+def get_batch_size(batch_size: BatchSize) -> int:
+    """Returns the current value of a batch size"""
+    if isinstance(batch_size, AdaptiveBatchSize):
+        return batch_size.size
+    return batch_size
@@ -5,7 +5,7 @@
 
 import logging
 import os
-from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, cast
 import warnings
 
 # WARNING: do not import unnecessary things here to keep cli startup time under
@@ -131,13 +131,20 @@ def mapping_translate(mapping_name, file):
     click.echo(json.dumps(codemeta_doc, indent=4))
 
 
-def list_origins_by_producer(idx_storage, mappings, tool_ids) -> Iterator[str]:
+def list_origins_by_producer(
+    idx_storage, mappings, tool_ids, page_size: int = 10000
+) -> Iterator[str]:
+    """Yields the URL of all origins with intrinsic metadata produced by one
+    of the given mappings and tools, in sorted order and without duplicates.
+
+    Pages are read by walking the primary key of the table from the last
+    URL of the previous page, so the cost of each page does not depend
+    on how many origins were already listed."""
     next_page_token = ""
-    limit = 10000
     while next_page_token is not None:
         result = idx_storage.origin_intrinsic_metadata_search_by_producer(
             page_token=next_page_token,
-            limit=limit,
+            limit=page_size,
             ids_only=True,
             mappings=mappings or None,
             tool_ids=tool_ids or None,
@@ -146,6 +153,289 @@ def list_origins_by_producer(idx_storage, mappings, tool_ids) -> Iterator[str]:
         yield from result.results
 
 
+EXPORTABLE_OBJECT_TYPES = [
+    "content_mimetype",
+    "content_metadata",
+    "directory_intrinsic_metadata",
+    "origin_intrinsic_metadata",
+    "origin_extrinsic_metadata",
+]
+
+
+def iter_export_pages(
+    idx_storage,
+    object_type: str,
+    tool_ids: Tuple[int, ...],
+    partition_id: int = 0,
+    nb_partitions: int = 1,
+    page_size: int = 1000,
+) -> Iterator[List[Any]]:
+    """Yields pages of full rows of the given ``object_type``.
+
+    Tables indexed by sha1 are read one partition and one tool at a time, so
+    ``tool_ids`` must not be empty for them; rows are yielded in increasing
+    order of id for each tool, one tool after the other.
+    Origin tables are read in a single pass in increasing order of
+    ``(id, indexer_configuration_id)``, optionally filtered on ``tool_ids``."""
+    if object_type.startswith("origin_"):
+        endpoint = getattr(idx_storage, f"{object_type}_stream")
+        next_page_token = None
+        while True:
+            result = endpoint(
+                page_token=next_page_token,
+                limit=page_size,
+                tool_ids=list(tool_ids) or None,
+            )
+            yield result.results
+            next_page_token = result.next_page_token
+            if next_page_token is None:
+                break
+    else:
+        endpoint = getattr(idx_storage, f"{object_type}_get_partition_rows")
+        for tool_id in tool_ids:
+            next_page_token = None
+            while True:
+                result = endpoint(
+                    tool_id,
+                    partition_id,
+                    nb_partitions,
+                    page_token=next_page_token,
+                    limit=page_size,
+                )
+                yield result.results
+                next_page_token = result.next_page_token
+                if next_page_token is None:
+                    break
+
+
+_EXPORT_SHA1_COLUMNS = {"id", "from_directory", "from_remd_id"}
+
+
+def _export_record(row) -> Dict[str, Any]:
+    """Flattens a row into a JSON-serializable dict, with sha1s as hex strings
+    and one column per tool field."""
+    from swh.model.hashutil import hash_to_hex
+
+    record = row.to_dict()
+    tool = record.pop("tool")
+    record.pop("indexer_configuration_id", None)
+    for key, value in record.items():
+        if isinstance(value, bytes):
+            if key in _EXPORT_SHA1_COLUMNS:
+                record[key] = hash_to_hex(value)
+            else:
+                record[key] = value.decode("utf-8", "backslashreplace")
+    record["tool_id"] = tool["id"]
+    record["tool_name"] = tool["name"]
+    record["tool_version"] = tool["version"]
+    record["tool_configuration"] = tool["configuration"]
+    return record
+
+
+def _parquet_schema(object_type: str):
+    """Returns the schema of the Parquet files written by :func:`_write_parquet`
+    for the given ``object_type``; it cannot be inferred from the first rows,
+    as their optional columns may all be null or empty."""
+    import pyarrow
+
+    columns = {
+        "content_mimetype": [
+            ("mimetype", pyarrow.string()),
+            ("encoding", pyarrow.string()),
+        ],
+        "content_metadata": [("metadata", pyarrow.string())],
+        "directory_intrinsic_metadata": [
+            ("metadata", pyarrow.string()),
+            ("mappings", pyarrow.list_(pyarrow.string())),
+        ],
+        "origin_intrinsic_metadata": [
+            ("metadata", pyarrow.string()),
+            ("from_directory", pyarrow.string()),
+            ("mappings", pyarrow.list_(pyarrow.string())),
+        ],
+        "origin_extrinsic_metadata": [
+            ("metadata", pyarrow.string()),
+            ("from_remd_id", pyarrow.string()),
+            ("mappings", pyarrow.list_(pyarrow.string())),
+        ],
+    }[object_type]
+    return pyarrow.schema(
+        [("id", pyarrow.string())]
+        + columns
+        + [
+            ("tool_id", pyarrow.int64()),
+            ("tool_name", pyarrow.string()),
+            ("tool_version", pyarrow.string()),
+            ("tool_configuration", pyarrow.string()),
+        ]
+    )
+
+
+def _write_parquet(pages: Iterator[List[Any]], path: str, object_type: str) -> int:
+    """Writes each non-empty page as a row group of a Parquet file; dict
+    columns are serialized as JSON strings."""
+    import json
+
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise click.ClickException(
+            "The parquet format requires pyarrow (swh.indexer[parquet])."
+        )
+
+    schema = _parquet_schema(object_type)
+    count = 0
+    with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+        for page in pages:
+            if not page:
+                continue
+            records = []
+            for row in page:
+                record = _export_record(row)
+                for key in ("metadata", "tool_configuration"):
+                    if key in record:
+                        record[key] = json.dumps(record[key])
+                records.append(record)
+            writer.write_table(pyarrow.Table.from_pylist(records, schema=schema))
+            count += len(records)
+    return count
+
+
+@indexer_cli_group.command("export")
+@click.argument("object_type", type=click.Choice(EXPORTABLE_OBJECT_TYPES))
+@click.option(
+    "--tool-id",
+    "tool_ids",
+    type=int,
+    multiple=True,
+    help="Only export rows computed by this tool. Mandatory (and can be repeated) "
+    "for content and directory tables.",
+)
+@click.option(
+    "--partition-id",
+    type=int,
+    default=0,
+    show_default=True,
+    help="Partition to export, for content and directory tables.",
+)
+@click.option(
+    "--nb-partitions",
+    type=int,
+    default=1,
+    show_default=True,
+    help="Number of partitions to split content and directory tables into.",
+)
+@click.option(
+    "--page-size",
+    type=int,
+    default=1000,
+    show_default=True,
+    help="Number of rows fetched from the indexer storage at once.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["jsonl", "parquet"]),
+    default="jsonl",
+    show_default=True,
+    help="Output format: newline-delimited JSON, or Parquet (requires pyarrow).",
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False, writable=True),
+    default="-",
+    help="Output file. Defaults to the standard output (jsonl only).",
+)
+@click.pass_context
+def export(
+    ctx,
+    object_type: str,
+    tool_ids: Tuple[int, ...],
+    partition_id: int,
+    nb_partitions: int,
+    page_size: int,
+    output_format: str,
+    output: str,
+):
+    """Exports all rows of an indexer storage table.
+
+    Rows are read with keyset pagination, so the cost of each page does not
+    depend on how far in the table it is; and they are written as soon as they
+    are fetched, so the whole table is never held in memory.
+    """
+    import json
+
+    from swh.indexer.storage import get_indexer_storage
+
+    if not object_type.startswith("origin_") and not tool_ids:
+        raise click.ClickException(f"--tool-id is mandatory to export {object_type}")
+
+    idx_storage = _get_api(
+        get_indexer_storage, ctx.obj["config"], "indexer_storage", None
+    )
+    pages = iter_export_pages(
+        idx_storage,
+        object_type,
+        tool_ids,
+        partition_id=partition_id,
+        nb_partitions=nb_partitions,
+        page_size=page_size,
+    )
+
+    if output_format == "parquet":
+        if output == "-":
+            raise click.ClickException("The parquet format requires --output.")
+        count = _write_parquet(pages, output, object_type)
+    else:
+        count = 0
+        with click.open_file(output, "w") as f:
+            for page in pages:
+                for row in page:
+                    f.write(json.dumps(_export_record(row)) + "\n")
+                count += len(page)
+
+    logger.info("Exported %d %s rows", count, object_type)
+
+
+@indexer_cli_group.group("stats")
+def stats():
+    """Manage Software Heritage Indexer statistics."""
+    pass
+
+
+@stats.command("show")
+@click.pass_context
+def stats_show(ctx):
+    """Print counts of origin intrinsic metadata, as JSON."""
+    import json
+
+    from swh.indexer.storage import get_indexer_storage
+
+    idx_storage = _get_api(
+        get_indexer_storage, ctx.obj["config"], "indexer_storage", None
+    )
+    click.echo(json.dumps(idx_storage.origin_intrinsic_metadata_stats(), indent=2))
+
+
+@stats.command("rebuild")
+@click.pass_context
+def stats_rebuild(ctx):
+    """Recompute the counters of origin intrinsic metadata from scratch.
+
+    They are kept up to date as metadata is added, so this is only needed
+    after the counters were lost or modified by hand. Writes of origin
+    intrinsic metadata are blocked until this is done."""
+    from swh.indexer.storage import get_indexer_storage
+
+    idx_storage = _get_api(
+        get_indexer_storage, ctx.obj["config"], "indexer_storage", None
+    )
+    idx_storage.origin_intrinsic_metadata_stats_rebuild()
+    click.echo("Rebuilt origin intrinsic metadata counters.")
+
+
 @indexer_cli_group.command("list")
 @click.option(
     "-v", "--verbose", is_flag=True, help="Show description of each listed indexer."
@@ -204,7 +494,8 @@ def list_indexers(ctx, verbose, long):
     "-b",
     default=None,
     type=int,
-    help="Batch size. Default is 200.",
+    help="Batch size. Default is 200. Initial batch size when it is adaptive"
+    " (see the adaptive_batch_size.journal_client configuration).",
 )
 @click.pass_context
 def journal_client(
@@ -222,7 +513,11 @@ def journal_client(
     If no indexer name is given, or if '*' is passed as indexer name, then
     runs all registered indexers.
     """
+    from concurrent.futures import ThreadPoolExecutor, wait
+    import time
+
     from swh.indexer import get_indexer, get_indexer_names
+    from swh.indexer.batch_size import AdaptiveBatchSize, current_memory
     from swh.indexer.indexer import BaseIndexer, ObjectsDict
     from swh.journal.client import get_journal_client
 
@@ -243,8 +538,8 @@ def journal_client(
     if batch_size:
         journal_cfg["batch_size"] = batch_size
 
-    object_types: Set[str] = set()
-    worker_fns: List[Callable[[ObjectsDict], Dict]] = []
+    # Indexers processing each object type
+    routes: Dict[str, List[BaseIndexer]] = {}
 
     # Retrieve the known available indexers
     available_indexers = get_indexer_names()
@@ -268,13 +563,14 @@ def journal_client(
                 " list of objects to manipulate, please adapt."
             )
         # Reference the object types to "consume" from (topics to subscribe will be
-        # derived from this in the journal client implementation)
-        object_types.update(idx.object_types)
+        # derived from this in the journal client implementation), and route
+        # them to the indexer
+        for object_type in idx.object_types:
+            routes.setdefault(object_type, []).append(idx)
         # Do not commit offsets if indexation failed
         idx.catch_exceptions = False
-        # Register the consuming and processing of kafka objects implementation methods
-        # to trigger
-        worker_fns.append(idx.process_journal_objects)
+
+    object_types: Set[str] = set(routes)
 
     if "cls" not in journal_cfg:
         journal_cfg["cls"] = "kafka"
@@ -293,11 +589,55 @@ def journal_client(
 
     journal_cfg["object_types"] = list(object_types)
 
+    adaptive_batch_size_cfg = cfg.get("adaptive_batch_size", {}).get("journal_client")
+    adaptive_batch_size: Optional[AdaptiveBatchSize] = None
+    if adaptive_batch_size_cfg is not None:
+        adaptive_batch_size = AdaptiveBatchSize(
+            "journal_client",
+            journal_cfg.get("batch_size", 200),
+            **adaptive_batch_size_cfg,
+        )
+        journal_cfg["batch_size"] = adaptive_batch_size.size
+
     client = get_journal_client(**journal_cfg)
 
-    def worker_fn(objects: ObjectsDict):
-        for fn in worker_fns:
-            fn(objects)
+    def run_indexer(idx: BaseIndexer, objects: Dict[str, List[Dict]]) -> None:
+        idx.process_journal_objects(cast(ObjectsDict, objects))
+        # Write rows buffered by the indexer storage (see
+        # swh.indexer.storage.proxies.buffer) before offsets are committed
+        idx.idx_storage.flush()
+
+    # Indexers do not depend on each other, so they process each batch
+    # concurrently
+    executor = ThreadPoolExecutor(
+        max_workers=len(indexers), thread_name_prefix="journal-client"
+    )
+
+    def worker_fn(objects: Dict[str, List[Dict]]):
+        start = time.monotonic()
+        # Indexers which have nothing to process in this batch are not run
+        indexer_objects: Dict[BaseIndexer, Dict[str, List[Dict]]] = {}
+        for object_type, values in objects.items():
+            if values:
+                for idx in routes.get(object_type, []):
+                    indexer_objects.setdefault(idx, {})[object_type] = values
+        futures = [
+            executor.submit(run_indexer, idx, idx_objects)
+            for idx, idx_objects in indexer_objects.items()
+        ]
+        # Offsets are committed when this returns, so all indexers must be done
+        # (even if one of them failed)
+        wait(futures)
+        for future in futures:
+            future.result()
+
+        if adaptive_batch_size is not None:
+            # read by the journal client before consuming each batch
+            client.batch_size = adaptive_batch_size.update(
+                sum(map(len, objects.values())),
+                time.monotonic() - start,
+                current_memory(),
+            )
 
     # Finally, process the messages from the journal
     try:
@@ -308,6 +648,7 @@ def journal_client(
         print("Done.")
     finally:
         client.close()
+        executor.shutdown()
 
 
 @indexer_cli_group.command("rpc-serve")
@@ -274,6 +274,18 @@ class BaseIndexer(Generic[TId, TData, TResult], metaclass=abc.ABCMeta):
         """
         return {}
 
+    def _persist(self, results: List[TResult], summary: Dict[str, Any]) -> None:
+        """Persists ``results``, if any, and updates ``summary`` with what was
+        inserted."""
+        if not results:
+            return
+        summary_persist = self.persist_index_computations(results)
+        if summary_persist:
+            for value in summary_persist.values():
+                if value > 0:
+                    summary["status"] = "eventful"
+            summary.update(summary_persist)
+
     def process_journal_objects(self, objects: ObjectsDict) -> Dict:
         """Read swh message objects (content, origin, ...) from the journal to:
 
@@ -348,12 +360,7 @@ class ContentIndexer(BaseIndexer[HashDict, bytes, TResult], Generic[TResult]):
             # Reset tag after we finished processing the given content
             sentry_sdk.set_tag("swh-indexer-content-sha1", "")
 
-        summary_persist = self.persist_index_computations(results)
-        if summary_persist:
-            for value in summary_persist.values():
-                if value > 0:
-                    summary["status"] = "eventful"
-            summary.update(summary_persist)
+        self._persist(results, summary)
         return summary, results
 
 
@@ -411,12 +418,7 @@ class OriginIndexer(BaseIndexer[str, None, TResult], Generic[TResult]):
             summary["status"] = "failed"
             return summary, results
 
-        summary_persist = self.persist_index_computations(results)
-        if summary_persist:
-            for value in summary_persist.values():
-                if value > 0:
-                    summary["status"] = "eventful"
-            summary.update(summary_persist)
+        self._persist(results, summary)
         return summary, results
 
     def index_list(self, origins: List[Origin], **kwargs) -> List[TResult]:
@@ -491,10 +493,5 @@ class DirectoryIndexer(BaseIndexer[Sha1Git, Directory, TResult], Generic[TResult
             else:
                 sentry_sdk.set_tag("swh-indexer-directory-swhid", "")
 
-        summary_persist = self.persist_index_computations(results)
-        if summary_persist:
-            for value in summary_persist.values():
-                if value > 0:
-                    summary["status"] = "eventful"
-            summary.update(summary_persist)
+        self._persist(results, summary)
         return summary, results
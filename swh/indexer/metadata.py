@@ -4,6 +4,7 @@
 # See top-level LICENSE file for more information
 
 from collections import defaultdict
+from contextlib import nullcontext
 from copy import deepcopy
 import datetime
 import hashlib
@@ -30,7 +31,7 @@ import sentry_sdk
 
 from swh.core.config import merge_configs
 from swh.core.statsd import statsd
-from swh.core.utils import grouper
+from swh.indexer.batch_size import AdaptiveBatchSize, BatchSize, get_batch_size
 from swh.indexer.codemeta import merge_documents
 from swh.indexer.indexer import (
     BaseIndexer,
@@ -42,13 +43,14 @@ from swh.indexer.indexer import (
 from swh.indexer.metadata_detector import detect_metadata
 from swh.indexer.metadata_mapping import get_extrinsic_mappings, get_intrinsic_mappings
 from swh.indexer.origin_head import get_head_swhid
-from swh.indexer.storage import INDEXER_CFG_KEY
+from swh.indexer.storage import INDEXER_CFG_KEY, gather
 from swh.indexer.storage.model import (
     ContentMetadataRow,
     DirectoryIntrinsicMetadataRow,
     OriginExtrinsicMetadataRow,
     OriginIntrinsicMetadataRow,
 )
+from swh.indexer.storage.utils import LRUCache
 from swh.model.hashutil import HashDict, hash_to_hex
 from swh.model.model import (
     Content,
@@ -76,52 +78,125 @@ T2 = TypeVar("T2")
 logger = logging.getLogger(__name__)
 
 METRIC_INTRINSIC_COUNT = "swh_indexer_intrinsic_run_count"
+METRIC_FETCH_ISOLATION_CALLS = "swh_indexer_fetch_isolation_calls_total"
+METRIC_FETCH_BAD_OBJECTS = "swh_indexer_fetch_bad_objects_total"
+
+
+KNOWN_BAD_ARGS: LRUCache[Tuple[str, Any], bool] = LRUCache(maxsize=10000, ttl=3600)
+"""Arguments which made fetch functions (by name) fail, even when fetched alone;
+they are skipped by :func:`fetch_in_batches` for an hour."""
 
 
 def fetch_in_batches(
     fetch_fn: Callable[[List[T1]], Iterable[T2]],
     args: List[T1],
-    batch_size: int,
+    batch_size: BatchSize,
 ) -> Iterator[T2]:
     """Calls a function `fetch_fn` on batchs of args, this yields the results when ok.
 
-    When a batch raised, processing continues with the next batch of data to read.
+    When a batch raised, its halves are fetched separately, and those which
+    raise again are split again, until the objects causing the failure are
+    isolated (with a number of calls logarithmic in the size of the batch).
+    They are logged and skipped, so callers receive a *partial* result set
+    rather than a total failure; and skipped by later calls, as long as they are
+    in :data:`KNOWN_BAD_ARGS` (so ``args`` must be hashable).
 
-    Then another round of read is executed on the failed batchs but one object at a
-    time, any further failure is logged and skipped, so callers receive a *partial*
-    result set rather than a total failure.
+    When ``batch_size`` is an :class:`AdaptiveBatchSize`, it is updated after each
+    successful batch, and the next batch uses its new size.
 
     """
-    batchs = grouper(args, batch_size)
-
-    # Read and yield ids we successfully read from `fetch_fn` call
-    for batch in batchs:
-        batch_list: List[T1] = list(batch)
+    fetch_name = getattr(fetch_fn, "__name__", repr(fetch_fn))
+    known_bad = [arg for arg in args if KNOWN_BAD_ARGS.get((fetch_name, arg))]
+    if known_bad:
+        logger.warning(
+            "Skipping %s objects which failed when calling %r: %s",
+            len(known_bad),
+            fetch_fn,
+            known_bad,
+        )
+        statsd.increment(
+            METRIC_FETCH_BAD_OBJECTS,
+            len(known_bad),
+            tags={"fetch_fn": fetch_name, "status": "skipped"},
+        )
+        args = [arg for arg in args if arg not in known_bad]
+
+    start = 0
+    while start < len(args):
+        batch_list: List[T1] = args[start : start + get_batch_size(batch_size)]
+        start += len(batch_list)
+        measure = (
+            batch_size.measure(len(batch_list))
+            if isinstance(batch_size, AdaptiveBatchSize)
+            else nullcontext()
+        )
         try:
-            yield from fetch_fn(batch_list)
+            # Read and yield ids we successfully read from `fetch_fn` call
+            with measure:
+                results: Optional[List[T2]] = list(fetch_fn(batch_list))
         except Exception:
-            # If the whole batch failed, fall back to fetching objects individually
-            # in case a single object is causing the exception
-            for obj in batch_list:
-                try:
-                    # Try to fetch one object at a time
-                    yield from fetch_fn([obj])
-                except Exception as exc:
-                    # If it failed again, we found the problematic object, this time, we just
-                    # log it and skip it
-                    logger.error(
-                        "Failure to retrieve object %s when calling %r: %s",
-                        obj,
-                        fetch_fn,
-                        exc,
-                        exc_info=True,
-                    )
+            results = None
+        if results is not None:
+            yield from results
+            continue
+
+        # If the whole batch failed, look for the objects causing the exception
+        counters = {"calls": 0, "bad_objects": 0}
+        yield from _fetch_bisecting(fetch_fn, fetch_name, batch_list, counters)
+        statsd.increment(
+            METRIC_FETCH_ISOLATION_CALLS,
+            counters["calls"],
+            tags={"fetch_fn": fetch_name},
+        )
+        statsd.increment(
+            METRIC_FETCH_BAD_OBJECTS,
+            counters["bad_objects"],
+            tags={"fetch_fn": fetch_name, "status": "isolated"},
+        )
+
+
+def _fetch_bisecting(
+    fetch_fn: Callable[[List[T1]], Iterable[T2]],
+    fetch_name: str,
+    batch: List[T1],
+    counters: Dict[str, int],
+) -> Iterator[T2]:
+    """Calls `fetch_fn` on each half of a batch which failed, and recursively on
+    the halves of the halves which fail again; objects which fail alone are
+    logged and added to :data:`KNOWN_BAD_ARGS`."""
+    half = len(batch) // 2
+    for part in (batch[:half], batch[half:]):
+        if not part:
+            continue
+        counters["calls"] += 1
+        try:
+            results: Optional[List[T2]] = list(fetch_fn(part))
+        except Exception as exc:
+            if len(part) > 1:
+                results = None
+            else:
+                # We found the problematic object, this time, we just log it and
+                # skip it
+                logger.error(
+                    "Failure to retrieve object %s when calling %r: %s",
+                    part[0],
+                    fetch_fn,
+                    exc,
+                    exc_info=True,
+                )
+                KNOWN_BAD_ARGS.put((fetch_name, part[0]), True)
+                counters["bad_objects"] += 1
+                continue
+        if results is None:
+            yield from _fetch_bisecting(fetch_fn, fetch_name, part, counters)
+        else:
+            yield from results
 
 
 def fetch_as_dict(
     fetch_fn: Callable[[List[T1]], Iterable[T2]],
     ids: List[T1],
-    batch_size: int,
+    batch_size: BatchSize,
 ) -> Dict[T1, T2]:
     """Return a dict ``{id: object}``; missing items are logged."""
     result: Dict[T1, T2] = {}
@@ -161,12 +236,7 @@ class ExtrinsicMetadataIndexer(
             summary["status"] = "failed"
             return summary
 
-        summary_persist = self.persist_index_computations(list(results.values()))
-        if summary_persist:
-            for value in summary_persist.values():
-                if value > 0:
-                    summary["status"] = "eventful"
-            summary.update(summary_persist)
+        self._persist(list(results.values()), summary)
         return summary
 
     def index(
@@ -562,15 +632,26 @@ class DirectoryMetadataIndexer(DirectoryIndexer[DirectoryIntrinsicMetadataRow]):
             for k in [INDEXER_CFG_KEY, "objstorage", "storage", "tools"]
         }
         used_mappings = []
-        for mapping_name, detected_contents in mapping_contents.items():
+        mapping_items = list(mapping_contents.items())
+        # lookups of the contents of each mapping are independent, so they can
+        # be made concurrently
+        known_metadata = gather(
+            self.idx_storage,
+            "content_metadata_get",
+            [
+                ([content.sha1 for content in detected_contents],)
+                for (_, detected_contents) in mapping_items
+            ],
+        )
+        for (mapping_name, detected_contents), known_rows in zip(
+            mapping_items, known_metadata
+        ):
             # Append mapping in list
             used_mappings.append(intrinsic_mappings[mapping_name].name)
 
             # sha1s that are in content_metadata table
             sha1s_in_idx_storage = []
-            for c in self.idx_storage.content_metadata_get(
-                [content.sha1 for content in detected_contents]
-            ):
+            for c in known_rows:
                 # extracting metadata
                 sha1s_in_idx_storage.append(c.id)  # id is a sha1
                 local_metadata = c.metadata
@@ -595,6 +676,8 @@ class DirectoryMetadataIndexer(DirectoryIndexer[DirectoryIntrinsicMetadataRow]):
                         sha1s_to_index,
                         log_suffix=log_suffix,
                     )
+                    # rows it buffered must be written, as it is discarded afterwards
+                    c_metadata_indexer.idx_storage.flush()
                     indexed_count = 0
                     for result in results:
                         local_metadata = result.metadata
@@ -624,11 +707,20 @@ class OriginMetadataIndexer(
     def __init__(self, config=None, **kwargs) -> None:
         super().__init__(config=config, **kwargs)
         self.directory_metadata_indexer = DirectoryMetadataIndexer(config=config)
-        self.batch_size = (
+        batch_size = (
             config.get("batch_size", DEFAULT_BATCH_SIZE)
             if config
             else DEFAULT_BATCH_SIZE
         )
+        adaptive_batch_size = config.get("adaptive_batch_size", {}) if config else {}
+        self.batch_size: Dict[str, BatchSize] = {
+            object_type: (
+                AdaptiveBatchSize(object_type, size, **adaptive_batch_size[object_type])
+                if object_type in adaptive_batch_size
+                else size
+            )
+            for object_type, size in batch_size.items()
+        }
 
     def index_list(
         self,
@@ -3,12 +3,11 @@
 # License: GNU General Public License version 3, or any later version
 # See top-level LICENSE file for more information
 
-from collections import Counter
+import functools
 import json
-from typing import Dict, Iterable, List, Optional, Tuple, Union
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
 import warnings
 
-import attr
 import psycopg
 import psycopg_pool
 
@@ -25,21 +24,23 @@ from .exc import DuplicateId, IndexerStorageArgumentException
 from .interface import PagedResult, Sha1
 from .metrics import process_metrics, send_metric, timed
 from .model import (
+    BaseRow,
     ContentLicenseRow,
     ContentMetadataRow,
     ContentMimetypeRow,
     DirectoryIntrinsicMetadataRow,
     OriginExtrinsicMetadataRow,
     OriginIntrinsicMetadataRow,
+    RowBatch,
+    attach_tools,
+    rows_to_dicts,
 )
+from .utils import LRUCache
 from .writer import JournalWriter
 
 INDEXER_CFG_KEY = "indexer_storage"
 
 
-MAPPING_NAMES = ["cff", "codemeta", "gemspec", "maven", "npm", "pkg-info"]
-
-
 def sanitize_json(doc):
     """Recursively replaces NUL characters, as postgresql does not allow
     them in text fields."""
@@ -90,15 +91,83 @@ def get_indexer_storage(cls: str, **kwargs) -> IndexerStorageInterface:
     return idx_storage
 
 
-def check_id_duplicates(data):
+def gather(
+    storage: IndexerStorageInterface, method_name: str, args_list: Iterable[Tuple]
+) -> List[Any]:
+    """Returns the results of ``getattr(storage, method_name)(*args)`` for each
+    ``args`` in ``args_list``; which are made concurrently if ``storage``
+    supports it, like
+    :class:`swh.indexer.storage.api.async_client.ConcurrentRemoteStorage`.
+    """
+    if hasattr(storage, "gather"):
+        return storage.gather(method_name, args_list)
+    method = getattr(storage, method_name)
+    return [method(*args) for args in args_list]
+
+
+def encode_stream_page_token(url: str, tool_id: int) -> str:
+    """Builds the page token of ``origin_*_metadata_stream`` endpoints, pointing
+    right after the row with the given primary key.
+
+    >>> encode_stream_page_token("https://example.org/repo.git", 42)
+    '42 https://example.org/repo.git'
+    """
+    return f"{tool_id} {url}"
+
+
+def decode_stream_page_token(page_token: str) -> Tuple[str, int]:
+    """Reverse of :func:`encode_stream_page_token`.
+
+    >>> decode_stream_page_token('42 https://example.org/repo.git')
+    ('https://example.org/repo.git', 42)
+    >>> decode_stream_page_token('https://example.org/repo.git')
+    Traceback (most recent call last):
+    ...
+    swh.indexer.storage.exc.IndexerStorageArgumentException: invalid page_token
+    >>> decode_stream_page_token('42')
+    Traceback (most recent call last):
+    ...
+    swh.indexer.storage.exc.IndexerStorageArgumentException: invalid page_token
+    """
+    (tool_id, sep, url) = page_token.partition(" ")
+    try:
+        if not sep:
+            raise ValueError(page_token)
+        return (url, int(tool_id))
+    except ValueError:
+        raise IndexerStorageArgumentException("invalid page_token") from None
+
+
+def stats_from_counters(counters: Mapping[str, int]) -> Dict[str, Any]:
+    """Builds the result of ``origin_intrinsic_metadata_stats`` from the
+    counters of origin intrinsic metadata rows, which are named ``total``,
+    ``non_empty``, and ``mapping:<name>`` for each mapping in use.
+
+    >>> stats_from_counters(
+    ...     {"total": 3, "non_empty": 2, "mapping:npm": 2, "mapping:composer": 1,
+    ...      "mapping:cff": 0})
+    {'total': 3, 'non_empty': 2, 'per_mapping': {'composer': 1, 'npm': 2}}
+    """
+    return {
+        "total": counters.get("total", 0),
+        "non_empty": counters.get("non_empty", 0),
+        "per_mapping": {
+            name[len("mapping:") :]: value
+            for (name, value) in sorted(counters.items())
+            if name.startswith("mapping:") and value
+        },
+    }
+
+
+def check_id_duplicates(data: Sequence[BaseRow]) -> None:
     """
     If any two row models in `data` have the same unique key, raises
-    a `ValueError`.
+    a `DuplicateId` listing these keys.
 
     Values associated to the key must be hashable.
 
     Args:
-        data (List[dict]): List of dictionaries to be inserted
+        data: rows to be inserted, with their ``tool`` set
 
     >>> tool1 = {"name": "foo", "version": "1.2.3", "configuration": {}}
     >>> tool2 = {"name": "foo", "version": "1.2.4", "configuration": {}}
@@ -114,27 +183,117 @@ def check_id_duplicates(data):
     ...
     swh.indexer.storage.exc.DuplicateId: [{'id': b'foo', 'license': 'AGPL', 'tool_configuration': '{}', 'tool_name': 'foo', 'tool_version': '1.2.3'}]
 
+    Tools are compared by value:
+
+    >>> check_id_duplicates([
+    ...     ContentLicenseRow(id=b'foo', tool=tool1, license="AGPL"),
+    ...     ContentLicenseRow(id=b'foo', tool=tool2, license="AGPL"),
+    ...     ContentLicenseRow(id=b'foo', tool=dict(tool1), license="AGPL"),
+    ... ])
+    Traceback (most recent call last):
+    ...
+    swh.indexer.storage.exc.DuplicateId: [{'id': b'foo', 'license': 'AGPL', 'tool_configuration': '{}', 'tool_name': 'foo', 'tool_version': '1.2.3'}]
+
     """  # noqa
-    counter = Counter(tuple(sorted(item.unique_key().items())) for item in data)
-    duplicates = [id_ for (id_, count) in counter.items() if count >= 2]
+    # Rows of a batch usually share the same tool dict, so its configuration
+    # is only serialized once per distinct dict.
+    if not data:
+        return
+    tool_keys: Dict[int, Tuple[str, str, str]] = {}
+    keys = []
+    seen = set()
+    duplicates = set()
+    if isinstance(data, RowBatch):
+        tools: Iterable[Optional[Dict]] = data.column("tool")
+        values: Iterable[Tuple] = zip(
+            *(data.column(name) for name in data.row_class.UNIQUE_KEY_FIELDS)
+        )
+    else:
+        tools = (item.tool for item in data)
+        unique_key_fields = data[0].UNIQUE_KEY_FIELDS
+        values = (
+            tuple(getattr(item, name) for name in unique_key_fields) for item in data
+        )
+    for index, (tool, value) in enumerate(zip(tools, values)):
+        if not tool:
+            data[index].unique_key()  # raises ValueError
+            continue
+        tool_key = tool_keys.get(id(tool))
+        if tool_key is None:
+            tool_key = tool_keys[id(tool)] = (
+                tool["name"],
+                tool["version"],
+                json.dumps(tool["configuration"], sort_keys=True),
+            )
+        key = (tool_key, *value)
+        if key in seen:
+            duplicates.add(key)
+        else:
+            seen.add(key)
+        keys.append(key)
+
     if duplicates:
-        raise DuplicateId(list(map(dict, duplicates)))
+        # Only build the full unique keys of offending rows, in the order of
+        # their first occurrence
+        errors = []
+        for item, key in zip(data, keys):
+            if key in duplicates:
+                duplicates.remove(key)
+                errors.append(dict(sorted(item.unique_key().items())))
+        raise DuplicateId(errors)
+
+
+def invalidates_search_cache(table: str):
+    """Decorator for the ``IndexerStorage`` methods writing to ``table``,
+    which clears the cache of its fulltext search results once the method
+    returned; so after the transaction is committed, and cannot be refilled
+    with results from before the write."""
+
+    def decorator(meth):
+        @functools.wraps(meth)
+        def newf(self, *args, **kwargs):
+            try:
+                return meth(self, *args, **kwargs)
+            finally:
+                self._search_caches[table].clear()
+
+        return newf
+
+    return decorator
 
 
 class IndexerStorage:
     """SWH Indexer Storage Datastore"""
 
-    current_version = 137
+    current_version = 139
 
-    def __init__(self, db, min_pool_conns=1, max_pool_conns=10, journal_writer=None):
+    def __init__(
+        self,
+        db,
+        min_pool_conns=1,
+        max_pool_conns=10,
+        journal_writer=None,
+        search_cache_size=1000,
+        search_cache_ttl=60.0,
+    ):
         """
         Args:
             db: either a libpq connection string, or a psycopg connection
             journal_writer: configuration passed to
                             `swh.journal.writer.get_journal_writer`
+            search_cache_size: number of fulltext search results to keep in
+                memory for each table (0 disables the cache)
+            search_cache_ttl: number of seconds cached search results are kept;
+                they are dropped as soon as this instance writes to their table,
+                so this only bounds how long writes from other processes may be
+                unnoticed
 
         """
         self.journal_writer = JournalWriter(journal_writer)
+        self._search_caches = {
+            table: LRUCache(maxsize=search_cache_size, ttl=search_cache_ttl)
+            for table in ("origin_intrinsic_metadata", "origin_extrinsic_metadata")
+        }
         try:
             if isinstance(db, str):
                 self._pool = psycopg_pool.ConnectionPool(
@@ -161,28 +320,16 @@ class IndexerStorage:
     def _join_indexer_configuration(self, entries, db, cur):
         """Replaces ``entry.indexer_configuration_id`` with a full tool dict
         in ``entry.tool``."""
-        joined_entries = []
 
         # usually, all the additions in a batch are from the same indexer,
-        # so this cache allows doing a single query for all the entries.
-        tool_cache = {}
-
-        for entry in entries:
-            # get the tool used to generate this addition
-            tool_id = entry.indexer_configuration_id
-            assert tool_id
-            if tool_id not in tool_cache:
-                tool_cache[tool_id] = dict(
-                    self._tool_get_from_id(tool_id, db=db, cur=cur)
-                )
-                del tool_cache[tool_id]["id"]
-            entry = attr.evolve(
-                entry, tool=tool_cache[tool_id], indexer_configuration_id=None
-            )
-
-            joined_entries.append(entry)
+        # and attach_tools only gets each tool once, so this does a single
+        # query for all the entries.
+        def get_tool(tool_id):
+            tool = dict(self._tool_get_from_id(tool_id, db=db, cur=cur))
+            del tool["id"]
+            return tool
 
-        return joined_entries
+        return attach_tools(entries, get_tool)
 
     @timed
     @db_transaction()
@@ -299,6 +446,110 @@ class IndexerStorage:
             cur=cur,
         )
 
+    def _get_partition_rows(
+        self,
+        table: str,
+        row_class,
+        converter,
+        indexer_configuration_id: int,
+        partition_id: int,
+        nb_partitions: int,
+        page_token: Optional[str],
+        limit: int,
+        db,
+        cur,
+    ) -> PagedResult:
+        """Common implementation of the ``*_get_partition_rows`` endpoints;
+        `table` is the name of a table indexed by sha1, `converter` a function
+        from :mod:`swh.indexer.storage.converters`."""
+        if limit is None:
+            raise IndexerStorageArgumentException("limit should not be None")
+
+        start, end = get_partition_bounds_bytes(partition_id, nb_partitions, SHA1_SIZE)
+        if page_token is not None:
+            start = hash_to_bytes(page_token)
+        if end is None:
+            end = b"\xff" * SHA1_SIZE
+
+        cols = getattr(db, f"{table}_cols")
+        rows = [
+            row_class.from_dict(converter(dict(zip(cols, c))))
+            for c in db.get_rows_in_range(
+                table,
+                cols,
+                start,
+                end,
+                indexer_configuration_id,
+                limit=limit + 1,
+                cur=cur,
+            )
+        ]
+
+        next_page_token: Optional[str] = None
+        if len(rows) > limit:
+            next_page_token = hash_to_hex(rows[limit].id)
+            rows = rows[:limit]
+
+        return PagedResult(results=rows, next_page_token=next_page_token)
+
+    def _origin_metadata_stream(
+        self,
+        table: str,
+        row_class,
+        page_token: Optional[str],
+        limit: int,
+        tool_ids: Optional[List[int]],
+        db,
+        cur,
+    ) -> PagedResult:
+        """Common implementation of the ``origin_*_metadata_stream`` endpoints."""
+        if limit is None:
+            raise IndexerStorageArgumentException("limit should not be None")
+
+        after = None
+        if page_token is not None:
+            after = decode_stream_page_token(page_token)
+
+        cols = getattr(db, f"{table}_cols")
+        rows = [
+            row_class.from_dict(converters.db_to_metadata(dict(zip(cols, c))))
+            for c in db.origin_metadata_stream(
+                table, cols, after, limit + 1, tool_ids, cur=cur
+            )
+        ]
+
+        next_page_token: Optional[str] = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_page_token = encode_stream_page_token(rows[-1].id, rows[-1].tool["id"])
+
+        return PagedResult(results=rows, next_page_token=next_page_token)
+
+    @timed
+    @db_transaction()
+    def content_mimetype_get_partition_rows(
+        self,
+        indexer_configuration_id: int,
+        partition_id: int,
+        nb_partitions: int,
+        page_token: Optional[str] = None,
+        limit: int = 1000,
+        db=None,
+        cur=None,
+    ) -> PagedResult[ContentMimetypeRow]:
+        return self._get_partition_rows(
+            "content_mimetype",
+            ContentMimetypeRow,
+            converters.db_to_mimetype,
+            indexer_configuration_id,
+            partition_id,
+            nb_partitions,
+            page_token=page_token,
+            limit=limit,
+            db=db,
+            cur=cur,
+        )
+
     @timed
     @process_metrics
     @db_transaction()
@@ -315,7 +566,7 @@ class IndexerStorage:
         self.journal_writer.write_additions("content_mimetype", mimetypes_with_tools)
         db.mktemp_content_mimetype(cur)
         db.copy_to(
-            [m.to_dict() for m in mimetypes],
+            rows_to_dicts(mimetypes),
             "tmp_content_mimetype",
             ["id", "mimetype", "encoding", "indexer_configuration_id"],
             cur,
@@ -365,7 +616,7 @@ class IndexerStorage:
         )
         db.mktemp_content_fossology_license(cur)
         db.copy_to(
-            [license.to_dict() for license in licenses],
+            rows_to_dicts(licenses),
             tblname="tmp_content_fossology_license",
             columns=["id", "license", "indexer_configuration_id"],
             cur=cur,
@@ -431,7 +682,7 @@ class IndexerStorage:
 
         db.mktemp_content_metadata(cur)
 
-        rows = [m.to_dict() for m in metadata]
+        rows = rows_to_dicts(metadata)
         for row in rows:
             row["metadata"] = sanitize_json(row["metadata"])
 
@@ -446,6 +697,31 @@ class IndexerStorage:
             "content_metadata:add": count,
         }
 
+    @timed
+    @db_transaction()
+    def content_metadata_get_partition_rows(
+        self,
+        indexer_configuration_id: int,
+        partition_id: int,
+        nb_partitions: int,
+        page_token: Optional[str] = None,
+        limit: int = 1000,
+        db=None,
+        cur=None,
+    ) -> PagedResult[ContentMetadataRow]:
+        return self._get_partition_rows(
+            "content_metadata",
+            ContentMetadataRow,
+            converters.db_to_metadata,
+            indexer_configuration_id,
+            partition_id,
+            nb_partitions,
+            page_token=page_token,
+            limit=limit,
+            db=db,
+            cur=cur,
+        )
+
     @timed
     @db_transaction()
     def directory_intrinsic_metadata_missing(
@@ -487,7 +763,7 @@ class IndexerStorage:
 
         db.mktemp_directory_intrinsic_metadata(cur)
 
-        rows = [m.to_dict() for m in metadata]
+        rows = rows_to_dicts(metadata)
         for row in rows:
             row["metadata"] = sanitize_json(row["metadata"])
 
@@ -502,6 +778,31 @@ class IndexerStorage:
             "directory_intrinsic_metadata:add": count,
         }
 
+    @timed
+    @db_transaction()
+    def directory_intrinsic_metadata_get_partition_rows(
+        self,
+        indexer_configuration_id: int,
+        partition_id: int,
+        nb_partitions: int,
+        page_token: Optional[str] = None,
+        limit: int = 1000,
+        db=None,
+        cur=None,
+    ) -> PagedResult[DirectoryIntrinsicMetadataRow]:
+        return self._get_partition_rows(
+            "directory_intrinsic_metadata",
+            DirectoryIntrinsicMetadataRow,
+            converters.db_to_metadata,
+            indexer_configuration_id,
+            partition_id,
+            nb_partitions,
+            page_token=page_token,
+            limit=limit,
+            db=db,
+            cur=cur,
+        )
+
     @timed
     @db_transaction()
     def origin_intrinsic_metadata_get(
@@ -518,6 +819,7 @@ class IndexerStorage:
 
     @timed
     @process_metrics
+    @invalidates_search_cache("origin_intrinsic_metadata")
     @db_transaction()
     def origin_intrinsic_metadata_add(
         self,
@@ -533,7 +835,7 @@ class IndexerStorage:
 
         db.mktemp_origin_intrinsic_metadata(cur)
 
-        rows = [m.to_dict() for m in metadata]
+        rows = rows_to_dicts(metadata)
         for row in rows:
             row["metadata"] = sanitize_json(row["metadata"])
 
@@ -556,20 +858,69 @@ class IndexerStorage:
 
     @timed
     @db_transaction()
-    def origin_intrinsic_metadata_search_fulltext(
-        self, conjunction: List[str], limit: int = 100, db=None, cur=None
-    ) -> List[OriginIntrinsicMetadataRow]:
-        return [
-            OriginIntrinsicMetadataRow.from_dict(
-                converters.db_to_metadata(
-                    dict(zip(db.origin_intrinsic_metadata_cols, c))
-                )
+    def origin_intrinsic_metadata_stream(
+        self,
+        page_token: Optional[str] = None,
+        limit: int = 1000,
+        tool_ids: Optional[List[int]] = None,
+        db=None,
+        cur=None,
+    ) -> PagedResult[OriginIntrinsicMetadataRow]:
+        return self._origin_metadata_stream(
+            "origin_intrinsic_metadata",
+            OriginIntrinsicMetadataRow,
+            page_token=page_token,
+            limit=limit,
+            tool_ids=tool_ids,
+            db=db,
+            cur=cur,
+        )
+
+    def _origin_metadata_search_fulltext(
+        self, table: str, row_class, conjunction: List[str], limit: int
+    ) -> List:
+        """Common implementation of the ``origin_*_metadata_search_fulltext``
+        endpoints, answering from the search cache when possible."""
+        cache = self._search_caches[table]
+        key = (tuple(conjunction), limit)
+        rows = cache.get(key)
+        if rows is None:
+            generation = cache.generation
+            rows = self._origin_metadata_search_fulltext_uncached(
+                table, row_class, conjunction, limit
             )
-            for c in db.origin_intrinsic_metadata_search_fulltext(
-                conjunction, limit=limit, cur=cur
+            cache.put(key, rows, generation=generation)
+        return list(rows)
+
+    @db_transaction()
+    def _origin_metadata_search_fulltext_uncached(
+        self,
+        table: str,
+        row_class,
+        conjunction: List[str],
+        limit: int,
+        db=None,
+        cur=None,
+    ) -> List:
+        cols = getattr(db, f"{table}_cols")
+        return [
+            row_class.from_dict(converters.db_to_metadata(dict(zip(cols, c))))
+            for c in db.origin_metadata_search_fulltext(
+                table, cols, conjunction, limit=limit, cur=cur
             )
         ]
 
+    @timed
+    def origin_intrinsic_metadata_search_fulltext(
+        self, conjunction: List[str], limit: int = 100
+    ) -> List[OriginIntrinsicMetadataRow]:
+        return self._origin_metadata_search_fulltext(
+            "origin_intrinsic_metadata",
+            OriginIntrinsicMetadataRow,
+            conjunction,
+            limit,
+        )
+
     @timed
     @db_transaction()
     def origin_intrinsic_metadata_search_by_producer(
@@ -583,10 +934,15 @@ class IndexerStorage:
         cur=None,
     ) -> PagedResult[Union[str, OriginIntrinsicMetadataRow]]:
         assert isinstance(page_token, str)
+        after: Union[None, str, Tuple[str, int]] = None
+        if page_token and ids_only:
+            after = page_token
+        elif page_token:
+            after = decode_stream_page_token(page_token)
         # we go to limit+1 to check whether we should add next_page_token in
         # the response
         rows = db.origin_intrinsic_metadata_search_by_producer(
-            page_token, limit + 1, ids_only, mappings, tool_ids, cur
+            after, limit + 1, ids_only, mappings, tool_ids, cur
         )
         next_page_token = None
         if ids_only:
@@ -605,7 +961,9 @@ class IndexerStorage:
             ]
             if len(results) > limit:
                 results[limit:] = []
-                next_page_token = results[-1].id
+                next_page_token = encode_stream_page_token(
+                    results[-1].id, results[-1].tool["id"]
+                )
 
         return PagedResult(
             results=results,
@@ -615,36 +973,12 @@ class IndexerStorage:
     @timed
     @db_transaction()
     def origin_intrinsic_metadata_stats(self, db=None, cur=None):
-        mapping_names = [m for m in MAPPING_NAMES]
-        select_parts = []
-
-        # Count rows for each mapping
-        for mapping_name in mapping_names:
-            select_parts.append(
-                (
-                    "sum(case when (mappings @> ARRAY['%s']) "
-                    "         then 1 else 0 end)"
-                )
-                % mapping_name
-            )
+        return stats_from_counters(dict(db.origin_intrinsic_metadata_counters(cur)))
 
-        # Total
-        select_parts.append("sum(1)")
-
-        # Rows whose metadata has at least one key that is not '@context'
-        select_parts.append(
-            "sum(case when ('{}'::jsonb @> (metadata - '@context')) "
-            "         then 0 else 1 end)"
-        )
-        cur.execute(
-            "select " + ", ".join(select_parts) + " from origin_intrinsic_metadata"
-        )
-        results = dict(zip(mapping_names + ["total", "non_empty"], cur.fetchone()))
-        return {
-            "total": results.pop("total"),
-            "non_empty": results.pop("non_empty"),
-            "per_mapping": results,
-        }
+    @timed
+    @db_transaction()
+    def origin_intrinsic_metadata_stats_rebuild(self, db=None, cur=None) -> None:
+        db.origin_intrinsic_metadata_counters_rebuild(cur)
 
     @timed
     @db_transaction()
@@ -660,8 +994,20 @@ class IndexerStorage:
             for c in db.origin_extrinsic_metadata_get_from_list(urls, cur)
         ]
 
+    @timed
+    def origin_extrinsic_metadata_search_fulltext(
+        self, conjunction: List[str], limit: int = 100
+    ) -> List[OriginExtrinsicMetadataRow]:
+        return self._origin_metadata_search_fulltext(
+            "origin_extrinsic_metadata",
+            OriginExtrinsicMetadataRow,
+            conjunction,
+            limit,
+        )
+
     @timed
     @process_metrics
+    @invalidates_search_cache("origin_extrinsic_metadata")
     @db_transaction()
     def origin_extrinsic_metadata_add(
         self,
@@ -677,7 +1023,7 @@ class IndexerStorage:
 
         db.mktemp_origin_extrinsic_metadata(cur)
 
-        rows = [m.to_dict() for m in metadata]
+        rows = rows_to_dicts(metadata)
         for row in rows:
             row["metadata"] = sanitize_json(row["metadata"])
 
@@ -698,6 +1044,26 @@ class IndexerStorage:
             "origin_extrinsic_metadata:add": count,
         }
 
+    @timed
+    @db_transaction()
+    def origin_extrinsic_metadata_stream(
+        self,
+        page_token: Optional[str] = None,
+        limit: int = 1000,
+        tool_ids: Optional[List[int]] = None,
+        db=None,
+        cur=None,
+    ) -> PagedResult[OriginExtrinsicMetadataRow]:
+        return self._origin_metadata_stream(
+            "origin_extrinsic_metadata",
+            OriginExtrinsicMetadataRow,
+            page_token=page_token,
+            limit=limit,
+            tool_ids=tool_ids,
+            db=db,
+            cur=cur,
+        )
+
     @timed
     @db_transaction()
     def indexer_configuration_add(self, tools, db=None, cur=None):
@@ -731,6 +1097,9 @@ class IndexerStorage:
             return None
         return dict(zip(db.indexer_configuration_cols, idx))
 
+    def flush(self) -> Dict[str, int]:
+        return {}
+
     @db_transaction()
     def _tool_get_from_id(self, id_, db, cur):
         tool = dict(
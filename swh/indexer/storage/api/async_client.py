@@ -0,0 +1,170 @@
+# Copyright (C) 2026  The Software Heritage developers
+# See the AUTHORS file at the top-level directory of this distribution
+# License: GNU General Public License version 3, or any later version
+# See top-level LICENSE file for more information
+
+"""asyncio client of the indexer storage RPC API, so independent requests
+can be made concurrently."""
+
+import asyncio
+import functools
+import inspect
+import threading
+from typing import Any, Awaitable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+import aiohttp
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from swh.indexer.storage.exc import IndexerStorageAPIError
+
+from ..interface import IndexerStorageInterface
+from .client import RemoteStorage
+
+T = TypeVar("T")
+
+
+def _endpoints() -> Iterable[Tuple[str, Any]]:
+    for meth_name, meth in IndexerStorageInterface.__dict__.items():
+        if hasattr(meth, "_endpoint_path"):
+            yield (meth_name, meth)
+
+
+def _post_data(meth, args, kwargs) -> Dict[str, Any]:
+    # Match arguments and parameters, like swh.core.api.MetaRPCClient
+    post_data = inspect.getcallargs(inspect.unwrap(meth), None, *args, **kwargs)
+    del post_data["self"]
+    return post_data
+
+
+class AsyncRemoteStorage:
+    """Proxy to a remote storage API, with a coroutine for each method of
+    :class:`IndexerStorageInterface`.
+
+    Connections are kept alive and reused, with at most ``pool_size`` of them
+    open at the same time. Bodies are encoded and decoded (and errors raised)
+    like :class:`RemoteStorage`, to which other arguments are passed.
+
+    Requests must all be made from the same event loop, and :meth:`close`
+    awaited when done.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        timeout: Optional[float] = None,
+        pool_size: int = 10,
+        **kwargs,
+    ) -> None:
+        self.url = url.rstrip("/") + "/"
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._rpc = RemoteStorage(url=url, compression=False, **kwargs)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def _post(self, endpoint: str, data: Dict[str, Any]) -> Any:
+        try:
+            async with self._get_session().post(
+                self.url + endpoint,
+                data=self._rpc._encode_data(data),
+                headers={
+                    "content-type": "application/x-msgpack",
+                    "accept": "application/x-msgpack",
+                },
+            ) as aiohttp_response:
+                # decoded like a response of requests, so errors are raised
+                # by RemoteStorage
+                response = requests.Response()
+                response.status_code = aiohttp_response.status
+                response.headers = CaseInsensitiveDict(aiohttp_response.headers)
+                response.url = str(aiohttp_response.url)
+                response._content = await aiohttp_response.read()
+        except aiohttp.ClientConnectionError as e:
+            raise IndexerStorageAPIError(e)
+        return self._rpc._decode_response(response)
+
+    async def gather(self, method_name: str, args_list: Iterable[Tuple]) -> List[Any]:
+        """Returns the results of ``getattr(self, method_name)(*args)`` for
+        each ``args`` in ``args_list``, which are all requested
+        concurrently."""
+        method = getattr(self, method_name)
+        return list(await asyncio.gather(*(method(*args) for args in args_list)))
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self._rpc.session.close()
+
+    async def __aenter__(self) -> "AsyncRemoteStorage":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+
+def _add_async_endpoint(meth_name, meth):
+    @functools.wraps(meth)  # Copy signature and doc
+    async def meth_(self, *args, **kwargs):
+        return await self._post(meth._endpoint_path, _post_data(meth, args, kwargs))
+
+    setattr(AsyncRemoteStorage, meth_name, meth_)
+
+
+for _meth_name, _meth in _endpoints():
+    _add_async_endpoint(_meth_name, _meth)
+
+
+class ConcurrentRemoteStorage:
+    """Synchronous facade of :class:`AsyncRemoteStorage`, so it can be used
+    like any other :class:`IndexerStorageInterface`; and with :meth:`gather`
+    to make independent calls concurrently (see
+    :func:`swh.indexer.storage.gather`).
+
+    Requests are run by an event loop in a background thread, which is
+    stopped by :meth:`close`."""
+
+    def __init__(self, url: str, **kwargs) -> None:
+        self.async_storage = AsyncRemoteStorage(url, **kwargs)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever,
+            name=f"{self.__class__.__name__} event loop",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self, coroutine: Awaitable[T]) -> T:
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()  # type: ignore[arg-type]
+
+    def gather(self, method_name: str, args_list: Iterable[Tuple]) -> List[Any]:
+        """Same as :meth:`AsyncRemoteStorage.gather`."""
+        return self._run(self.async_storage.gather(method_name, list(args_list)))
+
+    def close(self) -> None:
+        if self._loop.is_closed():
+            return
+        self._run(self.async_storage.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def _add_sync_endpoint(meth_name, meth):
+    @functools.wraps(meth)  # Copy signature and doc
+    def meth_(self, *args, **kwargs):
+        return self._run(getattr(self.async_storage, meth_name)(*args, **kwargs))
+
+    setattr(ConcurrentRemoteStorage, meth_name, meth_)
+
+
+for _meth_name, _meth in _endpoints():
+    _add_sync_endpoint(_meth_name, _meth)
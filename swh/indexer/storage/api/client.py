@@ -3,6 +3,8 @@
 # License: GNU General Public License version 3, or any later version
 # See top-level LICENSE file for more information
 
+from typing import Any, Dict, List, Optional, Union
+
 from swh.core.api import RPCClient
 from swh.indexer.storage.exc import (
     DuplicateId,
@@ -11,14 +13,133 @@ from swh.indexer.storage.exc import (
 )
 
 from ..interface import IndexerStorageInterface
+from ..model import BaseRow, RowBatch
+from .compression import choose_encoding, compress
 from .serializers import DECODERS, ENCODERS
 
 
 class RemoteStorage(RPCClient):
-    """Proxy to a remote storage API"""
+    """Proxy to a remote storage API
+
+    Lists of rows of the same class are sent as a :class:`RowBatch`, unless
+    ``row_batches`` is :const:`False` (for servers which do not support it).
+
+    If ``compression`` is :const:`True`, request bodies of at least
+    ``compression_min_size`` bytes are compressed, with the best encoding
+    supported by both the client and the server; which advertises them in its
+    responses, so requests are only compressed after the first response.
+    Compressed responses are decompressed by :mod:`requests`.
+
+    Requests of ``*_add`` endpoints larger than ``max_request_size`` bytes
+    (before compression) are split into several requests; which are not
+    part of the same transaction.
+    """
 
     backend_class = IndexerStorageInterface
     api_exception = IndexerStorageAPIError
     reraise_exceptions = [IndexerStorageArgumentException, DuplicateId]
     extra_type_decoders = DECODERS
     extra_type_encoders = ENCODERS
+
+    def __init__(
+        self,
+        *args,
+        row_batches: bool = True,
+        compression: bool = True,
+        compression_min_size: int = 4096,
+        max_request_size: Optional[int] = 64 * 1024 * 1024,
+        **kwargs,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.row_batches = row_batches
+        self.compression = compression
+        self.compression_min_size = compression_min_size
+        self.max_request_size = max_request_size
+        self._request_encoding: Optional[str] = None
+
+    def _encode_data(self, data: Any) -> bytes:
+        if isinstance(data, _EncodedData):
+            return data
+        if self.row_batches and isinstance(data, dict):
+            data = {key: _to_row_batch(value) for (key, value) in data.items()}
+        return super()._encode_data(data)
+
+    def _post(self, endpoint: str, data: Any, **opts) -> Any:
+        if (
+            self.max_request_size is not None
+            and endpoint.endswith("/add")
+            and isinstance(data, dict)
+        ):
+            encoded = _EncodedData(self._encode_data(data))
+            if len(encoded) > self.max_request_size and len(data) == 1:
+                ((key, rows),) = data.items()
+                if isinstance(rows, list) and len(rows) > 1:
+                    # split in chunks with about the same number of rows, which
+                    # are split again by the recursive calls if still too large
+                    nb_chunks = -(-len(encoded) // self.max_request_size)
+                    chunk_size = -(-len(rows) // nb_chunks)
+                    return _merge_results(
+                        [
+                            self._post(
+                                endpoint, {key: rows[i : i + chunk_size]}, **opts
+                            )
+                            for i in range(0, len(rows), chunk_size)
+                        ]
+                    )
+            data = encoded
+        return super()._post(endpoint, data, **opts)
+
+    def raw_verb(self, verb: str, endpoint: str, **opts) -> Any:
+        data = opts.get("data")
+        encoding = self._request_encoding
+        if (
+            encoding is not None
+            and isinstance(data, bytes)
+            and len(data) >= self.compression_min_size
+        ):
+            compressed_opts = {
+                **opts,
+                "data": compress(data, encoding),
+                "headers": {**opts.get("headers", {}), "Content-Encoding": encoding},
+            }
+            response = super().raw_verb(verb, endpoint, **compressed_opts)
+            if response.status_code == 415:
+                # the server no longer supports this encoding
+                response = super().raw_verb(verb, endpoint, **opts)
+        else:
+            response = super().raw_verb(verb, endpoint, **opts)
+        if self.compression:
+            self._request_encoding = choose_encoding(
+                response.headers.get("Accept-Encoding", "")
+            )
+        return response
+
+
+class _EncodedData(bytes):
+    """Body of a request, which was already encoded by
+    :meth:`RemoteStorage._post`"""
+
+
+def _merge_results(
+    results: List[Union[Dict[str, int], List[Any]]],
+) -> Union[Dict[str, int], List[Any]]:
+    """Merges the results of an ``*_add`` endpoint called on several chunks
+    of its input: summaries are summed, and lists are concatenated."""
+    if all(isinstance(result, dict) for result in results):
+        summary: Dict[str, int] = {}
+        for result in results:
+            for key, value in result.items():  # type: ignore[union-attr]
+                summary[key] = summary.get(key, 0) + value
+        return summary
+    return [item for result in results for item in result]
+
+
+def _to_row_batch(value: Any) -> Any:
+    if (
+        isinstance(value, list)
+        and value
+        and isinstance(value[0], BaseRow)
+        and all(type(row) is type(value[0]) for row in value)
+    ):
+        return RowBatch.from_rows(value)
+    return value
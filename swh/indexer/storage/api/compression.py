@@ -0,0 +1,110 @@
+# Copyright (C) 2026  The Software Heritage developers
+# See the AUTHORS file at the top-level directory of this distribution
+# License: GNU General Public License version 3, or any later version
+# See top-level LICENSE file for more information
+
+"""Compression of the bodies of RPC requests and responses.
+
+The server decompresses request bodies with a supported ``Content-Encoding``,
+and lists the encodings it supports in the ``Accept-Encoding`` header of its
+responses (as suggested by :rfc:`7694`), so clients only compress requests
+once they know the server can decompress them. Responses are compressed with
+the best encoding in the ``Accept-Encoding`` header of the request, if
+enabled in the server configuration.
+
+zstd is only supported if the ``zstandard`` package is installed."""
+
+import gzip
+import io
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _zstd_decompress(data: bytes) -> bytes:
+    # unlike zstandard.decompress, this does not require the frame header to
+    # contain the size of the content
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+CODECS: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "gzip": (lambda data: gzip.compress(data, compresslevel=1), gzip.decompress),
+}
+"""Functions compressing and decompressing data, for each supported
+encoding, from the most preferred one"""
+
+if zstandard is not None:
+    CODECS = {"zstd": (zstandard.compress, _zstd_decompress), **CODECS}
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    return CODECS[encoding][0](data)
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    return CODECS[encoding][1](data)
+
+
+def choose_encoding(
+    accept_encoding: str, encodings: Iterable[str] = CODECS
+) -> Optional[str]:
+    """Returns the first of ``encodings`` accepted by the given value of an
+    ``Accept-Encoding`` header, if any.
+
+    >>> choose_encoding("gzip, deflate;q=0.5", ["zstd", "gzip"])
+    'gzip'
+    >>> choose_encoding("zstd;q=0, gzip", ["zstd", "gzip"])
+    'gzip'
+    >>> choose_encoding("identity", ["zstd", "gzip"]) is None
+    True
+    """
+    accepted = set()
+    for item in accept_encoding.split(","):
+        (name, *params) = item.split(";")
+        quality = 1.0
+        for param in params:
+            (key, _, value) = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0
+        if quality > 0:
+            accepted.add(name.strip().lower())
+    for encoding in encodings:
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+class DecompressionMiddleware:
+    """WSGI middleware decompressing request bodies with a supported
+    ``Content-Encoding``, and returning a 415 error for other encodings."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        encoding = environ.get("HTTP_CONTENT_ENCODING", "identity").strip().lower()
+        if encoding != "identity":
+            if encoding not in CODECS:
+                start_response(
+                    "415 Unsupported Media Type",
+                    [
+                        ("Content-Type", "text/plain"),
+                        ("Accept-Encoding", ", ".join(CODECS)),
+                    ],
+                )
+                return [f"Unsupported Content-Encoding: {encoding}".encode()]
+            length = int(environ.get("CONTENT_LENGTH") or 0)
+            data = decompress(environ["wsgi.input"].read(length), encoding)
+            environ = {
+                **environ,
+                "wsgi.input": io.BytesIO(data),
+                "CONTENT_LENGTH": str(len(data)),
+            }
+            del environ["HTTP_CONTENT_ENCODING"]
+        return self.wsgi_app(environ, start_response)
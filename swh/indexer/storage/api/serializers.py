@@ -16,11 +16,28 @@ def _encode_model_object(obj):
     return d
 
 
+def _encode_row_batch(batch):
+    return {
+        "__type__": batch.row_class.__name__,
+        "length": batch.length,
+        "columns": batch.columns,
+        "constants": batch.constants,
+    }
+
+
+def _decode_row_batch(d):
+    return idx_model.RowBatch(
+        getattr(idx_model, d["__type__"]), d["length"], d["columns"], d["constants"]
+    )
+
+
 ENCODERS: List[Tuple[type, str, Callable]] = [
     (idx_model.BaseRow, "idx_model", _encode_model_object),
+    (idx_model.RowBatch, "idx_row_batch", _encode_row_batch),
 ]
 
 
 DECODERS: Dict[str, Callable] = {
     "idx_model": lambda d: getattr(idx_model, d.pop("__type__")).from_dict(d),
+    "idx_row_batch": _decode_row_batch,
 }
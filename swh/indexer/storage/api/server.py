@@ -8,6 +8,8 @@ import os
 from typing import Any, Dict, Optional
 import warnings
 
+from flask import Response, current_app, request
+
 from swh.core import config
 from swh.core.api import RPCServerApp
 from swh.core.api import encode_data_server as encode_data
@@ -16,6 +18,7 @@ from swh.indexer.storage import INDEXER_CFG_KEY, get_indexer_storage
 from swh.indexer.storage.exc import IndexerStorageArgumentException
 from swh.indexer.storage.interface import IndexerStorageInterface
 
+from .compression import CODECS, DecompressionMiddleware, choose_encoding, compress
 from .serializers import DECODERS, ENCODERS
 
 
@@ -27,10 +30,39 @@ def get_storage():
     return storage
 
 
+def compress_response(response: Response) -> Response:
+    """Advertises the encodings supported for request bodies, and compresses
+    the response if the client accepts it and it is at least as large as the
+    ``min_size`` of the ``compression`` section of the configuration (if
+    any)."""
+    response.headers["Accept-Encoding"] = ", ".join(CODECS)
+    min_size = (current_app.config.get("compression") or {}).get("min_size")
+    if (
+        min_size is None
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+    encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+    data = response.get_data()
+    if encoding is None or len(data) < min_size:
+        return response
+    response.set_data(compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
+
+
 class IndexerStorageServerApp(RPCServerApp):
     extra_type_decoders = DECODERS
     extra_type_encoders = ENCODERS
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wsgi_app = DecompressionMiddleware(self.wsgi_app)
+        self.after_request(compress_response)
+
 
 app = IndexerStorageServerApp(
     __name__, backend_class=IndexerStorageInterface, backend_factory=get_storage
@@ -188,6 +188,45 @@ class Db(BaseDb):
         )
         yield from cur
 
+    def get_rows_in_range(
+        self,
+        table,
+        cols,
+        start,
+        end,
+        indexer_configuration_id,
+        limit=1000,
+        cur=None,
+    ):
+        """Retrieve the `cols` of the rows of `table` with id within range
+        [start, end], associated to the given indexer configuration id,
+        in increasing order of id and bound by limit.
+
+        This is a range scan of the primary key, so it can be used to page
+        over a whole table at a constant cost per page.
+
+        """
+        cur = self._cursor(cur)
+        keys = ", ".join(map(self._convert_key, cols))
+        query = f"""select {keys}
+                    from {table} c
+                    inner join indexer_configuration i
+                        on c.indexer_configuration_id=i.id
+                    where c.indexer_configuration_id=%(tool_id)s
+                          and %(start)s <= c.id and c.id <= %(end)s
+                    order by c.id
+                    limit %(limit)s"""
+        cur.execute(
+            query,
+            {
+                "start": start,
+                "end": end,
+                "tool_id": indexer_configuration_id,
+                "limit": limit,
+            },
+        )
+        yield from cur
+
     def content_mimetype_get_from_list(self, ids, cur=None):
         yield from self._get_from_list(
             "content_mimetype", ids, self.content_mimetype_cols, cur=cur
@@ -334,33 +373,59 @@ class Db(BaseDb):
             id_col="id",
         )
 
-    def origin_intrinsic_metadata_search_fulltext(self, terms, *, limit, cur):
+    def origin_metadata_search_fulltext(self, table, cols, terms, *, limit, cur):
+        """Retrieve the `cols` of the ``limit`` rows of `table` (one of the
+        origin metadata tables) whose tsvector best matches all the ``terms``.
+
+        The GIN index on ``metadata_tsvector`` finds the matching rows, which
+        are ranked using only their tsvector; full rows are only read for the
+        top ``limit`` ones."""
         regconfig = self.origin_intrinsic_metadata_regconfig
         tsquery_template = " && ".join(
             "plainto_tsquery('%s', %%s)" % regconfig for _ in terms
         )
         tsquery_args = [(term,) for term in terms]
-        keys = (
-            self._convert_key(col, "oim") for col in self.origin_intrinsic_metadata_cols
-        )
+        keys = (self._convert_key(col, "oim") for col in cols)
 
         query = (
-            "SELECT {keys} FROM origin_intrinsic_metadata AS oim "
+            "WITH matches AS ("
+            "  SELECT id, indexer_configuration_id,"
+            "    ts_rank(metadata_tsvector, tsq, 1) AS rank"
+            "  FROM {table}, (SELECT {tsquery_template}) AS s(tsq)"
+            "  WHERE metadata_tsvector @@ tsq"
+            "  ORDER BY rank DESC, id, indexer_configuration_id"
+            "  LIMIT %s"
+            ") "
+            "SELECT {keys} FROM matches "
+            "INNER JOIN {table} AS oim "
+            "USING (id, indexer_configuration_id) "
             "INNER JOIN indexer_configuration AS i "
             "ON oim.indexer_configuration_id=i.id "
-            "JOIN LATERAL (SELECT {tsquery_template}) AS s(tsq) ON true "
-            "WHERE oim.metadata_tsvector @@ tsq "
-            "ORDER BY ts_rank(oim.metadata_tsvector, tsq, 1) DESC "
-            "LIMIT %s;"
-        ).format(keys=", ".join(keys), tsquery_template=tsquery_template)
+            "ORDER BY matches.rank DESC, oim.id, oim.indexer_configuration_id"
+        ).format(table=table, keys=", ".join(keys), tsquery_template=tsquery_template)
         cur.execute(query, tsquery_args + [limit])
         yield from cur
 
-    def origin_intrinsic_metadata_search_by_producer(
-        self, last, limit, ids_only, mappings, tool_ids, cur
+    def origin_intrinsic_metadata_search_by_producer_query(
+        self, after, limit, ids_only, mappings, tool_ids
     ):
+        """Builds the query used by
+        :meth:`origin_intrinsic_metadata_search_by_producer`, and its arguments.
+
+        Rows are sorted by primary key, starting strictly after ``after``:
+        an origin URL if ``ids_only``, and a ``(url, indexer_configuration_id)``
+        pair otherwise. Pages are therefore consistent with each other, and can
+        be read by walking the primary key index, stopping after ``limit``
+        matches; unless ``mappings`` are rare enough for the planner to prefer
+        a bitmap scan of their GIN index, followed by a top-N sort."""
         if ids_only:
-            keys = "oim.id"
+            # ids only need the primary key, and an origin indexed by several
+            # tools is only listed once
+            query_parts = [
+                "SELECT DISTINCT oim.id",
+                "FROM origin_intrinsic_metadata AS oim",
+            ]
+            order_by = "ORDER BY oim.id"
         else:
             keys = ", ".join(
                 (
@@ -368,18 +433,22 @@ class Db(BaseDb):
                     for col in self.origin_intrinsic_metadata_cols
                 )
             )
-        query_parts = [
-            "SELECT %s" % keys,
-            "FROM origin_intrinsic_metadata AS oim",
-            "INNER JOIN indexer_configuration AS i",
-            "ON oim.indexer_configuration_id=i.id",
-        ]
+            query_parts = [
+                "SELECT %s" % keys,
+                "FROM origin_intrinsic_metadata AS oim",
+                "INNER JOIN indexer_configuration AS i",
+                "ON oim.indexer_configuration_id=i.id",
+            ]
+            order_by = "ORDER BY oim.id, oim.indexer_configuration_id"
         args = []
 
         where = []
-        if last:
+        if after and ids_only:
             where.append("oim.id > %s")
-            args.append(last)
+            args.append(after)
+        elif after:
+            where.append("(oim.id, oim.indexer_configuration_id) > (%s, %s)")
+            args.extend(after)
         if mappings is not None:
             where.append("oim.mappings && %s")
             args.append(list(mappings))
@@ -390,10 +459,73 @@ class Db(BaseDb):
             query_parts.append("WHERE")
             query_parts.append(" AND ".join(where))
 
+        query_parts.append(order_by)
+
         if limit:
             query_parts.append("LIMIT %s")
             args.append(limit)
 
+        return (" ".join(query_parts), args)
+
+    def origin_intrinsic_metadata_search_by_producer(
+        self, after, limit, ids_only, mappings, tool_ids, cur
+    ):
+        cur.execute(
+            *self.origin_intrinsic_metadata_search_by_producer_query(
+                after, limit, ids_only, mappings, tool_ids
+            )
+        )
+        yield from cur
+
+    def origin_intrinsic_metadata_counters(self, cur=None):
+        """Yields ``(name, value)`` pairs from the counters maintained by
+        triggers on ``origin_intrinsic_metadata``."""
+        cur = self._cursor(cur)
+        cur.execute(
+            "SELECT name, sum(value)::bigint FROM origin_intrinsic_metadata_counter "
+            "GROUP BY name HAVING sum(value) <> 0"
+        )
+        yield from cur
+
+    def origin_intrinsic_metadata_counters_rebuild(self, cur=None):
+        cur = self._cursor(cur)
+        cur.execute("SELECT swh_origin_intrinsic_metadata_counter_rebuild()")
+
+    def origin_metadata_stream(self, table, cols, after, limit, tool_ids, cur=None):
+        """Retrieve the `cols` of the rows of `table` (one of the origin metadata
+        tables) whose primary key is strictly greater than ``after``, in
+        increasing order of primary key and bound by limit.
+
+        Args:
+            after: None, or a ``(url, indexer_configuration_id)`` tuple
+            tool_ids: if not None, only rows of these tools are returned
+
+        """
+        cur = self._cursor(cur)
+        keys = ", ".join(self._convert_key(col, "oim") for col in cols)
+        query_parts = [
+            f"SELECT {keys}",
+            f"FROM {table} AS oim",
+            "INNER JOIN indexer_configuration AS i",
+            "ON oim.indexer_configuration_id=i.id",
+        ]
+        args = []
+
+        where = []
+        if after is not None:
+            where.append("(oim.id, oim.indexer_configuration_id) > (%s, %s)")
+            args.extend(after)
+        if tool_ids is not None:
+            where.append("oim.indexer_configuration_id = ANY(%s)")
+            args.append(list(tool_ids))
+        if where:
+            query_parts.append("WHERE")
+            query_parts.append(" AND ".join(where))
+
+        query_parts.append("ORDER BY oim.id, oim.indexer_configuration_id")
+        query_parts.append("LIMIT %s")
+        args.append(limit)
+
         cur.execute(" ".join(query_parts), args)
         yield from cur
 
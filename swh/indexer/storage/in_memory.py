@@ -3,34 +3,49 @@
 # License: GNU General Public License version 3, or any later version
 # See top-level LICENSE file for more information
 
+import array
+import bisect
 from collections import Counter, defaultdict
+import heapq
 import itertools
 import json
 import math
+import mmap
 import operator
 import re
+import sys
 from typing import (
     Any,
+    BinaryIO,
+    Callable,
     Dict,
     Generic,
     Iterable,
+    Iterator,
     List,
     Optional,
+    Sequence,
     Set,
     Tuple,
     Type,
     TypeVar,
     Union,
+    get_origin,
 )
 
 import attr
+import msgpack
 
-from swh.core.collections import SortedList
 from swh.model.hashutil import hash_to_bytes, hash_to_hex
-from swh.model.model import SHA1_SIZE
+from swh.model.model import SHA1_SIZE, Sha1Git
 from swh.storage.utils import get_partition_bounds_bytes
 
-from . import MAPPING_NAMES, check_id_duplicates
+from . import (
+    check_id_duplicates,
+    decode_stream_page_token,
+    encode_stream_page_token,
+    stats_from_counters,
+)
 from .exc import IndexerStorageArgumentException
 from .interface import PagedResult, Sha1
 from .model import (
@@ -41,7 +56,9 @@ from .model import (
     DirectoryIntrinsicMetadataRow,
     OriginExtrinsicMetadataRow,
     OriginIntrinsicMetadataRow,
+    attach_tools,
 )
+from .utils import FixedSizeKeys, LazyList, SortedMapping
 from .writer import JournalWriter
 
 SHA1_DIGEST_SIZE = 160
@@ -64,55 +81,113 @@ def check_id_types(data: List[Dict[str, Any]]):
         raise IndexerStorageArgumentException("identifiers must be bytes.")
 
 
-def _key_from_dict(d):
-    return tuple(sorted(d.items()))
+def _tool_id(row: BaseRow) -> int:
+    assert row.tool is not None
+    return row.tool["id"]
 
 
 TValue = TypeVar("TValue", bound=BaseRow)
 
+Record = Tuple[Any, ...]
+"""A row without its id: its tool id, then the values of the other fields
+of the row class (see :attr:`SubStorage.fields`)"""
+
+
+def _records(value: Union[Record, List[Record]]) -> Sequence[Record]:
+    """Rows of an id are stored as a single record if there is only one (which
+    is by far the most common), as a list sorted by key otherwise."""
+    if isinstance(value, list):
+        return value
+    else:
+        return (value,)
+
 
 class SubStorage(Generic[TValue]):
-    """Implements common missing/get/add logic for each indexer type."""
+    """Implements common missing/get/add logic for each indexer type.
 
-    _data: Dict[Sha1, Dict[Tuple, Dict[str, Any]]]
-    _tools_per_id: Dict[Sha1, Set[ToolId]]
+    Rows are stored as tuples of their fields' values (see :data:`Record`),
+    with strings, tool ids and lists of strings interned, in a
+    :class:`SortedMapping` from ids to records; whose keys are packed in a
+    single buffer when they are sha1s."""
 
-    def __init__(self, row_class: Type[TValue], tools, journal_writer):
+    def __init__(self, row_class: Type[TValue], tools, journal_writer) -> None:
         self.row_class = row_class
         self._tools = tools
-        self._sorted_ids = SortedList[bytes, Sha1]()
-        self._data = defaultdict(dict)
         self._journal_writer = journal_writer
-        self._tools_per_id = defaultdict(set)
+
+        unique_fields = [name for name in row_class.UNIQUE_KEY_FIELDS if name != "id"]
+        other_fields = [
+            field
+            for field in attr.fields(row_class)
+            if field.name not in ("id", "indexer_configuration_id", "tool")
+            and field.name not in unique_fields
+        ]
+        self.fields: Tuple[str, ...] = tuple(
+            unique_fields + [field.name for field in other_fields]
+        )
+        """Names of the fields whose values are stored in a record after the
+        tool id; the unique fields come first so ``record[:self._key_size]``
+        is the unique key of the row within those with the same id."""
+        self._key_size = 1 + len(unique_fields)
+        self._list_fields = frozenset(
+            field.name
+            for field in attr.fields(row_class)
+            if get_origin(field.type) is list
+        )
+
+        id_type = attr.fields(row_class).id.type
+        self._records: SortedMapping[Any, Union[Record, List[Record]]] = SortedMapping(
+            key_size=SHA1_SIZE if id_type is Sha1Git else None
+        )
+        self._interned: Dict[Any, Any] = {}
+        self._tool_dicts: Dict[ToolId, Dict[str, Any]] = {}
 
     def _join_indexer_configuration(self, entries):
         """Replaces ``entry.indexer_configuration_id`` with a full tool dict
         in ``entry.tool``."""
-        joined_entries = []
 
-        for entry in entries:
-            # get the tool used to generate this addition
-            tool_id = entry.indexer_configuration_id
-            assert tool_id
+        def get_tool(tool_id):
             tool = self._tools[tool_id]
-            entry = attr.evolve(
-                entry,
-                tool={
-                    "name": tool["tool_name"],
-                    "version": tool["tool_version"],
-                    "configuration": tool["tool_configuration"],
-                },
-                indexer_configuration_id=None,
+            return {
+                "name": tool["tool_name"],
+                "version": tool["tool_version"],
+                "configuration": tool["tool_configuration"],
+            }
+
+        return attach_tools(entries, get_tool)
+
+    def _intern(self, value: Any) -> Any:
+        """Returns a shared copy of ``value`` if it is a string, an int or a list
+        of strings (as a tuple), to deduplicate them across rows; or ``value``
+        itself."""
+        if isinstance(value, str):
+            return sys.intern(value)
+        if isinstance(value, list):
+            value = tuple(value)
+        if isinstance(value, (int, tuple)):
+            try:
+                return self._interned.setdefault(value, value)
+            except TypeError:  # unhashable tuple
+                return value
+        return value
+
+    def _make_record(self, row: TValue) -> Record:
+        return tuple(
+            self._intern(value)
+            for value in itertools.chain(
+                (row.indexer_configuration_id,),
+                (getattr(row, name) for name in self.fields),
             )
+        )
 
-            joined_entries.append(entry)
-
-        return joined_entries
-
-    def _key_from_dict(self, d) -> Tuple:
-        """Like the global _key_from_dict, but filters out dict keys that don't
-        belong in the unique key."""
-        return _key_from_dict({k: d[k] for k in self.row_class.UNIQUE_KEY_FIELDS})
+    def _tool_dict(self, tool_id: ToolId) -> Dict[str, Any]:
+        """Returns the tool dict of rows with this tool id; which is only computed
+        once, but copied for each row as callers may modify it."""
+        try:
+            tool = self._tool_dicts[tool_id]
+        except KeyError:
+            tool = self._tool_dicts[tool_id] = _transform_tool(self._tools[tool_id])
+        return dict(tool)
 
     def missing(self, keys: Iterable[Dict]) -> List[Sha1]:
         """List data missing from storage.
@@ -132,7 +207,8 @@ class SubStorage(Generic[TValue]):
         for key in keys:
             tool_id = key["indexer_configuration_id"]
             id_ = key["id"]
-            if tool_id not in self._tools_per_id.get(id_, set()):
+            value = self._records.get(id_)
+            if value is None or all(record[0] != tool_id for record in _records(value)):
                 results.append(id_)
         return results
 
@@ -150,22 +226,39 @@ class SubStorage(Generic[TValue]):
               - arbitrary data (as provided to `add`)
 
         """
-        results = []
+        results: List[TValue] = []
         for id_ in ids:
-            for entry in self._data[id_].values():
-                entry = entry.copy()
-                tool_id = entry.pop("indexer_configuration_id")
-                results.append(
-                    self.row_class(
-                        id=id_,
-                        tool=_transform_tool(self._tools[tool_id]),
-                        **entry,
-                    )
-                )
+            value = self._records.get(id_)
+            if value is not None:
+                results.extend(self.make_row(id_, record) for record in _records(value))
         return results
 
+    def get_record(self, id_, key: Tuple) -> Record:
+        """Returns the record of the row with this id and key
+        (``record[:self._key_size]``)."""
+        value = self._records.get(id_)
+        assert value is not None, id_
+        for record in _records(value):
+            if record[: self._key_size] == key:
+                return record
+        raise KeyError((id_, key))
+
+    def field_getter(self, name: str) -> Callable[[Record], Any]:
+        """Returns a function getting the value of the field ``name`` from a
+        record, without building the row; lists are returned as tuples."""
+        if name == "indexer_configuration_id":
+            return operator.itemgetter(0)
+        return operator.itemgetter(1 + self.fields.index(name))
+
+    def make_row(self, id_, record: Record) -> TValue:
+        kwargs: Dict[str, Any] = {
+            name: list(value) if name in self._list_fields else value
+            for (name, value) in zip(self.fields, record[1:])
+        }
+        return self.row_class(id=id_, tool=self._tool_dict(record[0]), **kwargs)
+
     def get_all(self) -> List[TValue]:
-        return self.get(self._sorted_ids)
+        return [self.make_row(id_, record) for (id_, record) in self.iter_entries()]
 
     def get_partition(
         self,
@@ -211,7 +304,7 @@ class SubStorage(Generic[TValue]):
 
         next_page_token: Optional[str] = None
         ids: List[Sha1] = []
-        sha1s = (sha1 for sha1 in self._sorted_ids.iter_from(start))
+        sha1s = itertools.islice(self._records.iter_keys_from(start), limit + 1)
         for counter, sha1 in enumerate(sha1s):
             if sha1 > end:
                 break
@@ -223,6 +316,91 @@ class SubStorage(Generic[TValue]):
         assert len(ids) <= limit
         return PagedResult(results=ids, next_page_token=next_page_token)
 
+    def get_partition_rows(
+        self,
+        indexer_configuration_id: int,
+        partition_id: int,
+        nb_partitions: int,
+        page_token: Optional[str] = None,
+        limit: int = 1000,
+    ) -> PagedResult[TValue]:
+        """Same as :meth:`get_partition`, but returns full rows instead of
+        their ids."""
+        if limit is None:
+            raise IndexerStorageArgumentException("limit should not be None")
+        (start, end) = get_partition_bounds_bytes(
+            partition_id, nb_partitions, SHA1_SIZE
+        )
+
+        if page_token:
+            start = hash_to_bytes(page_token)
+        if end is None:
+            end = b"\xff" * SHA1_SIZE
+
+        next_page_token: Optional[str] = None
+        rows: List[TValue] = []
+        for sha1, value in self._records.iter_from(start):
+            if sha1 > end:
+                break
+            records = [
+                record
+                for record in _records(value)
+                if record[0] == indexer_configuration_id
+            ]
+            if not records:
+                continue
+            if len(rows) >= limit:
+                next_page_token = hash_to_hex(sha1)
+                break
+            rows.extend(self.make_row(sha1, record) for record in records)
+
+        return PagedResult(results=rows, next_page_token=next_page_token)
+
+    def stream(
+        self,
+        page_token: Optional[str] = None,
+        limit: int = 1000,
+        tool_ids: Optional[List[int]] = None,
+    ) -> PagedResult[TValue]:
+        """Iterates over all rows in increasing order of (id, tool id); used for
+        tables whose ids are origin URLs."""
+        if limit is None:
+            raise IndexerStorageArgumentException("limit should not be None")
+
+        after = None
+        if page_token is not None:
+            after = decode_stream_page_token(page_token)
+
+        rows: List[TValue] = []
+        for id_, record in self.iter_entries(after):
+            if tool_ids is not None and record[0] not in tool_ids:
+                continue
+            if len(rows) >= limit:
+                last_row = rows[-1]
+                return PagedResult(
+                    results=rows,
+                    next_page_token=encode_stream_page_token(
+                        last_row.id, _tool_id(last_row)
+                    ),
+                )
+            rows.append(self.make_row(id_, record))
+
+        return PagedResult(results=rows, next_page_token=None)
+
+    def iter_entries(
+        self, after: Optional[Tuple[Any, float]] = None
+    ) -> Iterator[Tuple[Any, Record]]:
+        """Yields ``(id, record)`` pairs in increasing order of (id, tool id),
+        starting strictly after ``after`` if given, without building rows.
+
+        :meth:`field_getter` reads fields of a record, and :meth:`make_row`
+        turns it into a row."""
+        for id_, value in self._records.iter_from(None if after is None else after[0]):
+            for record in _records(value):
+                if after is not None and (id_, record[0]) <= after:
+                    continue
+                yield (id_, record)
+
     def add(self, data: Iterable[TValue]) -> int:
         """Add data not present in storage.
 
@@ -240,19 +418,284 @@ class SubStorage(Generic[TValue]):
         check_id_duplicates(data_with_tools)
         object_type = self.row_class.object_type  # type: ignore
         self._journal_writer.write_additions(object_type, data_with_tools)
+        key_size = self._key_size
         count = 0
-        for obj, obj_with_tool in zip(data, data_with_tools):
-            item = obj.to_dict()
-            id_ = item.pop("id")
-            tool_id = item["indexer_configuration_id"]
-            key = _key_from_dict(obj_with_tool.unique_key())
-            self._data[id_][key] = item
-            self._tools_per_id[id_].add(tool_id)
+        for obj in data:
+            record = self._make_record(obj)
+            key = record[:key_size]
+
+            def add_record(value: Optional[Union[Record, List[Record]]]):
+                if value is None:
+                    self._item_replaced(obj.id, key, None, obj)
+                    return record
+                records = list(_records(value))
+                index = bisect.bisect_left([r[:key_size] for r in records], key)
+                if index < len(records) and records[index][:key_size] == key:
+                    old_row = self.make_row(obj.id, records[index])
+                    self._item_replaced(obj.id, key, old_row, obj)
+                    records[index] = record
+                else:
+                    self._item_replaced(obj.id, key, None, obj)
+                    records.insert(index, record)
+                return records[0] if len(records) == 1 else records
+
+            self._records.update(obj.id, add_record)
             count += 1
-            if id_ not in self._sorted_ids:
-                self._sorted_ids.add(id_)
         return count
 
+    def _item_replaced(
+        self,
+        id_,
+        key: Tuple,
+        old_row: Optional[TValue],
+        new_row: TValue,
+    ) -> None:
+        """Called by :meth:`add` before a row with the given id and key is
+        stored, with the row it overwrites, if any."""
+        pass
+
+    def _encode_value(self, value: Union[Record, List[Record]]) -> bytes:
+        return msgpack.packb(_records(value), use_bin_type=True)
+
+    def _decode_value(self, data: bytes) -> Union[Record, List[Record]]:
+        records = [
+            tuple(self._intern(field_value) for field_value in record)
+            for record in msgpack.unpackb(data, raw=False, strict_map_key=False)
+        ]
+        return records[0] if len(records) == 1 else records
+
+    def dump(self, file: BinaryIO) -> Dict[str, Any]:
+        """Writes the rows to ``file``, and returns the description of where
+        they are, for :meth:`load`."""
+        (ids, values) = self._records.sorted_items()
+        if isinstance(ids, FixedSizeKeys):
+            ids_section = _write_section(file, ids.tobytes())
+        else:
+            ids_section = _write_section(file, msgpack.packb(ids))
+
+        offsets = array.array("Q", [0])
+        blobs = bytearray()
+        for value in values:
+            blobs += self._encode_value(value)
+            offsets.append(len(blobs))
+
+        return {
+            "ids": ids_section,
+            "offsets": _write_section(file, offsets.tobytes()),
+            "values": _write_section(file, blobs),
+            "state": self._dump_state(),
+        }
+
+    def load(self, file: BinaryIO, description: Dict[str, Any]) -> None:
+        """Replaces the rows with those written by :meth:`dump` in ``file``;
+        their sections are memory-mapped, and only decoded when read."""
+        self._interned = {}
+        self._tool_dicts = {}
+        ids: Union[FixedSizeKeys, List[Any]]
+        if self._records.key_size is not None:
+            ids = FixedSizeKeys(
+                self._records.key_size, _map_section(file, description["ids"])
+            )
+        else:
+            ids = msgpack.unpackb(_map_section(file, description["ids"]), raw=False)
+        offsets = memoryview(_map_section(file, description["offsets"])).cast("Q")
+        values = LazyList(
+            _map_section(file, description["values"]), offsets, self._decode_value
+        )
+        self._records = SortedMapping.from_sorted(ids, values)
+        self._load_state(description["state"])
+
+    def _dump_state(self) -> Any:
+        """Returns the state of subclasses which is not in the rows, to be
+        written by :meth:`dump`."""
+        return None
+
+    def _load_state(self, state: Any) -> None:
+        """Restores the state returned by :meth:`_dump_state` after rows were
+        loaded."""
+        pass
+
+
+def _write_section(file: BinaryIO, data: Union[bytes, bytearray]) -> Tuple[int, int]:
+    """Writes ``data`` at the next offset of ``file`` which can be mapped in
+    memory, and returns this offset and the size of ``data``."""
+    offset = file.tell()
+    padding = -offset % mmap.ALLOCATIONGRANULARITY
+    file.write(bytes(padding))
+    file.write(data)
+    return (offset + padding, len(data))
+
+
+def _map_section(file: BinaryIO, section: Tuple[int, int]) -> Any:
+    (offset, size) = section
+    if size == 0:
+        return b""  # empty files can't be mapped
+    return mmap.mmap(file.fileno(), size, offset=offset, access=mmap.ACCESS_READ)
+
+
+_TOKENS_RE = re.compile("[a-zA-Z0-9]+")
+
+_FULLTEXT_FIELD_WEIGHTS = {"name": 1.0, "keywords": 0.4, "description": 0.2}
+"""Weights of words in these fields of metadata documents, on top of the weight
+of all words of the document, like those of the postgresql backend's tsvectors
+(the defaults of ``ts_rank``)."""
+
+_FULLTEXT_DEFAULT_WEIGHT = 0.1
+
+
+def _tokenize(value: Any) -> List[str]:
+    return _TOKENS_RE.findall(json.dumps(value))
+
+
+def _weighted_tokens(metadata: Dict[str, Any]) -> Tuple[Dict[str, float], int]:
+    """Returns the weight of each token of a metadata document, and its total
+    number of tokens."""
+    text_tokens = _tokenize(metadata)
+    weights: Dict[str, float] = defaultdict(float)
+    for token in text_tokens:
+        weights[token] += _FULLTEXT_DEFAULT_WEIGHT
+    for field, weight in _FULLTEXT_FIELD_WEIGHTS.items():
+        if field in metadata:
+            for token in _tokenize(metadata[field]):
+                weights[token] += weight
+    return (dict(weights), len(text_tokens))
+
+
+class FulltextSubStorage(SubStorage[TValue]):
+    """Maintains an inverted index of the metadata of rows as they are added,
+    so :meth:`search_fulltext` only reads the posting lists of its terms."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # token -> {(id, key): weight of the token in that document}
+        self._postings: Dict[str, Dict[Tuple[Any, Tuple], float]] = defaultdict(dict)
+        # (id, key) -> number of tokens in the document
+        self._nb_tokens: Dict[Tuple[Any, Tuple], int] = {}
+        # set when rows are loaded, so the index is only built if it is used
+        self._postings_outdated = False
+
+    def _item_replaced(
+        self,
+        id_,
+        key: Tuple,
+        old_row: Optional[TValue],
+        new_row: TValue,
+    ) -> None:
+        super()._item_replaced(id_, key, old_row, new_row)
+        if not self._postings_outdated:
+            self._index_row((id_, key), old_row, new_row)
+
+    def _index_row(
+        self, doc: Tuple[Any, Tuple], old_row: Optional[TValue], new_row: TValue
+    ) -> None:
+        if old_row is not None:
+            (old_weights, _) = _weighted_tokens(old_row.metadata)  # type: ignore
+            for token in old_weights:
+                postings = self._postings[token]
+                postings.pop(doc, None)
+                if not postings:
+                    del self._postings[token]
+        (weights, nb_tokens) = _weighted_tokens(new_row.metadata)  # type: ignore
+        for token, weight in weights.items():
+            self._postings[token][doc] = weight
+        self._nb_tokens[doc] = nb_tokens
+
+    def search_fulltext(self, conjunction: List[str], limit: int) -> List[TValue]:
+        """A very crude fulltext search implementation, but that's enough
+        to work on English metadata"""
+        search_tokens = list(itertools.chain(*map(_TOKENS_RE.findall, conjunction)))
+        if not search_tokens:
+            return []
+        if self._postings_outdated:
+            self._rebuild_postings()
+
+        posting_lists = []
+        for search_token in set(search_tokens):
+            postings = self._postings.get(search_token)
+            if not postings:
+                # No document contains this token
+                return []
+            posting_lists.append(postings)
+        # Only documents in the shortest posting list can match all tokens
+        posting_lists.sort(key=len)
+        (shortest, others) = (posting_lists[0], posting_lists[1:])
+
+        results = []
+        for doc in shortest:
+            if not all(doc in postings for postings in others):
+                continue
+            # Sum the weights of search tokens in the text
+            score = sum(self._postings[token][doc] for token in search_tokens)
+            # Normalize according to the text's length
+            rank = score / (1 + math.log(self._nb_tokens[doc]))
+            (id_, key) = doc
+            results.append((-rank, id_, key))
+
+        return [
+            self.make_row(id_, self.get_record(id_, key))
+            for (_, id_, key) in heapq.nsmallest(limit, results)
+        ]
+
+    def _rebuild_postings(self) -> None:
+        self._postings.clear()
+        self._nb_tokens.clear()
+        self._postings_outdated = False
+        for id_, record in self.iter_entries():
+            row = self.make_row(id_, record)
+            self._index_row((id_, record[: self._key_size]), None, row)
+
+    def _load_state(self, state: Any) -> None:
+        super()._load_state(state)
+        self._postings.clear()
+        self._nb_tokens.clear()
+        self._postings_outdated = True
+
+
+def _origin_intrinsic_metadata_counter_names(
+    row: OriginIntrinsicMetadataRow,
+) -> Set[str]:
+    names = {"total"}
+    if set(row.metadata) - {"@context"}:
+        names.add("non_empty")
+    names.update(f"mapping:{mapping}" for mapping in row.mappings)
+    return names
+
+
+class OriginIntrinsicMetadataSubStorage(FulltextSubStorage[OriginIntrinsicMetadataRow]):
+    """Keeps counters of the stored rows up to date, like the
+    ``origin_intrinsic_metadata_counter`` table of the postgresql backend."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(OriginIntrinsicMetadataRow, *args, **kwargs)
+        self.counters: Counter[str] = Counter()
+
+    def _item_replaced(
+        self,
+        id_,
+        key: Tuple,
+        old_row: Optional[OriginIntrinsicMetadataRow],
+        new_row: OriginIntrinsicMetadataRow,
+    ) -> None:
+        super()._item_replaced(id_, key, old_row, new_row)
+        if old_row is not None:
+            self.counters.subtract(_origin_intrinsic_metadata_counter_names(old_row))
+        self.counters.update(_origin_intrinsic_metadata_counter_names(new_row))
+
+    def rebuild_counters(self) -> None:
+        self.counters = Counter()
+        for row in self.get_all():
+            self.counters.update(_origin_intrinsic_metadata_counter_names(row))
+
+    def _dump_state(self) -> Any:
+        return {"counters": dict(self.counters)}
+
+    def _load_state(self, state: Any) -> None:
+        super()._load_state(state)
+        self.counters = Counter(state["counters"])
+
+
+_DUMP_MAGIC = b"SWHIDXM1"
+
 
 class IndexerStorage:
     """In-memory SWH indexer storage."""
@@ -268,8 +711,65 @@ class IndexerStorage:
         self._directory_intrinsic_metadata = SubStorage(
             DirectoryIntrinsicMetadataRow, *args
         )
-        self._origin_intrinsic_metadata = SubStorage(OriginIntrinsicMetadataRow, *args)
-        self._origin_extrinsic_metadata = SubStorage(OriginExtrinsicMetadataRow, *args)
+        self._origin_intrinsic_metadata = OriginIntrinsicMetadataSubStorage(*args)
+        self._origin_extrinsic_metadata = FulltextSubStorage(
+            OriginExtrinsicMetadataRow, *args
+        )
+
+    def _sub_storages(self) -> Dict[str, SubStorage]:
+        sub_storages: List[SubStorage] = [
+            self._mimetypes,
+            self._licenses,
+            self._content_metadata,
+            self._directory_intrinsic_metadata,
+            self._origin_intrinsic_metadata,
+            self._origin_extrinsic_metadata,
+        ]
+        return {
+            sub_storage.row_class.object_type: sub_storage
+            for sub_storage in sub_storages
+        }
+
+    def dump(self, path: str) -> None:
+        """Writes the tools and rows of this storage to ``path``, in a format
+        :meth:`load` can map in memory instead of reading it."""
+        with open(path, "wb") as f:
+            f.write(_DUMP_MAGIC)
+            f.write(bytes(8))  # offset of the header, written last
+            header = {
+                "byteorder": sys.byteorder,
+                "tools": list(self._tools.values()),
+                "sub_storages": {
+                    name: sub_storage.dump(f)
+                    for (name, sub_storage) in self._sub_storages().items()
+                },
+            }
+            header_offset = f.tell()
+            f.write(msgpack.packb(header, use_bin_type=True))
+            f.seek(len(_DUMP_MAGIC))
+            f.write(header_offset.to_bytes(8, "little"))
+
+    def load(self, path: str) -> None:
+        """Replaces the tools and rows of this storage with those written to
+        ``path`` by :meth:`dump`.
+
+        The file is memory-mapped (so it can be shared between processes
+        loading it), and rows are only decoded when they are read. Rows which
+        are loaded are not written to the journal."""
+        with open(path, "rb") as f:
+            if f.read(len(_DUMP_MAGIC)) != _DUMP_MAGIC:
+                raise ValueError(f"{path} is not an indexer storage dump")
+            header_offset = int.from_bytes(f.read(8), "little")
+            f.seek(header_offset)
+            header = msgpack.unpackb(f.read(), raw=False, strict_map_key=False)
+            if header["byteorder"] != sys.byteorder:
+                raise ValueError(
+                    f"{path} was written on a {header['byteorder']}-endian machine"
+                )
+            self._tools.clear()
+            self._tools.update({tool["id"]: tool for tool in header["tools"]})
+            for name, sub_storage in self._sub_storages().items():
+                sub_storage.load(f, header["sub_storages"][name])
 
     def check_config(self, *, check_write):
         return True
@@ -291,6 +791,18 @@ class IndexerStorage:
             indexer_configuration_id, partition_id, nb_partitions, page_token, limit
         )
 
+    def content_mimetype_get_partition_rows(
+        self,
+        indexer_configuration_id: int,
+        partition_id: int,
+        nb_partitions: int,
+        page_token: Optional[str] = None,
+        limit: int = 1000,
+    ) -> PagedResult[ContentMimetypeRow]:
+        return self._mimetypes.get_partition_rows(
+            indexer_configuration_id, partition_id, nb_partitions, page_token, limit
+        )
+
     def content_mimetype_add(
         self, mimetypes: List[ContentMimetypeRow]
     ) -> Dict[str, int]:
@@ -337,6 +849,18 @@ class IndexerStorage:
         added = self._content_metadata.add(metadata)
         return {"content_metadata:add": added}
 
+    def content_metadata_get_partition_rows(
+        self,
+        indexer_configuration_id: int,
+        partition_id: int,
+        nb_partitions: int,
+        page_token: Optional[str] = None,
+        limit: int = 1000,
+    ) -> PagedResult[ContentMetadataRow]:
+        return self._content_metadata.get_partition_rows(
+            indexer_configuration_id, partition_id, nb_partitions, page_token, limit
+        )
+
     def directory_intrinsic_metadata_missing(
         self, metadata: Iterable[Dict]
     ) -> List[Tuple[Sha1, int]]:
@@ -353,6 +877,18 @@ class IndexerStorage:
         added = self._directory_intrinsic_metadata.add(metadata)
         return {"directory_intrinsic_metadata:add": added}
 
+    def directory_intrinsic_metadata_get_partition_rows(
+        self,
+        indexer_configuration_id: int,
+        partition_id: int,
+        nb_partitions: int,
+        page_token: Optional[str] = None,
+        limit: int = 1000,
+    ) -> PagedResult[DirectoryIntrinsicMetadataRow]:
+        return self._directory_intrinsic_metadata.get_partition_rows(
+            indexer_configuration_id, partition_id, nb_partitions, page_token, limit
+        )
+
     def origin_intrinsic_metadata_get(
         self, urls: Iterable[str]
     ) -> List[OriginIntrinsicMetadataRow]:
@@ -364,39 +900,18 @@ class IndexerStorage:
         added = self._origin_intrinsic_metadata.add(metadata)
         return {"origin_intrinsic_metadata:add": added}
 
+    def origin_intrinsic_metadata_stream(
+        self,
+        page_token: Optional[str] = None,
+        limit: int = 1000,
+        tool_ids: Optional[List[int]] = None,
+    ) -> PagedResult[OriginIntrinsicMetadataRow]:
+        return self._origin_intrinsic_metadata.stream(page_token, limit, tool_ids)
+
     def origin_intrinsic_metadata_search_fulltext(
         self, conjunction: List[str], limit: int = 100
     ) -> List[OriginIntrinsicMetadataRow]:
-        # A very crude fulltext search implementation, but that's enough
-        # to work on English metadata
-        tokens_re = re.compile("[a-zA-Z0-9]+")
-        search_tokens = list(itertools.chain(*map(tokens_re.findall, conjunction)))
-
-        def rank(data):
-            # Tokenize the metadata
-            text = json.dumps(data.metadata)
-            text_tokens = tokens_re.findall(text)
-            text_token_occurences = Counter(text_tokens)
-
-            # Count the number of occurrences of search tokens in the text
-            score = 0
-            for search_token in search_tokens:
-                if text_token_occurences[search_token] == 0:
-                    # Search token is not in the text.
-                    return 0
-                score += text_token_occurences[search_token]
-
-            # Normalize according to the text's length
-            return score / math.log(len(text_tokens))
-
-        results = [
-            (rank(data), data) for data in self._origin_intrinsic_metadata.get_all()
-        ]
-        results = [(rank_, data) for (rank_, data) in results if rank_ > 0]
-        results.sort(
-            key=operator.itemgetter(0), reverse=True  # Don't try to order 'data'
-        )
-        return [result for (rank_, result) in results[:limit]]
+        return self._origin_intrinsic_metadata.search_fulltext(conjunction, limit)
 
     def origin_intrinsic_metadata_search_by_producer(
         self,
@@ -407,61 +922,76 @@ class IndexerStorage:
         tool_ids: Optional[List[int]] = None,
     ) -> PagedResult[Union[str, OriginIntrinsicMetadataRow]]:
         assert isinstance(page_token, str)
-        nb_results = 0
         if mappings is not None:
             mapping_set = frozenset(mappings)
         if tool_ids is not None:
             tool_id_set = frozenset(tool_ids)
-        rows = []
 
-        # we go to limit+1 to check whether we should add next_page_token in
-        # the response
-        for entry in self._origin_intrinsic_metadata.get_all():
-            if entry.id <= page_token:
+        after: Optional[Tuple[str, float]] = None
+        if page_token and ids_only:
+            # after all the rows of this origin
+            after = (page_token, math.inf)
+        elif page_token:
+            after = decode_stream_page_token(page_token)
+
+        results: List[Union[str, OriginIntrinsicMetadataRow]] = []
+        next_page_token = None
+        get_mappings = self._origin_intrinsic_metadata.field_getter("mappings")
+        for id_, record in self._origin_intrinsic_metadata.iter_entries(after):
+            if mappings and mapping_set.isdisjoint(get_mappings(record)):
                 continue
-            if nb_results >= (limit + 1):
-                break
-            if mappings and mapping_set.isdisjoint(entry.mappings):
+            if tool_ids and record[0] not in tool_id_set:
                 continue
-            if tool_ids and entry.tool["id"] not in tool_id_set:
+            if ids_only and results and results[-1] == id_:
+                # origins indexed by several tools are only listed once
                 continue
-            rows.append(entry)
-            nb_results += 1
+            if len(results) >= limit:
+                last = results[-1]
+                if isinstance(last, str):
+                    next_page_token = last
+                else:
+                    next_page_token = encode_stream_page_token(last.id, _tool_id(last))
+                break
+            if ids_only:
+                results.append(id_)
+            else:
+                results.append(self._origin_intrinsic_metadata.make_row(id_, record))
 
-        if len(rows) > limit:
-            rows = rows[:limit]
-            next_page_token = rows[-1].id
-        else:
-            next_page_token = None
-        if ids_only:
-            rows = [row.id for row in rows]
         return PagedResult(
-            results=rows,
+            results=results,
             next_page_token=next_page_token,
         )
 
     def origin_intrinsic_metadata_stats(self):
-        mapping_count = {m: 0 for m in MAPPING_NAMES}
-        total = non_empty = 0
-        for data in self._origin_intrinsic_metadata.get_all():
-            total += 1
-            if set(data.metadata) - {"@context"}:
-                non_empty += 1
-            for mapping in data.mappings:
-                mapping_count[mapping] += 1
-        return {"per_mapping": mapping_count, "total": total, "non_empty": non_empty}
+        return stats_from_counters(self._origin_intrinsic_metadata.counters)
+
+    def origin_intrinsic_metadata_stats_rebuild(self) -> None:
+        self._origin_intrinsic_metadata.rebuild_counters()
 
     def origin_extrinsic_metadata_get(
         self, urls: Iterable[str]
     ) -> List[OriginExtrinsicMetadataRow]:
         return self._origin_extrinsic_metadata.get(urls)
 
+    def origin_extrinsic_metadata_search_fulltext(
+        self, conjunction: List[str], limit: int = 100
+    ) -> List[OriginExtrinsicMetadataRow]:
+        return self._origin_extrinsic_metadata.search_fulltext(conjunction, limit)
+
     def origin_extrinsic_metadata_add(
         self, metadata: List[OriginExtrinsicMetadataRow]
     ) -> Dict[str, int]:
         added = self._origin_extrinsic_metadata.add(metadata)
         return {"origin_extrinsic_metadata:add": added}
 
+    def origin_extrinsic_metadata_stream(
+        self,
+        page_token: Optional[str] = None,
+        limit: int = 1000,
+        tool_ids: Optional[List[int]] = None,
+    ) -> PagedResult[OriginExtrinsicMetadataRow]:
+        return self._origin_extrinsic_metadata.stream(page_token, limit, tool_ids)
+
     def indexer_configuration_add(self, tools):
         inserted = []
         for tool in tools:
@@ -475,6 +1005,9 @@ class IndexerStorage:
     def indexer_configuration_get(self, tool):
         return self._tools.get(self._tool_key(tool))
 
+    def flush(self) -> Dict[str, int]:
+        return {}
+
     def _tool_key(self, tool):
         return hash(
             (
@@ -81,6 +81,38 @@ class IndexerStorageInterface(Protocol):
         """
         ...
 
+    @remote_api_endpoint("content_mimetype/range/rows")
+    def content_mimetype_get_partition_rows(
+        self,
+        indexer_configuration_id: int,
+        partition_id: int,
+        nb_partitions: int,
+        page_token: Optional[str] = None,
+        limit: int = 1000,
+    ) -> PagedResult[ContentMimetypeRow]:
+        """Retrieve full mimetype rows within partition partition_id bound by limit.
+
+        Rows are returned in increasing order of their id, which makes it
+        possible to export the whole table by iterating over all partitions.
+
+        Args:
+            **indexer_configuration_id**: The tool used to index data
+            **partition_id**: index of the partition to fetch
+            **nb_partitions**: total number of partitions to split into
+            **page_token**: opaque token used for pagination
+            **limit**: Limit result (default to 1000)
+
+        Raises:
+            IndexerStorageArgumentException for;
+            - limit to None
+
+        Returns:
+            PagedResult of ContentMimetypeRow. If next_page_token is None, there is
+            no more data to fetch
+
+        """
+        ...
+
     @remote_api_endpoint("content_mimetype/add")
     def content_mimetype_add(
         self, mimetypes: List[ContentMimetypeRow]
@@ -227,6 +259,36 @@ class IndexerStorageInterface(Protocol):
         """
         ...
 
+    @remote_api_endpoint("content_metadata/range/rows")
+    def content_metadata_get_partition_rows(
+        self,
+        indexer_configuration_id: int,
+        partition_id: int,
+        nb_partitions: int,
+        page_token: Optional[str] = None,
+        limit: int = 1000,
+    ) -> PagedResult[ContentMetadataRow]:
+        """Retrieve full content metadata rows within partition partition_id bound
+        by limit, in increasing order of their id.
+
+        Args:
+            **indexer_configuration_id**: The tool used to index data
+            **partition_id**: index of the partition to fetch
+            **nb_partitions**: total number of partitions to split into
+            **page_token**: opaque token used for pagination
+            **limit**: Limit result (default to 1000)
+
+        Raises:
+            IndexerStorageArgumentException for;
+            - limit to None
+
+        Returns:
+            PagedResult of ContentMetadataRow. If next_page_token is None, there is
+            no more data to fetch
+
+        """
+        ...
+
     @remote_api_endpoint("directory_intrinsic_metadata/missing")
     def directory_intrinsic_metadata_missing(
         self, metadata: Iterable[Dict]
@@ -277,6 +339,36 @@ class IndexerStorageInterface(Protocol):
         """
         ...
 
+    @remote_api_endpoint("directory_intrinsic_metadata/range/rows")
+    def directory_intrinsic_metadata_get_partition_rows(
+        self,
+        indexer_configuration_id: int,
+        partition_id: int,
+        nb_partitions: int,
+        page_token: Optional[str] = None,
+        limit: int = 1000,
+    ) -> PagedResult[DirectoryIntrinsicMetadataRow]:
+        """Retrieve full directory metadata rows within partition partition_id
+        bound by limit, in increasing order of their id.
+
+        Args:
+            **indexer_configuration_id**: The tool used to index data
+            **partition_id**: index of the partition to fetch
+            **nb_partitions**: total number of partitions to split into
+            **page_token**: opaque token used for pagination
+            **limit**: Limit result (default to 1000)
+
+        Raises:
+            IndexerStorageArgumentException for;
+            - limit to None
+
+        Returns:
+            PagedResult of DirectoryIntrinsicMetadataRow. If next_page_token is
+            None, there is no more data to fetch
+
+        """
+        ...
+
     @remote_api_endpoint("origin_intrinsic_metadata")
     def origin_intrinsic_metadata_get(
         self, urls: Iterable[str]
@@ -305,11 +397,42 @@ class IndexerStorageInterface(Protocol):
         """
         ...
 
+    @remote_api_endpoint("origin_intrinsic_metadata/stream")
+    def origin_intrinsic_metadata_stream(
+        self,
+        page_token: Optional[str] = None,
+        limit: int = 1000,
+        tool_ids: Optional[List[int]] = None,
+    ) -> PagedResult[OriginIntrinsicMetadataRow]:
+        """Iterates over all origin intrinsic metadata rows, in increasing order
+        of (origin URL, tool id).
+
+        Args:
+            page_token: opaque token used for pagination
+            limit: the maximum number of rows to return
+            tool_ids: if given, only returns rows computed by one of these tools
+
+        Raises:
+            IndexerStorageArgumentException for;
+            - limit to None
+            - a malformed page_token
+
+        Returns:
+            PagedResult of OriginIntrinsicMetadataRow. If next_page_token is None,
+            there is no more data to fetch
+
+        """
+        ...
+
     @remote_api_endpoint("origin_intrinsic_metadata/search/fulltext")
     def origin_intrinsic_metadata_search_fulltext(
         self, conjunction: List[str], limit: int = 100
     ) -> List[OriginIntrinsicMetadataRow]:
-        """Returns the list of origins whose metadata contain all the terms.
+        """Returns the list of origins whose metadata contain all the terms,
+        best matches first.
+
+        Matches in the name, keywords, and description of the origin weigh
+        more than matches in other fields, in this order.
 
         Args:
             conjunction: List of terms to be searched for.
@@ -333,7 +456,9 @@ class IndexerStorageInterface(Protocol):
         """Returns the list of origins whose metadata contain all the terms.
 
         Args:
-            page_token (str): Opaque token used for pagination.
+            page_token (str): Opaque token used for pagination. Tokens returned
+                with ``ids_only`` can only be used with ``ids_only``, and
+                conversely.
             limit (int): The maximum number of results to return
             ids_only (bool): Determines whether only origin urls are
                 returned or the content as well
@@ -358,13 +483,22 @@ class IndexerStorageInterface(Protocol):
                   (possibly yielding an empty metadata dictionary)
                 - non_empty (int): total number of origins that we extracted
                   a non-empty metadata dictionary from
-                - per_mapping (dict): a dictionary with mapping names as
-                  keys and number of origins whose indexing used this
-                  mapping. Note that indexing a given origin may use
-                  0, 1, or many mappings.
+                - per_mapping (dict): a dictionary with the name of every
+                  mapping in use as keys, and number of origins whose
+                  indexing used this mapping. Note that indexing a given
+                  origin may use 0, 1, or many mappings.
         """
         ...
 
+    @remote_api_endpoint("origin_intrinsic_metadata/stats/rebuild")
+    def origin_intrinsic_metadata_stats_rebuild(self) -> None:
+        """Recomputes the counters :meth:`origin_intrinsic_metadata_stats`
+        reads from, which are otherwise kept up to date as rows are added.
+
+        This scans all origin intrinsic metadata, and blocks writes to it
+        until done."""
+        ...
+
     @remote_api_endpoint("origin_extrinsic_metadata")
     def origin_extrinsic_metadata_get(
         self, urls: Iterable[str]
@@ -378,6 +512,23 @@ class IndexerStorageInterface(Protocol):
         """
         ...
 
+    @remote_api_endpoint("origin_extrinsic_metadata/search/fulltext")
+    def origin_extrinsic_metadata_search_fulltext(
+        self, conjunction: List[str], limit: int = 100
+    ) -> List[OriginExtrinsicMetadataRow]:
+        """Returns the list of origins whose extrinsic metadata contain all the
+        terms, best matches first.
+
+        Args:
+            conjunction: List of terms to be searched for.
+            limit: The maximum number of results to return
+
+        Returns:
+            list of OriginExtrinsicMetadataRow
+
+        """
+        ...
+
     @remote_api_endpoint("origin_extrinsic_metadata/add")
     def origin_extrinsic_metadata_add(
         self, metadata: List[OriginExtrinsicMetadataRow]
@@ -393,6 +544,33 @@ class IndexerStorageInterface(Protocol):
         """
         ...
 
+    @remote_api_endpoint("origin_extrinsic_metadata/stream")
+    def origin_extrinsic_metadata_stream(
+        self,
+        page_token: Optional[str] = None,
+        limit: int = 1000,
+        tool_ids: Optional[List[int]] = None,
+    ) -> PagedResult[OriginExtrinsicMetadataRow]:
+        """Iterates over all origin extrinsic metadata rows, in increasing order
+        of (origin URL, tool id).
+
+        Args:
+            page_token: opaque token used for pagination
+            limit: the maximum number of rows to return
+            tool_ids: if given, only returns rows computed by one of these tools
+
+        Raises:
+            IndexerStorageArgumentException for;
+            - limit to None
+            - a malformed page_token
+
+        Returns:
+            PagedResult of OriginExtrinsicMetadataRow. If next_page_token is None,
+            there is no more data to fetch
+
+        """
+        ...
+
     @remote_api_endpoint("indexer_configuration/add")
     def indexer_configuration_add(self, tools):
         """Add new tools to the storage.
@@ -432,3 +610,15 @@ class IndexerStorageInterface(Protocol):
 
         """
         ...
+
+    @remote_api_endpoint("flush")
+    def flush(self) -> Dict[str, int]:
+        """Writes the rows buffered by proxies (like
+        :class:`swh.indexer.storage.proxies.buffer.BufferingIndexerStorage`) to
+        their backend. This is a no-op for backends.
+
+        Returns:
+            a summary dict of what has been inserted in the storage
+
+        """
+        ...
@@ -11,6 +11,7 @@ from swh.core.statsd import statsd
 OPERATIONS_METRIC = "swh_indexer_storage_operations_total"
 OPERATIONS_UNIT_METRIC = "swh_indexer_storage_operations_{unit}_total"
 DURATION_METRIC = "swh_indexer_storage_request_duration_seconds"
+CACHE_LOOKUPS_METRIC = "swh_indexer_storage_cache_lookups_total"
 
 
 def timed(f):
@@ -65,6 +66,19 @@ def send_metric(metric, count, method_name):
     return True
 
 
+def send_cache_metrics(method_name: str, hits: int, misses: int) -> None:
+    """Send statsd metrics with the number of lookups of method `method_name`
+    which were found in a cache (hits) or not (misses). Zero counts are
+    discarded."""
+    for result, count in (("hit", hits), ("miss", misses)):
+        if count:
+            statsd.increment(
+                CACHE_LOOKUPS_METRIC,
+                count,
+                tags={"endpoint": method_name, "result": result},
+            )
+
+
 def process_metrics(f):
     """Increment object counters for the decorated function."""
 
@@ -8,8 +8,24 @@ used for the interface of the idx-storage in the near future."""
 
 from __future__ import annotations
 
+import itertools
 import json
-from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar
+from operator import attrgetter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 import attr
 from typing_extensions import Final
@@ -17,9 +33,57 @@ from typing_extensions import Final
 from swh.model.model import Sha1Git
 
 TSelf = TypeVar("TSelf")
-
-
-@attr.s
+TRow = TypeVar("TRow", bound="BaseRow")
+
+
+class _RowFunctions(NamedTuple):
+    to_dict: Callable[[Any], Dict[str, Any]]
+    with_tool: Callable[[Any, Dict[str, Any]], Any]
+
+
+_ROW_FUNCTIONS: Dict[type, _RowFunctions] = {}
+
+
+def _row_functions(cls: Any) -> _RowFunctions:
+    """Returns implementations of :meth:`BaseRow.to_dict` and of the copy done
+    by :func:`attach_tools` specialized for a row class, which read and write
+    each field by name instead of looping over :func:`attr.fields`; like the
+    ``__init__`` methods generated by attrs."""
+    try:
+        return _ROW_FUNCTIONS[cls]
+    except KeyError:
+        pass
+    names = [field.name for field in attr.fields(cls)]
+    other_names = [
+        name for name in names if name not in ("indexer_configuration_id", "tool")
+    ]
+    source = "\n".join(
+        [
+            "def to_dict(self):",
+            "    d = {%s}" % ", ".join(f"{name!r}: self.{name}" for name in names),
+            "    if d['indexer_configuration_id'] is None:",
+            "        del d['indexer_configuration_id']",
+            "    if d['tool'] is None:",
+            "        del d['tool']",
+            "    return d",
+            "",
+            "def with_tool(self, tool):",
+            "    row = object.__new__(cls)",
+            *(f"    row.{name} = self.{name}" for name in other_names),
+            "    row.indexer_configuration_id = None",
+            "    row.tool = tool",
+            "    return row",
+        ]
+    )
+    namespace: Dict[str, Any] = {"cls": cls}
+    exec(compile(source, f"<{cls.__name__} functions>", "exec"), namespace)
+    functions = _ROW_FUNCTIONS[cls] = _RowFunctions(
+        namespace["to_dict"], namespace["with_tool"]
+    )
+    return functions
+
+
+@attr.s(slots=True)
 class BaseRow:
     UNIQUE_KEY_FIELDS: Tuple = ("id",)
 
@@ -41,16 +105,10 @@ class BaseRow:
         return None
 
     def to_dict(self) -> Dict[str, Any]:
-        """Wrapper of `attr.asdict` that can be overridden by subclasses
-        that have special handling of some of the fields."""
-        d = attr.asdict(self, recurse=False)
-
-        if d["indexer_configuration_id"] is None:
-            del d["indexer_configuration_id"]
-        if d["tool"] is None:
-            del d["tool"]
-
-        return d
+        """Equivalent of `attr.asdict` (without recursion) that can be
+        overridden by subclasses that have special handling of some of the
+        fields."""
+        return _row_functions(type(self)).to_dict(self)
 
     @classmethod
     def from_dict(cls: Type[TSelf], d) -> TSelf:
@@ -77,7 +135,7 @@ class BaseRow:
         }
 
 
-@attr.s
+@attr.s(slots=True)
 class ContentMimetypeRow(BaseRow):
     object_type: Final = "content_mimetype"
 
@@ -86,7 +144,7 @@ class ContentMimetypeRow(BaseRow):
     encoding = attr.ib(type=str)
 
 
-@attr.s
+@attr.s(slots=True)
 class ContentLicenseRow(BaseRow):
     object_type: Final = "content_fossology_license"
     UNIQUE_KEY_FIELDS = ("id", "license")
@@ -95,7 +153,7 @@ class ContentLicenseRow(BaseRow):
     license = attr.ib(type=str)
 
 
-@attr.s
+@attr.s(slots=True)
 class ContentMetadataRow(BaseRow):
     object_type: Final = "content_metadata"
 
@@ -103,7 +161,7 @@ class ContentMetadataRow(BaseRow):
     metadata = attr.ib(type=Dict[str, Any])
 
 
-@attr.s
+@attr.s(slots=True)
 class DirectoryIntrinsicMetadataRow(BaseRow):
     object_type: Final = "directory_intrinsic_metadata"
 
@@ -112,7 +170,7 @@ class DirectoryIntrinsicMetadataRow(BaseRow):
     mappings = attr.ib(type=List[str])
 
 
-@attr.s
+@attr.s(slots=True)
 class OriginIntrinsicMetadataRow(BaseRow):
     object_type: Final = "origin_intrinsic_metadata"
 
@@ -122,7 +180,7 @@ class OriginIntrinsicMetadataRow(BaseRow):
     mappings = attr.ib(type=List[str])
 
 
-@attr.s
+@attr.s(slots=True)
 class OriginExtrinsicMetadataRow(BaseRow):
     object_type: Final = "origin_extrinsic_metadata"
 
@@ -132,3 +190,169 @@ class OriginExtrinsicMetadataRow(BaseRow):
     from_remd_id = attr.ib(type=Sha1Git)
     """id of the RawExtrinsicMetadata object used as source for indexed metadata"""
     mappings = attr.ib(type=List[str])
+
+
+def attach_tools(
+    rows: Iterable[TRow], get_tool: Callable[[int], Dict[str, Any]]
+) -> List[TRow]:
+    """Returns copies of ``rows`` with their ``indexer_configuration_id``
+    replaced with the ``tool`` dict returned by ``get_tool``, which is only
+    called once per tool id (so rows with the same tool share the same dict).
+
+    This is equivalent to ``attr.evolve(row, tool=get_tool(row.indexer_configuration_id),
+    indexer_configuration_id=None)`` for each row, without running the
+    constructor of each copy.
+    """  # noqa: B950
+    if isinstance(rows, RowBatch):
+        return rows.with_tools(get_tool)  # type: ignore[return-value]
+    tools: Dict[int, Dict[str, Any]] = {}
+    results = []
+    for row in rows:
+        tool_id = row.indexer_configuration_id
+        assert tool_id
+        tool = tools.get(tool_id)
+        if tool is None:
+            tool = tools[tool_id] = get_tool(tool_id)
+        results.append(_row_functions(type(row)).with_tool(row, tool))
+    return results
+
+
+def rows_to_dicts(rows: Iterable[BaseRow]) -> List[Dict[str, Any]]:
+    """Returns ``[row.to_dict() for row in rows]``, without building the rows
+    if ``rows`` is a :class:`RowBatch`."""
+    if isinstance(rows, RowBatch):
+        return rows.to_dicts()
+    return [row.to_dict() for row in rows]
+
+
+class RowBatch(Sequence[TRow]):
+    """A list of rows of the same class, stored as one list of values per
+    field instead of one object per row; and as a single value for
+    ``indexer_configuration_id`` and ``tool`` when they are the same for all
+    rows, as they usually are.
+
+    This is how the RPC client sends lists of rows, so the server can pass
+    them to the backend without building each row: :func:`rows_to_dicts`,
+    :func:`attach_tools` and :func:`swh.indexer.storage.check_id_duplicates`
+    work on the columns directly, and rows are only built when accessed.
+
+    >>> batch = RowBatch.from_rows([
+    ...     ContentLicenseRow(id=b"foo", license="GPL", indexer_configuration_id=1),
+    ...     ContentLicenseRow(id=b"bar", license="MIT", indexer_configuration_id=1),
+    ... ])
+    >>> (batch.columns, batch.constants)
+    ({'id': [b'foo', b'bar'], 'license': ['GPL', 'MIT']}, {'indexer_configuration_id': 1, 'tool': None})
+    >>> batch[1]
+    ContentLicenseRow(indexer_configuration_id=1, tool=None, id=b'bar', license='MIT')
+    >>> batch.to_dicts()
+    [{'id': b'foo', 'license': 'GPL', 'indexer_configuration_id': 1}, {'id': b'bar', 'license': 'MIT', 'indexer_configuration_id': 1}]
+    """  # noqa: B950
+
+    CONSTANT_FIELDS = ("indexer_configuration_id", "tool")
+    """Fields stored as a single value when it is the same for all rows"""
+
+    def __init__(
+        self,
+        row_class: Type[TRow],
+        length: int,
+        columns: Dict[str, List[Any]],
+        constants: Dict[str, Any],
+    ) -> None:
+        names = {field.name for field in attr.fields(row_class)}
+        if names != set(columns) | set(constants) or set(columns) & set(constants):
+            raise ValueError(
+                f"Columns {sorted(columns)} and constants {sorted(constants)} do "
+                f"not match the fields of {row_class.__name__}"
+            )
+        if any(len(column) != length for column in columns.values()):
+            raise ValueError(
+                f"Columns of {row_class.__name__} batch have unequal sizes"
+            )
+        self.row_class = row_class
+        self.length = length
+        self.columns = columns
+        self.constants = constants
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[TRow]) -> RowBatch[TRow]:
+        """Builds a batch from a non-empty list of rows of the same class."""
+        if not rows:
+            raise ValueError("Cannot build a batch from an empty list of rows")
+        row_class = type(rows[0])
+        if any(type(row) is not row_class for row in rows):
+            raise ValueError("Cannot build a batch from rows of different classes")
+        columns = {}
+        constants = {}
+        for field in attr.fields(row_class):
+            values = list(map(attrgetter(field.name), rows))
+            if field.name in cls.CONSTANT_FIELDS and values.count(values[0]) == len(
+                values
+            ):
+                constants[field.name] = values[0]
+            else:
+                columns[field.name] = values
+        return cls(row_class, len(rows), columns, constants)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            columns = {name: column[index] for name, column in self.columns.items()}
+            length = len(range(*index.indices(self.length)))
+            return RowBatch(self.row_class, length, columns, self.constants)
+        return self.row_class(
+            **{name: column[index] for name, column in self.columns.items()},
+            **self.constants,
+        )
+
+    def __iter__(self) -> Iterator[TRow]:
+        (row_class, names, constants) = (
+            self.row_class,
+            list(self.columns),
+            self.constants,
+        )
+        for values in zip(*self.columns.values()):
+            yield row_class(**dict(zip(names, values)), **constants)
+
+    def column(self, name: str) -> Sequence[Any]:
+        """Returns the list of values of the given field, for each row."""
+        try:
+            return self.columns[name]
+        except KeyError:
+            return [self.constants[name]] * self.length
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Same as :func:`rows_to_dicts`."""
+        constants = {
+            name: value for (name, value) in self.constants.items() if value is not None
+        }
+        # constants are zipped with the columns, so each dict is built at once
+        names = [*self.columns, *constants]
+        columns = [*self.columns.values(), *map(itertools.repeat, constants.values())]
+        dicts = [dict(zip(names, values)) for values in zip(*columns)]
+        for name in self.CONSTANT_FIELDS:
+            if name in self.columns:
+                for d in dicts:
+                    if d[name] is None:
+                        del d[name]
+        return dicts
+
+    def with_tools(self, get_tool: Callable[[int], Dict[str, Any]]) -> RowBatch[TRow]:
+        """Same as :func:`attach_tools`."""
+        columns = {
+            name: column
+            for (name, column) in self.columns.items()
+            if name not in self.CONSTANT_FIELDS
+        }
+        constants: Dict[str, Any] = {"indexer_configuration_id": None}
+        tool_ids = self.column("indexer_configuration_id")
+        assert all(tool_ids)
+        if "indexer_configuration_id" in self.constants:
+            constants["tool"] = get_tool(self.constants["indexer_configuration_id"])
+        else:
+            tools: Dict[int, Dict[str, Any]] = {}
+            for tool_id in dict.fromkeys(tool_ids):
+                tools[tool_id] = get_tool(tool_id)
+            columns["tool"] = [tools[tool_id] for tool_id in tool_ids]
+        return RowBatch(self.row_class, self.length, columns, constants)
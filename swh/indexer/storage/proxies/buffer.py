@@ -0,0 +1,213 @@
+# Copyright (C) 2026  The Software Heritage developers
+# See the AUTHORS file at the top-level directory of this distribution
+# License: GNU General Public License version 3, or any later version
+# See top-level LICENSE file for more information
+
+import logging
+import time
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+import warnings
+
+from swh.core.utils import grouper
+from swh.indexer.storage import get_indexer_storage
+from swh.indexer.storage.interface import IndexerStorageInterface
+from swh.indexer.storage.model import (
+    BaseRow,
+    ContentLicenseRow,
+    ContentMetadataRow,
+    ContentMimetypeRow,
+    DirectoryIntrinsicMetadataRow,
+    OriginExtrinsicMetadataRow,
+    OriginIntrinsicMetadataRow,
+)
+
+logger = logging.getLogger(__name__)
+
+# In the order rows are flushed
+TABLES: Tuple[str, ...] = (
+    "content_mimetype",
+    "content_fossology_license",
+    "content_metadata",
+    "directory_intrinsic_metadata",
+    "origin_intrinsic_metadata",
+    "origin_extrinsic_metadata",
+)
+
+DEFAULT_BUFFER_THRESHOLDS: Dict[str, int] = {
+    "content_mimetype": 10000,
+    "content_fossology_license": 10000,
+    "content_metadata": 1000,
+    "directory_intrinsic_metadata": 1000,
+    "origin_intrinsic_metadata": 1000,
+    "origin_extrinsic_metadata": 1000,
+}
+
+DEFAULT_MAX_AGE = 60.0
+
+
+class BufferingIndexerStorage:
+    # only a string *literal* can be automatically assigned to __doc__!
+    __doc__ = """
+    Indexer storage proxy accumulating the rows passed to ``*_add`` methods, so
+    they are sent to the backend in few large calls instead of many small ones.
+
+    Sample configuration:
+
+    .. code-block:: yaml
+
+        indexer_storage:
+          cls: buffer
+          min_batch_size:
+            origin_intrinsic_metadata: 1000
+          max_age: 60
+          storage:
+            cls: remote
+            url: http://idx-storage.internal.softwareheritage.org:5007/
+
+    When the number of rows buffered for a table reaches its ``min_batch_size``,
+    or when rows were buffered for more than ``max_age`` seconds (which is
+    only checked when adding rows), all rows are flushed to the backend.
+    :meth:`flush` must be called before the work which produced the rows is
+    acknowledged (eg. before the journal client commits its offsets), as
+    buffered rows are lost if the process stops.
+
+    Rows with the same unique key and ``indexer_configuration_id`` are
+    deduplicated; the last one added is kept, as the backend would when adding
+    them in separate calls. Until they are flushed, buffered rows are not
+    returned by ``*_get`` and ``*_missing`` methods.
+
+    Flush order
+    ===========
+
+    So rows are not written before the rows they were computed from (eg.
+    origin intrinsic metadata before the metadata of its directory), tables
+    are always flushed in this order:
+
+    {flush_order}
+    """.format(
+        flush_order="\n    ".join("#. " + table for table in TABLES)
+    )
+
+    def __init__(
+        self,
+        storage: Mapping[str, Any],
+        min_batch_size: Mapping[str, int] = {},
+        max_age: Optional[float] = DEFAULT_MAX_AGE,
+    ) -> None:
+        self.storage: IndexerStorageInterface = get_indexer_storage(**storage)
+        self._buffer_thresholds = {**DEFAULT_BUFFER_THRESHOLDS, **min_batch_size}
+        self.max_age = max_age
+        self._rows: Dict[str, Dict[Tuple, BaseRow]] = {table: {} for table in TABLES}
+        self._first_added: Optional[float] = None
+
+    def __del__(self):
+        if not any(getattr(self, "_rows", {}).values()):
+            return
+
+        # Attempts to flush nonetheless to minimize data loss
+        flush_failed = False
+        try:
+            self.flush()
+        except Exception:
+            flush_failed = True
+
+        warnings.warn(
+            "Some rows were still present in the memory of the buffering "
+            "proxy during shutdown. "
+            f"{'**They are now probably lost!** ' if flush_failed else ''}"
+            "A call to `idx_storage.flush()` is probably missing."
+        )
+
+    def __getattr__(self, key):
+        if key == "storage":
+            raise AttributeError(key)
+        return getattr(self.storage, key)
+
+    def _add(self, table: str, rows: Iterable[BaseRow]) -> Dict[str, int]:
+        """Pushes rows to the buffer of ``table``, and flushes all buffers if
+        one of the thresholds is reached."""
+        buffer_ = self._rows[table]
+        for row in rows:
+            key = (
+                row.indexer_configuration_id,
+                *(getattr(row, field) for field in row.UNIQUE_KEY_FIELDS),
+            )
+            buffer_[key] = row
+        if not buffer_:
+            return {}
+
+        now = time.monotonic()
+        if self._first_added is None:
+            self._first_added = now
+        if len(buffer_) >= self._buffer_thresholds[table] or (
+            self.max_age is not None and now - self._first_added >= self.max_age
+        ):
+            return self.flush()
+        return {}
+
+    def content_mimetype_add(
+        self, mimetypes: Iterable[ContentMimetypeRow]
+    ) -> Dict[str, int]:
+        return self._add("content_mimetype", mimetypes)
+
+    def content_fossology_license_add(
+        self, licenses: Iterable[ContentLicenseRow]
+    ) -> Dict[str, int]:
+        return self._add("content_fossology_license", licenses)
+
+    def content_metadata_add(
+        self, metadata: Iterable[ContentMetadataRow]
+    ) -> Dict[str, int]:
+        return self._add("content_metadata", metadata)
+
+    def directory_intrinsic_metadata_add(
+        self, metadata: Iterable[DirectoryIntrinsicMetadataRow]
+    ) -> Dict[str, int]:
+        return self._add("directory_intrinsic_metadata", metadata)
+
+    def origin_intrinsic_metadata_add(
+        self, metadata: Iterable[OriginIntrinsicMetadataRow]
+    ) -> Dict[str, int]:
+        return self._add("origin_intrinsic_metadata", metadata)
+
+    def origin_extrinsic_metadata_add(
+        self, metadata: Iterable[OriginExtrinsicMetadataRow]
+    ) -> Dict[str, int]:
+        return self._add("origin_extrinsic_metadata", metadata)
+
+    def flush(self) -> Dict[str, int]:
+        """Sends all buffered rows to the backend (in batches of at most
+        ``min_batch_size`` rows), then flushes it; and returns the sum of their
+        summaries."""
+        summary: Dict[str, int] = {}
+
+        def update_summary(stats: Dict[str, int]) -> None:
+            for k, v in stats.items():
+                summary[k] = v + summary.get(k, 0)
+
+        for table in TABLES:
+            buffer_ = self._rows[table]
+            if not buffer_:
+                continue
+            logger.debug("Flushing %s rows of %s", len(buffer_), table)
+            add = getattr(self.storage, f"{table}_add")
+            for batch in grouper(buffer_.values(), n=self._buffer_thresholds[table]):
+                update_summary(add(list(batch)))
+            buffer_.clear()
+
+        # Flush underlying storage
+        update_summary(self.storage.flush())
+        self._first_added = None
+
+        return summary
+
+    def clear_buffers(self) -> None:
+        """Clears rows from the buffers, without sending them.
+
+        WARNING:
+
+            rows which were not flushed to the backend are lost
+        """
+        for buffer_ in self._rows.values():
+            buffer_.clear()
+        self._first_added = None
@@ -0,0 +1,325 @@
+# Copyright (C) 2026  The Software Heritage developers
+# See the AUTHORS file at the top-level directory of this distribution
+# License: GNU General Public License version 3, or any later version
+# See top-level LICENSE file for more information
+
+import json
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+import attr
+
+from swh.indexer.storage import get_indexer_storage
+from swh.indexer.storage.interface import IndexerStorageInterface, Sha1
+from swh.indexer.storage.metrics import send_cache_metrics, timed
+from swh.indexer.storage.model import (
+    BaseRow,
+    ContentLicenseRow,
+    ContentMetadataRow,
+    ContentMimetypeRow,
+    DirectoryIntrinsicMetadataRow,
+    OriginExtrinsicMetadataRow,
+    OriginIntrinsicMetadataRow,
+)
+from swh.indexer.storage.utils import LRUCache
+
+TRow = TypeVar("TRow", bound=BaseRow)
+
+ROW_TABLES = [
+    "content_mimetype",
+    "content_fossology_license",
+    "content_metadata",
+    "directory_intrinsic_metadata",
+    "origin_intrinsic_metadata",
+    "origin_extrinsic_metadata",
+]
+"""Tables whose ``*_get`` results are cached"""
+
+MISSING_TABLES = [
+    "content_mimetype",
+    "content_metadata",
+    "directory_intrinsic_metadata",
+]
+"""Tables whose ``*_missing`` results are cached"""
+
+
+class CachingIndexerStorage:
+    """Indexer storage proxy keeping the results of recent lookups, so repeated
+    ones are not sent to the backend.
+
+    Sample configuration:
+
+    .. code-block: yaml
+
+        indexer_storage:
+          cls: cache
+          cache_size: 100000
+          cache_ttl: 300
+          storage:
+            cls: remote
+            url: http://idx-storage.internal.softwareheritage.org:5007/
+
+    For each table, the rows returned by ``*_get`` are cached per id
+    (including ids without any row), and the entries which ``*_missing`` found
+    are not missing (as they never become missing again); for at most
+    ``cache_size`` ids each, and at most ``cache_ttl`` seconds, as rows added by
+    other clients are not seen until then. Rows added through this proxy
+    remove their ids from the cache of ``*_get``, and add them to the cache
+    of ``*_missing``. Tools returned by ``indexer_configuration_get`` are cached
+    without time limit, as they never change.
+
+    Returned rows are copies (with a copy of their ``tool`` dict), but share
+    their other values with the cache, so they must not be modified.
+    """
+
+    def __init__(
+        self,
+        storage: Dict[str, Any],
+        cache_size: int = 100000,
+        cache_ttl: Optional[float] = 300,
+    ) -> None:
+        self.storage: IndexerStorageInterface = get_indexer_storage(**storage)
+        self._rows: Dict[str, LRUCache[Any, Tuple[BaseRow, ...]]] = {
+            table: LRUCache(maxsize=cache_size, ttl=cache_ttl) for table in ROW_TABLES
+        }
+        self._present: Dict[str, LRUCache[Tuple[Sha1, int], bool]] = {
+            table: LRUCache(maxsize=cache_size, ttl=cache_ttl)
+            for table in MISSING_TABLES
+        }
+        self._tools: LRUCache[Tuple[str, str, str], Dict[str, Any]] = LRUCache(
+            maxsize=cache_size
+        )
+
+    def __getattr__(self, key):
+        if key == "storage":
+            raise AttributeError(key)
+        return getattr(self.storage, key)
+
+    def _get(
+        self, table: str, ids: Iterable[Any], get: Callable[[List[Any]], List[TRow]]
+    ) -> List[TRow]:
+        cache = self._rows[table]
+        results: Dict[Any, Optional[Tuple[Any, ...]]] = {
+            id_: cache.get(id_) for id_ in ids
+        }
+        missed = [id_ for (id_, rows) in results.items() if rows is None]
+        send_cache_metrics(
+            f"{table}_get", hits=len(results) - len(missed), misses=len(missed)
+        )
+        if missed:
+            generation = cache.generation
+            fetched: Dict[Any, List[TRow]] = {id_: [] for id_ in missed}
+            for row in get(missed):
+                fetched.setdefault(row.id, []).append(row)
+            for id_, rows in fetched.items():
+                results[id_] = tuple(rows)
+                cache.put(id_, tuple(rows), generation=generation)
+        return [
+            attr.evolve(row, tool=dict(row.tool) if row.tool else row.tool)
+            for rows in results.values()
+            for row in rows or ()
+        ]
+
+    def _missing(
+        self,
+        table: str,
+        entries: Iterable[Dict],
+        missing: Callable[[List[Dict]], List[Any]],
+    ) -> List[Any]:
+        cache = self._present[table]
+        entries = list(entries)
+        unknown = [
+            entry
+            for entry in entries
+            if not cache.get((entry["id"], entry["indexer_configuration_id"]))
+        ]
+        send_cache_metrics(
+            f"{table}_missing",
+            hits=len(entries) - len(unknown),
+            misses=len(unknown),
+        )
+        if not unknown:
+            return []
+        generation = cache.generation
+        results = missing(unknown)
+        missing_ids = set(results)
+        for entry in unknown:
+            if entry["id"] not in missing_ids:
+                key = (entry["id"], entry["indexer_configuration_id"])
+                cache.put(key, True, generation=generation)
+        return results
+
+    def _add(
+        self,
+        table: str,
+        rows: List[TRow],
+        add: Callable[[List[TRow]], Dict[str, int]],
+    ) -> Dict[str, int]:
+        result = add(rows)
+        # after the rows were added, so rows fetched before cannot be cached
+        # again (see LRUCache.pop)
+        for row in rows:
+            self._rows[table].pop(row.id)
+        present = self._present.get(table)
+        if present is not None:
+            for row in rows:
+                if row.indexer_configuration_id is not None:
+                    present.put((row.id, row.indexer_configuration_id), True)
+        return result
+
+    @timed
+    def content_mimetype_missing(
+        self, mimetypes: Iterable[Dict]
+    ) -> List[Tuple[Sha1, int]]:
+        return self._missing(
+            "content_mimetype", mimetypes, self.storage.content_mimetype_missing
+        )
+
+    @timed
+    def content_mimetype_get(self, ids: Iterable[Sha1]) -> List[ContentMimetypeRow]:
+        return self._get("content_mimetype", ids, self.storage.content_mimetype_get)
+
+    @timed
+    def content_mimetype_add(
+        self, mimetypes: List[ContentMimetypeRow]
+    ) -> Dict[str, int]:
+        return self._add(
+            "content_mimetype", mimetypes, self.storage.content_mimetype_add
+        )
+
+    @timed
+    def content_fossology_license_get(
+        self, ids: Iterable[Sha1]
+    ) -> List[ContentLicenseRow]:
+        return self._get(
+            "content_fossology_license", ids, self.storage.content_fossology_license_get
+        )
+
+    @timed
+    def content_fossology_license_add(
+        self, licenses: List[ContentLicenseRow]
+    ) -> Dict[str, int]:
+        return self._add(
+            "content_fossology_license",
+            licenses,
+            self.storage.content_fossology_license_add,
+        )
+
+    @timed
+    def content_metadata_missing(
+        self, metadata: Iterable[Dict]
+    ) -> List[Tuple[Sha1, int]]:
+        return self._missing(
+            "content_metadata", metadata, self.storage.content_metadata_missing
+        )
+
+    @timed
+    def content_metadata_get(self, ids: Iterable[Sha1]) -> List[ContentMetadataRow]:
+        return self._get("content_metadata", ids, self.storage.content_metadata_get)
+
+    @timed
+    def content_metadata_add(
+        self, metadata: List[ContentMetadataRow]
+    ) -> Dict[str, int]:
+        return self._add(
+            "content_metadata", metadata, self.storage.content_metadata_add
+        )
+
+    @timed
+    def directory_intrinsic_metadata_missing(
+        self, metadata: Iterable[Dict]
+    ) -> List[Tuple[Sha1, int]]:
+        return self._missing(
+            "directory_intrinsic_metadata",
+            metadata,
+            self.storage.directory_intrinsic_metadata_missing,
+        )
+
+    @timed
+    def directory_intrinsic_metadata_get(
+        self, ids: Iterable[Sha1]
+    ) -> List[DirectoryIntrinsicMetadataRow]:
+        return self._get(
+            "directory_intrinsic_metadata",
+            ids,
+            self.storage.directory_intrinsic_metadata_get,
+        )
+
+    @timed
+    def directory_intrinsic_metadata_add(
+        self, metadata: List[DirectoryIntrinsicMetadataRow]
+    ) -> Dict[str, int]:
+        return self._add(
+            "directory_intrinsic_metadata",
+            metadata,
+            self.storage.directory_intrinsic_metadata_add,
+        )
+
+    @timed
+    def origin_intrinsic_metadata_get(
+        self, urls: Iterable[str]
+    ) -> List[OriginIntrinsicMetadataRow]:
+        return self._get(
+            "origin_intrinsic_metadata",
+            urls,
+            self.storage.origin_intrinsic_metadata_get,
+        )
+
+    @timed
+    def origin_intrinsic_metadata_add(
+        self, metadata: List[OriginIntrinsicMetadataRow]
+    ) -> Dict[str, int]:
+        return self._add(
+            "origin_intrinsic_metadata",
+            metadata,
+            self.storage.origin_intrinsic_metadata_add,
+        )
+
+    @timed
+    def origin_extrinsic_metadata_get(
+        self, urls: Iterable[str]
+    ) -> List[OriginExtrinsicMetadataRow]:
+        return self._get(
+            "origin_extrinsic_metadata",
+            urls,
+            self.storage.origin_extrinsic_metadata_get,
+        )
+
+    @timed
+    def origin_extrinsic_metadata_add(
+        self, metadata: List[OriginExtrinsicMetadataRow]
+    ) -> Dict[str, int]:
+        return self._add(
+            "origin_extrinsic_metadata",
+            metadata,
+            self.storage.origin_extrinsic_metadata_add,
+        )
+
+    @timed
+    def indexer_configuration_add(self, tools):
+        results = self.storage.indexer_configuration_add(tools)
+        for tool in results:
+            self._tools.put(_tool_key(tool), dict(tool))
+        return results
+
+    @timed
+    def indexer_configuration_get(self, tool):
+        key = _tool_key(tool)
+        result = self._tools.get(key)
+        send_cache_metrics(
+            "indexer_configuration_get",
+            hits=int(result is not None),
+            misses=int(result is None),
+        )
+        if result is None:
+            result = self.storage.indexer_configuration_get(tool)
+            if result is None:
+                return None
+            self._tools.put(key, dict(result))
+        return dict(result)
+
+
+def _tool_key(tool: Dict[str, Any]) -> Tuple[str, str, str]:
+    configuration = tool["tool_configuration"]
+    if not isinstance(configuration, str):
+        configuration = json.dumps(configuration, sort_keys=True)
+    return (tool["tool_name"], tool["tool_version"], configuration)
@@ -102,6 +102,17 @@ comment on column origin_intrinsic_metadata.indexer_configuration_id is 'tool us
 comment on column origin_intrinsic_metadata.from_directory is 'sha1 of the directory this metadata was copied from.';
 comment on column origin_intrinsic_metadata.mappings is 'type of metadata files used to obtain this metadata (eg. pkg-info, npm)';
 
+create table origin_intrinsic_metadata_counter(
+  bucket  smallint  not null,
+  name    text      not null,
+  value   bigint    not null
+);
+
+comment on table origin_intrinsic_metadata_counter is 'running counts of origin_intrinsic_metadata rows, summed over buckets by origin_intrinsic_metadata_stats';
+comment on column origin_intrinsic_metadata_counter.bucket is 'spreads updates from concurrent writers over several rows';
+comment on column origin_intrinsic_metadata_counter.name is 'counted property: total, non_empty, or mapping:<name>';
+comment on column origin_intrinsic_metadata_counter.value is 'number of rows with this property in this bucket';
+
 create table origin_extrinsic_metadata(
   id                        text       not null,  -- origin url
   metadata                  jsonb,
@@ -268,20 +268,119 @@ $$;
 comment on function swh_origin_intrinsic_metadata_add() IS 'Add new origin intrinsic metadata';
 
 
--- Compute the metadata_tsvector column in tmp_origin_intrinsic_metadata.
+-- Compute the tsvector of a metadata document, for fulltext search.
 --
 -- It uses the "pg_catalog.simple" dictionary, as it has no stopword,
 -- so it should be suitable for proper names and non-English text.
+--
+-- Words of the name, keywords, and description are weighted A, B, and C
+-- respectively, so ts_rank favors documents matching in these fields;
+-- all words of the document (including these) are also present with the
+-- default weight D.
+create or replace function swh_metadata_compute_tsvector(metadata jsonb)
+    returns tsvector
+    language sql immutable
+as $$
+    select setweight(to_tsvector('pg_catalog.simple', coalesce(metadata->'name', 'null')), 'A')
+        || setweight(to_tsvector('pg_catalog.simple', coalesce(metadata->'keywords', 'null')), 'B')
+        || setweight(to_tsvector('pg_catalog.simple', coalesce(metadata->'description', 'null')), 'C')
+        || to_tsvector('pg_catalog.simple', metadata);
+$$;
+
+comment on function swh_metadata_compute_tsvector(jsonb) is 'Field-weighted tsvector of a metadata document';
+
+-- Compute the metadata_tsvector column in tmp_origin_intrinsic_metadata.
 create or replace function swh_origin_intrinsic_metadata_compute_tsvector()
     returns void
     language plpgsql
 as $$
 begin
     update tmp_origin_intrinsic_metadata
-        set metadata_tsvector = to_tsvector('pg_catalog.simple', metadata);
+        set metadata_tsvector = swh_metadata_compute_tsvector(metadata);
+end
+$$;
+
+-- Names of the origin_intrinsic_metadata_counter rows an
+-- origin_intrinsic_metadata row contributes to.
+create or replace function swh_origin_intrinsic_metadata_counter_names(metadata jsonb, mappings text[])
+    returns setof text
+    language sql immutable
+as $$
+    select 'total'
+    union all
+    select 'non_empty'
+    where ('{}'::jsonb @> (metadata - '@context')) is not true
+    union all
+    select distinct 'mapping:' || mapping
+    from unnest(mappings) as mapping;
+$$;
+
+comment on function swh_origin_intrinsic_metadata_counter_names(jsonb, text[]) is 'Counters an origin intrinsic metadata row contributes to';
+
+-- Statement-level trigger keeping origin_intrinsic_metadata_counter in sync
+-- with origin_intrinsic_metadata.
+--
+-- Counts are added to a bucket picked from the backend pid, so concurrent
+-- writers seldom wait on each other's counter rows; rows are upserted in a
+-- consistent order so they cannot deadlock either.
+create or replace function swh_origin_intrinsic_metadata_counter_update()
+    returns trigger
+    language plpgsql
+as $$
+declare
+  added origin_intrinsic_metadata[] := '{}';
+  removed origin_intrinsic_metadata[] := '{}';
+begin
+    if TG_OP in ('INSERT', 'UPDATE') then
+        added := array(select new_row from new_rows as new_row);
+    end if;
+    if TG_OP in ('UPDATE', 'DELETE') then
+        removed := array(select old_row from old_rows as old_row);
+    end if;
+
+    insert into origin_intrinsic_metadata_counter (bucket, name, value)
+    select pg_backend_pid() % 16, name, sum(delta)
+    from (
+        select 1 as delta, metadata, mappings from unnest(added)
+        union all
+        select -1 as delta, metadata, mappings from unnest(removed)
+    ) as changes
+    cross join lateral swh_origin_intrinsic_metadata_counter_names(changes.metadata, changes.mappings) as name
+    group by name
+    having sum(delta) <> 0
+    order by name
+    on conflict (bucket, name)
+    do update set
+        value = origin_intrinsic_metadata_counter.value + excluded.value;
+
+    return null;
+end
+$$;
+
+comment on function swh_origin_intrinsic_metadata_counter_update() IS 'Update origin intrinsic metadata counters after a change';
+
+-- Recompute origin_intrinsic_metadata_counter from scratch.
+--
+-- Writes to origin_intrinsic_metadata are blocked while this runs.
+create or replace function swh_origin_intrinsic_metadata_counter_rebuild()
+    returns void
+    language plpgsql
+as $$
+begin
+    lock table origin_intrinsic_metadata in share mode;
+
+    delete from origin_intrinsic_metadata_counter;
+
+    insert into origin_intrinsic_metadata_counter (bucket, name, value)
+    select 0, name, count(*)
+    from origin_intrinsic_metadata
+    cross join lateral swh_origin_intrinsic_metadata_counter_names(metadata, mappings) as name
+    group by name;
 end
 $$;
 
+comment on function swh_origin_intrinsic_metadata_counter_rebuild() IS 'Recompute origin intrinsic metadata counters';
+
 -- create a temporary table for retrieving origin_extrinsic_metadata
 create or replace function swh_mktemp_origin_extrinsic_metadata()
     returns void
@@ -343,16 +442,13 @@ comment on function swh_origin_extrinsic_metadata_add() IS 'Add new origin extri
 
 
 -- Compute the metadata_tsvector column in tmp_origin_extrinsic_metadata.
---
--- It uses the "pg_catalog.simple" dictionary, as it has no stopword,
--- so it should be suitable for proper names and non-English text.
 create or replace function swh_origin_extrinsic_metadata_compute_tsvector()
     returns void
     language plpgsql
 as $$
 begin
     update tmp_origin_extrinsic_metadata
-        set metadata_tsvector = to_tsvector('pg_catalog.simple', metadata);
+        set metadata_tsvector = swh_metadata_compute_tsvector(metadata);
 end
 $$;
 
@@ -53,6 +53,10 @@ alter table origin_intrinsic_metadata validate constraint origin_intrinsic_metad
 create index origin_intrinsic_metadata_fulltext_idx on origin_intrinsic_metadata using gin (metadata_tsvector);
 create index origin_intrinsic_metadata_mappings_idx on origin_intrinsic_metadata using gin (mappings);
 
+-- origin_intrinsic_metadata_counter
+create unique index origin_intrinsic_metadata_counter_pkey on origin_intrinsic_metadata_counter(bucket, name);
+alter table origin_intrinsic_metadata_counter add primary key using index origin_intrinsic_metadata_counter_pkey;
+
 -- origin_extrinsic_metadata
 create unique index origin_extrinsic_metadata_pkey on origin_extrinsic_metadata(id, indexer_configuration_id);
 alter table origin_extrinsic_metadata add primary key using index origin_extrinsic_metadata_pkey;
@@ -0,0 +1,18 @@
+-- origin_intrinsic_metadata_counter
+create trigger origin_intrinsic_metadata_counter_insert
+  after insert on origin_intrinsic_metadata
+  referencing new table as new_rows
+  for each statement
+  execute function swh_origin_intrinsic_metadata_counter_update();
+
+create trigger origin_intrinsic_metadata_counter_update
+  after update on origin_intrinsic_metadata
+  referencing old table as old_rows new table as new_rows
+  for each statement
+  execute function swh_origin_intrinsic_metadata_counter_update();
+
+create trigger origin_intrinsic_metadata_counter_delete
+  after delete on origin_intrinsic_metadata
+  referencing old table as old_rows
+  for each statement
+  execute function swh_origin_intrinsic_metadata_counter_update();
@@ -0,0 +1,118 @@
+-- SWH Indexer DB schema upgrade
+-- from_version: 137
+-- to_version: 138
+-- description: Maintain origin_intrinsic_metadata counters for stats
+
+create table origin_intrinsic_metadata_counter(
+  bucket  smallint  not null,
+  name    text      not null,
+  value   bigint    not null
+);
+
+comment on table origin_intrinsic_metadata_counter is 'running counts of origin_intrinsic_metadata rows, summed over buckets by origin_intrinsic_metadata_stats';
+comment on column origin_intrinsic_metadata_counter.bucket is 'spreads updates from concurrent writers over several rows';
+comment on column origin_intrinsic_metadata_counter.name is 'counted property: total, non_empty, or mapping:<name>';
+comment on column origin_intrinsic_metadata_counter.value is 'number of rows with this property in this bucket';
+
+create unique index origin_intrinsic_metadata_counter_pkey on origin_intrinsic_metadata_counter(bucket, name);
+alter table origin_intrinsic_metadata_counter add primary key using index origin_intrinsic_metadata_counter_pkey;
+-- Names of the origin_intrinsic_metadata_counter rows an
+-- origin_intrinsic_metadata row contributes to.
+create or replace function swh_origin_intrinsic_metadata_counter_names(metadata jsonb, mappings text[])
+    returns setof text
+    language sql immutable
+as $$
+    select 'total'
+    union all
+    select 'non_empty'
+    where ('{}'::jsonb @> (metadata - '@context')) is not true
+    union all
+    select distinct 'mapping:' || mapping
+    from unnest(mappings) as mapping;
+$$;
+
+comment on function swh_origin_intrinsic_metadata_counter_names(jsonb, text[]) is 'Counters an origin intrinsic metadata row contributes to';
+
+-- Statement-level trigger keeping origin_intrinsic_metadata_counter in sync
+-- with origin_intrinsic_metadata.
+--
+-- Counts are added to a bucket picked from the backend pid, so concurrent
+-- writers seldom wait on each other's counter rows; rows are upserted in a
+-- consistent order so they cannot deadlock either.
+create or replace function swh_origin_intrinsic_metadata_counter_update()
+    returns trigger
+    language plpgsql
+as $$
+declare
+  added origin_intrinsic_metadata[] := '{}';
+  removed origin_intrinsic_metadata[] := '{}';
+begin
+    if TG_OP in ('INSERT', 'UPDATE') then
+        added := array(select new_row from new_rows as new_row);
+    end if;
+    if TG_OP in ('UPDATE', 'DELETE') then
+        removed := array(select old_row from old_rows as old_row);
+    end if;
+
+    insert into origin_intrinsic_metadata_counter (bucket, name, value)
+    select pg_backend_pid() % 16, name, sum(delta)
+    from (
+        select 1 as delta, metadata, mappings from unnest(added)
+        union all
+        select -1 as delta, metadata, mappings from unnest(removed)
+    ) as changes
+    cross join lateral swh_origin_intrinsic_metadata_counter_names(changes.metadata, changes.mappings) as name
+    group by name
+    having sum(delta) <> 0
+    order by name
+    on conflict (bucket, name)
+    do update set
+        value = origin_intrinsic_metadata_counter.value + excluded.value;
+
+    return null;
+end
+$$;
+
+comment on function swh_origin_intrinsic_metadata_counter_update() IS 'Update origin intrinsic metadata counters after a change';
+
+-- Recompute origin_intrinsic_metadata_counter from scratch.
+--
+-- Writes to origin_intrinsic_metadata are blocked while this runs.
+create or replace function swh_origin_intrinsic_metadata_counter_rebuild()
+    returns void
+    language plpgsql
+as $$
+begin
+    lock table origin_intrinsic_metadata in share mode;
+
+    delete from origin_intrinsic_metadata_counter;
+
+    insert into origin_intrinsic_metadata_counter (bucket, name, value)
+    select 0, name, count(*)
+    from origin_intrinsic_metadata
+    cross join lateral swh_origin_intrinsic_metadata_counter_names(metadata, mappings) as name
+    group by name;
+end
+$$;
+
+comment on function swh_origin_intrinsic_metadata_counter_rebuild() IS 'Recompute origin intrinsic metadata counters';
+
+create trigger origin_intrinsic_metadata_counter_insert
+  after insert on origin_intrinsic_metadata
+  referencing new table as new_rows
+  for each statement
+  execute function swh_origin_intrinsic_metadata_counter_update();
+
+create trigger origin_intrinsic_metadata_counter_update
+  after update on origin_intrinsic_metadata
+  referencing old table as old_rows new table as new_rows
+  for each statement
+  execute function swh_origin_intrinsic_metadata_counter_update();
+
+create trigger origin_intrinsic_metadata_counter_delete
+  after delete on origin_intrinsic_metadata
+  referencing old table as old_rows
+  for each statement
+  execute function swh_origin_intrinsic_metadata_counter_update();
+
+select swh_origin_intrinsic_metadata_counter_rebuild();
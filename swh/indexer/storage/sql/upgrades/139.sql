@@ -0,0 +1,48 @@
+-- SWH Indexer DB schema upgrade
+-- from_version: 138
+-- to_version: 139
+-- description: Weight the name, keywords, and description of metadata in tsvectors
+
+create or replace function swh_metadata_compute_tsvector(metadata jsonb)
+    returns tsvector
+    language sql immutable
+as $$
+    select setweight(to_tsvector('pg_catalog.simple', coalesce(metadata->'name', 'null')), 'A')
+        || setweight(to_tsvector('pg_catalog.simple', coalesce(metadata->'keywords', 'null')), 'B')
+        || setweight(to_tsvector('pg_catalog.simple', coalesce(metadata->'description', 'null')), 'C')
+        || to_tsvector('pg_catalog.simple', metadata);
+$$;
+
+comment on function swh_metadata_compute_tsvector(jsonb) is 'Field-weighted tsvector of a metadata document';
+
+create or replace function swh_origin_intrinsic_metadata_compute_tsvector()
+    returns void
+    language plpgsql
+as $$
+begin
+    update tmp_origin_intrinsic_metadata
+        set metadata_tsvector = swh_metadata_compute_tsvector(metadata);
+end
+$$;
+
+create or replace function swh_origin_extrinsic_metadata_compute_tsvector()
+    returns void
+    language plpgsql
+as $$
+begin
+    update tmp_origin_extrinsic_metadata
+        set metadata_tsvector = swh_metadata_compute_tsvector(metadata);
+end
+$$;
+
+-- this does not change any counted property, so there is no need to pay for
+-- the counter trigger's transition tables
+alter table origin_intrinsic_metadata disable trigger origin_intrinsic_metadata_counter_update;
+
+update origin_intrinsic_metadata
+    set metadata_tsvector = swh_metadata_compute_tsvector(metadata);
+
+alter table origin_intrinsic_metadata enable trigger origin_intrinsic_metadata_counter_update;
+
+update origin_extrinsic_metadata
+    set metadata_tsvector = swh_metadata_compute_tsvector(metadata);
@@ -0,0 +1,367 @@
+# Copyright (C) 2026  The Software Heritage developers
+# See the AUTHORS file at the top-level directory of this distribution
+# License: GNU General Public License version 3, or any later version
+# See top-level LICENSE file for more information
+
+import bisect
+from collections import OrderedDict
+import itertools
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+TKey = TypeVar("TKey", bound=Hashable)
+TValue = TypeVar("TValue")
+
+
+class LRUCache(Generic[TKey, TValue]):
+    """A thread-safe mapping holding at most ``maxsize`` items, which evicts the
+    least recently used one when full; and, if ``ttl`` is not None, expires
+    items ``ttl`` seconds after they were added.
+
+    :meth:`clear` and :meth:`pop` bump :attr:`generation`; readers can get
+    it before computing a value, and pass it to :meth:`put`, so that a value
+    computed before the cache was cleared (or an item removed) is not added
+    after it.
+
+    >>> cache = LRUCache(maxsize=2)
+    >>> cache.put("a", 1)
+    >>> cache.put("b", 2)
+    >>> cache.get("a")
+    1
+    >>> cache.put("c", 3)  # evicts "b", the least recently used item
+    >>> (cache.get("a"), cache.get("b"), cache.get("c"))
+    (1, None, 3)
+    >>> generation = cache.generation
+    >>> cache.clear()
+    >>> cache.put("d", 4, generation=generation)  # outdated, ignored
+    >>> (len(cache), cache.get("d"))
+    (0, None)
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self._items: OrderedDict[TKey, Tuple[float, TValue]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: TKey, default: Optional[TValue] = None) -> Optional[TValue]:
+        with self._lock:
+            try:
+                (added_at, value) = self._items[key]
+            except KeyError:
+                return default
+            if self.ttl is not None and time.monotonic() - added_at > self.ttl:
+                del self._items[key]
+                return default
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key: TKey, value: TValue, generation: Optional[int] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._items[key] = (time.monotonic(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def pop(self, key: TKey) -> None:
+        with self._lock:
+            self.generation += 1
+            self._items.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._items.clear()
+
+
+class FixedSizeKeys:
+    """A list of bytes strings which all have the same size, stored contiguously
+    in a :class:`bytearray` instead of one Python object each; or in a read-only
+    buffer whose slices are :class:`bytes`, like a :class:`mmap.mmap`.
+
+    >>> keys = FixedSizeKeys(2)
+    >>> keys.append(b"ab")
+    >>> keys.append(b"cd")
+    >>> (len(keys), keys[1], keys[-1], list(keys))
+    (2, b'cd', b'cd', [b'ab', b'cd'])
+    >>> keys.append(b"e")
+    Traceback (most recent call last):
+      ...
+    ValueError: b'e' is not 2 bytes long
+    """
+
+    def __init__(self, key_size: int, buffer: Optional[Any] = None) -> None:
+        self.key_size = key_size
+        self._buffer = bytearray() if buffer is None else buffer
+
+    def __len__(self) -> int:
+        return len(self._buffer) // self.key_size
+
+    def __getitem__(self, index: int) -> bytes:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        start = index * self.key_size
+        return bytes(self._buffer[start : start + self.key_size])
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self.iter_from(0)
+
+    def iter_from(self, index: int) -> Iterator[bytes]:
+        """Yields keys from ``self[index]`` onwards."""
+        (buffer, key_size) = (self._buffer, self.key_size)
+        for start in range(index * key_size, len(buffer), key_size):
+            yield bytes(buffer[start : start + key_size])
+
+    def bisect_left(self, key: bytes, lo: int = 0) -> int:
+        """Same as :func:`bisect.bisect_left`, without building an object for
+        each key compared to ``key``."""
+        (buffer, key_size, hi) = (self._buffer, self.key_size, len(self))
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if buffer[mid * key_size : (mid + 1) * key_size] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def append(self, key: bytes) -> None:
+        if len(key) != self.key_size:
+            raise ValueError(f"{key!r} is not {self.key_size} bytes long")
+        self._buffer += key
+
+    def extend_from(self, other: "FixedSizeKeys", start: int, stop: int) -> None:
+        """Appends ``other[start:stop]``, without building intermediate objects."""
+        self._buffer += other._buffer[start * self.key_size : stop * self.key_size]
+
+    def tobytes(self) -> bytes:
+        return bytes(self._buffer)
+
+
+class _KeyList(list):
+    def bisect_left(self, key: Any, lo: int = 0) -> int:
+        return bisect.bisect_left(self, key, lo)
+
+    def iter_from(self, index: int) -> Iterator[Any]:
+        return itertools.islice(self, index, None)
+
+    def extend_from(self, other: List, start: int, stop: int) -> None:
+        self.extend(other[start:stop])
+
+
+class LazyList(Generic[TValue]):
+    """A list of items decoded on access from slices of a buffer (typically a
+    :class:`mmap.mmap`), where ``item[i]`` is
+    ``decode(buffer[offsets[i]:offsets[i + 1]])``. Items can be replaced, but
+    not added.
+
+    >>> items = LazyList(b"onetwo", [0, 3, 6], bytes.upper)
+    >>> items[1] = b"2"
+    >>> (len(items), items[0], items[1], items[0:2])
+    (2, b'ONE', b'2', [b'ONE', b'2'])
+    """
+
+    def __init__(
+        self, buffer: Any, offsets: Sequence[int], decode: Callable[[bytes], TValue]
+    ) -> None:
+        self._buffer = buffer
+        self._offsets = offsets
+        self._decode = decode
+        self._replaced: Dict[int, TValue] = {}
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        try:
+            return self._replaced[index]
+        except KeyError:
+            pass
+        return self._decode(
+            self._buffer[self._offsets[index] : self._offsets[index + 1]]
+        )
+
+    def __setitem__(self, index: int, value: TValue) -> None:
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        self._replaced[index] = value
+
+    def __iter__(self) -> Iterator[TValue]:
+        for i in range(len(self)):
+            yield self[i]
+
+
+class SortedMapping(Generic[TKey, TValue]):
+    """A mapping which can be iterated in order of its keys, from any key.
+
+    Keys are stored in a sorted array (a :class:`FixedSizeKeys` if ``key_size``
+    is given), searched by bisection, and values in a parallel list; so an item
+    costs little more than its value. To keep insertions cheap, new keys are
+    first buffered in a dict, which is merged into the arrays when an ordered
+    read needs it, or when it grows past a fraction of the arrays' size.
+
+    >>> mapping = SortedMapping(key_size=1)
+    >>> for key in [b"c", b"a", b"d", b"b"]:
+    ...     mapping[key] = key.upper()
+    >>> mapping[b"a"] = b"A2"
+    >>> (len(mapping), mapping.get(b"a"), mapping.get(b"e"), b"c" in mapping)
+    (4, b'A2', None, True)
+    >>> list(mapping.iter_from(b"b"))
+    [(b'b', b'B'), (b'c', b'C'), (b'd', b'D')]
+    """
+
+    MIN_PENDING = 1024
+    """Number of new keys which can always be buffered before merging them"""
+
+    PENDING_RATIO = 8
+    """Buffered keys are merged when there are more than ``1/PENDING_RATIO``
+    times as many as merged keys, so each key is copied a bounded number of
+    times on average."""
+
+    def __init__(self, key_size: Optional[int] = None) -> None:
+        self.key_size = key_size
+        self._keys: Any = self._new_keys()
+        self._values: Any = []
+        self._pending: Dict[TKey, TValue] = {}
+
+    @classmethod
+    def from_sorted(
+        cls,
+        keys: Union[FixedSizeKeys, List[TKey]],
+        values: Union[List[TValue], LazyList[TValue]],
+    ) -> "SortedMapping[TKey, TValue]":
+        """Builds a mapping from a sorted list of distinct keys, and the list of
+        their values; like those returned by :meth:`sorted_items`. The mapping
+        uses these lists instead of copying them, so ``values`` may be a
+        :class:`LazyList` whose items are only decoded when read (or when
+        enough keys are added to be merged with them)."""
+        if isinstance(keys, FixedSizeKeys):
+            mapping = cls(key_size=keys.key_size)
+            mapping._keys = keys
+        else:
+            mapping = cls()
+            mapping._keys = _KeyList(keys)
+        mapping._values = values
+        return mapping
+
+    def sorted_items(self) -> Tuple[Union[FixedSizeKeys, List[TKey]], Sequence[TValue]]:
+        """Returns the list of keys, in increasing order, and the list of their
+        values. They must not be modified."""
+        self._merge()
+        return (self._keys, self._values)
+
+    def _new_keys(self) -> Union[FixedSizeKeys, _KeyList]:
+        if self.key_size is None:
+            return _KeyList()
+        else:
+            return FixedSizeKeys(self.key_size)
+
+    def _index(self, key: TKey) -> Optional[int]:
+        index = self._keys.bisect_left(key)
+        if index < len(self._keys) and self._keys[index] == key:
+            return index
+        return None
+
+    def __len__(self) -> int:
+        return len(self._keys) + len(self._pending)
+
+    def __contains__(self, key: TKey) -> bool:
+        return key in self._pending or self._index(key) is not None
+
+    def get(self, key: TKey, default: Optional[TValue] = None) -> Optional[TValue]:
+        try:
+            return self._pending[key]
+        except KeyError:
+            pass
+        index = self._index(key)
+        if index is None:
+            return default
+        return self._values[index]
+
+    def __setitem__(self, key: TKey, value: TValue) -> None:
+        self.update(key, lambda _: value)
+
+    def update(self, key: TKey, func: Callable[[Optional[TValue]], TValue]) -> None:
+        """Sets the value of ``key`` to ``func(value)``, where ``value`` is its
+        current value or :const:`None`; with a single lookup."""
+        if key in self._pending:
+            self._pending[key] = func(self._pending[key])
+            return
+        index = self._index(key)
+        if index is not None:
+            self._values[index] = func(self._values[index])
+            return
+        self._pending[key] = func(None)
+        if len(self._pending) > max(
+            self.MIN_PENDING, len(self._keys) // self.PENDING_RATIO
+        ):
+            self._merge()
+
+    def _merge(self) -> None:
+        if not self._pending:
+            return
+        (old_keys, old_values) = (self._keys, self._values)
+        keys: Any = self._new_keys()
+        values: List[TValue] = []
+        start = 0
+        for key, value in sorted(self._pending.items()):
+            index = old_keys.bisect_left(key, start)
+            keys.extend_from(old_keys, start, index)
+            values.extend(old_values[start:index])
+            keys.append(key)
+            values.append(value)
+            start = index
+        keys.extend_from(old_keys, start, len(old_keys))
+        values.extend(old_values[start:])
+        (self._keys, self._values, self._pending) = (keys, values, {})
+
+    def __iter__(self) -> Iterator[TKey]:
+        return self.iter_keys_from()
+
+    def iter_from(self, start: Optional[TKey] = None) -> Iterator[Tuple[TKey, TValue]]:
+        """Yields ``(key, value)`` pairs in increasing order of keys, starting
+        from the first key greater than or equal to ``start``, if given.
+
+        Items must not be added while iterating."""
+        index = self._seek(start)
+        yield from zip(
+            self._keys.iter_from(index), itertools.islice(self._values, index, None)
+        )
+
+    def iter_keys_from(self, start: Optional[TKey] = None) -> Iterator[TKey]:
+        """Same as :meth:`iter_from`, but only yields keys."""
+        index = self._seek(start)  # may replace self._keys
+        return self._keys.iter_from(index)
+
+    def _seek(self, start: Optional[TKey]) -> int:
+        self._merge()
+        if start is None:
+            return 0
+        return self._keys.bisect_left(start)
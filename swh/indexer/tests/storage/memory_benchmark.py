@@ -0,0 +1,86 @@
+# Copyright (C) 2026  The Software Heritage developers
+# See the AUTHORS file at the top-level directory of this distribution
+# License: GNU General Public License version 3, or any later version
+# See top-level LICENSE file for more information
+
+"""Measures the memory used by the in-memory indexer storage to hold mimetype
+rows; run with::
+
+    python -m swh.indexer.tests.storage.memory_benchmark --rows 1000000
+"""
+
+import argparse
+import gc
+import hashlib
+import time
+import tracemalloc
+from typing import Tuple
+
+from swh.indexer.storage import get_indexer_storage
+from swh.indexer.storage.model import ContentMimetypeRow
+
+MIMETYPES = [
+    (b"text/plain", b"us-ascii"),
+    (b"text/x-python", b"utf-8"),
+    (b"application/octet-stream", b"binary"),
+    (b"image/png", b"binary"),
+]
+
+
+def measure_content_mimetype(nb_rows: int, batch_size: int = 1000) -> Tuple[int, float]:
+    """Adds ``nb_rows`` mimetype rows to an in-memory storage, by batches of
+    ``batch_size``, and returns the memory it retains (in bytes) and the time it
+    took (in seconds)."""
+    storage = get_indexer_storage("memory")
+    (tool,) = storage.indexer_configuration_add(
+        [
+            {
+                "tool_name": "file",
+                "tool_version": "5.22",
+                "tool_configuration": {"command_line": "file --mime <filepath>"},
+            }
+        ]
+    )
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        start_time = time.monotonic()
+        for batch_start in range(0, nb_rows, batch_size):
+            rows = []
+            for i in range(batch_start, min(batch_start + batch_size, nb_rows)):
+                (mimetype, encoding) = MIMETYPES[i % len(MIMETYPES)]
+                rows.append(
+                    ContentMimetypeRow(
+                        id=hashlib.sha1(str(i).encode()).digest(),
+                        # decoded like rows received by the RPC server
+                        mimetype=mimetype.decode(),
+                        encoding=encoding.decode(),
+                        indexer_configuration_id=tool["id"],
+                    )
+                )
+            storage.content_mimetype_add(rows)
+        duration = time.monotonic() - start_time
+        del rows
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+    return (retained, duration)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    (retained, duration) = measure_content_mimetype(args.rows, args.batch_size)
+    print(f"{args.rows} rows added in {duration:.2f}s")
+    print(f"{retained / 2**20:.1f} MiB retained, {retained / args.rows:.1f} bytes/row")
+
+
+if __name__ == "__main__":
+    main()
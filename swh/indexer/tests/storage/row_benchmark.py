@@ -0,0 +1,120 @@
+# Copyright (C) 2026  The Software Heritage developers
+# See the AUTHORS file at the top-level directory of this distribution
+# License: GNU General Public License version 3, or any later version
+# See top-level LICENSE file for more information
+
+"""Measures the time taken by common operations on indexer storage rows; run
+with::
+
+    python -m swh.indexer.tests.storage.row_benchmark --rows 100000
+"""
+
+import argparse
+import timeit
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import attr
+
+from swh.core.api.serializers import msgpack_dumps, msgpack_loads
+from swh.indexer.storage.api.serializers import DECODERS, ENCODERS
+from swh.indexer.storage.model import (
+    BaseRow,
+    ContentMimetypeRow,
+    OriginIntrinsicMetadataRow,
+    RowBatch,
+    attach_tools,
+)
+
+TOOL = {
+    "name": "swh-metadata-detector",
+    "version": "0.0.2",
+    "configuration": {"type": "local", "context": "NpmMapping"},
+}
+
+
+def mimetype_rows(nb_rows: int) -> List[ContentMimetypeRow]:
+    return [
+        ContentMimetypeRow(
+            id=i.to_bytes(20, "big"),
+            mimetype="text/plain",
+            encoding="utf-8",
+            indexer_configuration_id=1,
+        )
+        for i in range(nb_rows)
+    ]
+
+
+def origin_intrinsic_metadata_rows(nb_rows: int) -> List[OriginIntrinsicMetadataRow]:
+    return [
+        OriginIntrinsicMetadataRow(
+            id=f"https://example.org/{i}",
+            metadata={"name": f"project {i}", "keywords": ["foo", "bar"]},
+            from_directory=i.to_bytes(20, "big"),
+            mappings=["npm"],
+            indexer_configuration_id=1,
+        )
+        for i in range(nb_rows)
+    ]
+
+
+def benchmarks(
+    name: str, make_rows: Callable[[int], Sequence[BaseRow]], nb_rows: int
+) -> Dict[str, Callable[[], object]]:
+    rows = make_rows(nb_rows)
+    dicts = [row.to_dict() for row in rows]
+    row_class = type(rows[0])
+    encoded = msgpack_dumps(rows, extra_encoders=ENCODERS)
+    batch = RowBatch.from_rows(rows)
+    encoded_batch = msgpack_dumps(batch, extra_encoders=ENCODERS)
+
+    return {
+        f"{name}: construct": lambda: make_rows(nb_rows),
+        f"{name}: to_dict": lambda: [row.to_dict() for row in rows],
+        f"{name}: from_dict": lambda: [row_class.from_dict(d) for d in dicts],
+        f"{name}: evolve": lambda: [
+            attr.evolve(row, tool=TOOL, indexer_configuration_id=None) for row in rows
+        ],
+        f"{name}: attach_tools": lambda: attach_tools(rows, lambda tool_id: TOOL),
+        f"{name}: RPC encode": lambda: msgpack_dumps(rows, extra_encoders=ENCODERS),
+        f"{name}: RPC decode": lambda: msgpack_loads(encoded, extra_decoders=DECODERS),
+        f"{name}: RPC encode (batch)": lambda: msgpack_dumps(
+            RowBatch.from_rows(rows), extra_encoders=ENCODERS
+        ),
+        f"{name}: RPC decode (batch)": lambda: msgpack_loads(
+            encoded_batch, extra_decoders=DECODERS
+        ),
+        f"{name}: to_dicts (batch)": lambda: batch.to_dicts(),
+        f"{name}: attach_tools (batch)": lambda: attach_tools(
+            batch, lambda tool_id: TOOL
+        ),
+    }
+
+
+def run(nb_rows: int, repeat: int = 3) -> Dict[str, float]:
+    """Returns the best time taken (in seconds) by each benchmark, on
+    ``nb_rows`` rows."""
+    row_types: List[Tuple[str, Callable[[int], Sequence[BaseRow]]]] = [
+        ("content_mimetype", mimetype_rows),
+        ("origin_intrinsic_metadata", origin_intrinsic_metadata_rows),
+    ]
+    results = {}
+    for name, make_rows in row_types:
+        for benchmark_name, benchmark in benchmarks(name, make_rows, nb_rows).items():
+            results[benchmark_name] = min(
+                timeit.repeat(benchmark, number=1, repeat=repeat)
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for name, duration in run(args.rows, args.repeat).items():
+        print(f"{name:<45} {duration * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# Copyright (C) 2026  The Software Heritage developers
+# See the AUTHORS file at the top-level directory of this distribution
+# License: GNU General Public License version 3, or any later version
+# See top-level LICENSE file for more information
+
+"""Measures the bytes sent and received, and the time taken, by RPC calls to
+an in-memory indexer storage served on localhost; run with::
+
+    python -m swh.indexer.tests.storage.rpc_benchmark --rows 10000
+"""
+
+import argparse
+import contextlib
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Tuple
+
+from werkzeug.serving import make_server
+
+from swh.indexer.storage import get_indexer_storage
+from swh.indexer.storage.api import server
+from swh.indexer.storage.api.client import RemoteStorage
+from swh.indexer.storage.interface import IndexerStorageInterface
+from swh.indexer.storage.model import OriginIntrinsicMetadataRow
+
+TOOL = {
+    "tool_name": "swh-metadata-detector",
+    "tool_version": "0.0.2",
+    "tool_configuration": {"type": "local", "context": "NpmMapping"},
+}
+
+WORDS = "software heritage archive source code metadata indexer origin".split()
+
+CONFIGURATIONS: Dict[str, Dict[str, Any]] = {
+    "rows": {"row_batches": False, "compression": False},
+    "row batches": {"compression": False},
+    "row batches, compressed": {"compression_min_size": 1024},
+}
+"""Arguments of :class:`RemoteStorage` for each benchmark; responses are
+compressed when requests are."""
+
+
+def origin_intrinsic_metadata_rows(
+    nb_rows: int, tool_id: int, description_size: int
+) -> List[OriginIntrinsicMetadataRow]:
+    return [
+        OriginIntrinsicMetadataRow(
+            id=f"https://example.org/{i}",
+            metadata={
+                "name": f"project {i}",
+                "description": " ".join(
+                    WORDS[(i + j) % len(WORDS)] for j in range(description_size)
+                ),
+                "keywords": WORDS[: i % len(WORDS)],
+            },
+            from_directory=i.to_bytes(20, "big"),
+            mappings=["npm"],
+            indexer_configuration_id=tool_id,
+        )
+        for i in range(nb_rows)
+    ]
+
+
+class _ByteCounter:
+    """WSGI middleware counting the bytes of request and response bodies, as
+    sent on the wire"""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.received = self.sent = 0
+
+    def __call__(self, environ, start_response):
+        self.received += int(environ.get("CONTENT_LENGTH") or 0)
+        for chunk in self.wsgi_app(environ, start_response):
+            self.sent += len(chunk)
+            yield chunk
+
+
+@contextlib.contextmanager
+def serve() -> Iterator[Tuple[str, _ByteCounter]]:
+    """Serves an in-memory indexer storage on localhost, and yields its URL
+    and the counter of its bytes."""
+    server.storage = get_indexer_storage("memory")  # type: ignore[assignment]
+    counter = _ByteCounter(server.app.wsgi_app)
+    http_server = make_server("127.0.0.1", 0, counter, threaded=True)
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield (f"http://127.0.0.1:{http_server.server_port}/", counter)
+    finally:
+        http_server.shutdown()
+        thread.join()
+        server.storage = None
+
+
+def run(
+    nb_rows: int, batch_size: int, description_size: int
+) -> Dict[str, Dict[str, float]]:
+    """Adds then gets ``nb_rows`` origin intrinsic metadata rows with each
+    configuration, and returns the bytes sent, received, and the duration of
+    each call."""
+    results = {}
+    for name, kwargs in CONFIGURATIONS.items():
+        with serve() as (url, counter):
+            server.app.config["compression"] = (
+                {"min_size": 1024} if kwargs.get("compression", True) else None
+            )
+            storage: IndexerStorageInterface = RemoteStorage(  # type: ignore
+                url=url, **kwargs
+            )
+            (tool,) = storage.indexer_configuration_add([TOOL])
+            rows = origin_intrinsic_metadata_rows(nb_rows, tool["id"], description_size)
+            ids = [row.id for row in rows]
+            (counter.received, counter.sent) = (0, 0)
+
+            start = time.perf_counter()
+            for i in range(0, nb_rows, batch_size):
+                storage.origin_intrinsic_metadata_add(rows[i : i + batch_size])
+            add_duration = time.perf_counter() - start
+            add_bytes = (counter.received, counter.sent)
+
+            start = time.perf_counter()
+            for i in range(0, nb_rows, batch_size):
+                storage.origin_intrinsic_metadata_get(ids[i : i + batch_size])
+            get_duration = time.perf_counter() - start
+
+            results[name] = {
+                "add: request bytes": add_bytes[0],
+                "add: duration (s)": add_duration,
+                "get: response bytes": counter.sent - add_bytes[1],
+                "get: duration (s)": get_duration,
+            }
+        server.app.config.pop("compression", None)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument(
+        "--description-size",
+        type=int,
+        default=200,
+        help="number of words in the description of each metadata document",
+    )
+    args = parser.parse_args()
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    for name, measures in run(
+        args.rows, args.batch_size, args.description_size
+    ).items():
+        for measure, value in measures.items():
+            formatted = f"{value:.3f}" if isinstance(value, float) else f"{value:,}"
+            print(f"{name + ': ' + measure:<50} {formatted:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,13 +3,18 @@
 # License: GNU General Public License version 3, or any later version
 # See top-level LICENSE file for more information
 
+import gzip
+
 import psycopg
 import pytest
 
 from swh.core.api import RemoteException, TransientRemoteException
+from swh.core.api.serializers import msgpack_dumps, msgpack_loads
 from swh.indexer.storage import get_indexer_storage
+from swh.indexer.storage.api import compression
 from swh.indexer.storage.api.client import RemoteStorage
 import swh.indexer.storage.api.server as server
+from swh.indexer.storage.model import ContentMimetypeRow, RowBatch
 
 from .test_storage import *  # noqa
 
@@ -99,3 +104,134 @@ def test_querycancelled_exception(app_server, swh_indexer_storage, mocker):
     with pytest.raises(RemoteException) as excinfo:
         swh_indexer_storage.content_mimetype_get([b"\x01" * 20])
     assert not isinstance(excinfo.value, TransientRemoteException)
+
+
+@pytest.mark.parametrize("row_batches", [True, False])
+def test_add_row_batch(app_server, swh_indexer_storage, mocker, row_batches):
+    """Checks lists of rows are sent as a :class:`RowBatch`, unless disabled,
+    and are added all the same."""
+    swh_indexer_storage.row_batches = row_batches
+    tool_id = swh_indexer_storage.indexer_configuration_add(
+        [{"tool_name": "file", "tool_version": "1", "tool_configuration": {}}]
+    )[0]["id"]
+    rows = [
+        ContentMimetypeRow(
+            id=bytes([i]) * 20,
+            mimetype="text/plain",
+            encoding="utf-8",
+            indexer_configuration_id=tool_id,
+        )
+        for i in range(3)
+    ]
+    add = mocker.spy(app_server.storage, "content_mimetype_add")
+
+    assert swh_indexer_storage.content_mimetype_add(rows) == {"content_mimetype:add": 3}
+    assert isinstance(add.call_args[1]["mimetypes"], RowBatch) == row_batches
+    assert [
+        row.id
+        for row in swh_indexer_storage.content_mimetype_get([row.id for row in rows])
+    ] == [row.id for row in rows]
+
+
+def _mimetype_rows(storage, nb_rows):
+    tool_id = storage.indexer_configuration_add(
+        [{"tool_name": "file", "tool_version": "1", "tool_configuration": {}}]
+    )[0]["id"]
+    return [
+        ContentMimetypeRow(
+            id=i.to_bytes(20, "big"),
+            mimetype="text/plain",
+            encoding="utf-8",
+            indexer_configuration_id=tool_id,
+        )
+        for i in range(nb_rows)
+    ]
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_request_compression(app_server, swh_indexer_storage, mocker, enabled):
+    """Checks requests are compressed once the server advertised it supports
+    it, unless disabled"""
+    swh_indexer_storage.compression = enabled
+    swh_indexer_storage.compression_min_size = 100
+    decompress = mocker.spy(compression, "decompress")
+
+    rows = _mimetype_rows(swh_indexer_storage, 10)  # advertises encodings
+    assert swh_indexer_storage.content_mimetype_add(rows) == {
+        "content_mimetype:add": 10
+    }
+    assert decompress.call_count == (1 if enabled else 0)
+    assert swh_indexer_storage.content_mimetype_get([rows[0].id]) != []
+    assert decompress.call_count == (1 if enabled else 0)  # below min size
+
+
+def test_request_compression_unsupported(app_server, swh_indexer_storage, mocker):
+    """Checks requests are sent again without compression if the server
+    rejects their encoding"""
+    swh_indexer_storage.compression_min_size = 0
+    rows = _mimetype_rows(swh_indexer_storage, 10)
+    mocker.patch(
+        "swh.indexer.storage.api.client.compress", side_effect=lambda data, _: data
+    )
+    swh_indexer_storage._request_encoding = "unknown"
+
+    assert swh_indexer_storage.content_mimetype_add(rows) == {
+        "content_mimetype:add": 10
+    }
+    assert swh_indexer_storage._request_encoding in compression.CODECS
+
+
+def test_response_compression(app_server, swh_indexer_storage):
+    """Checks responses are compressed if enabled and accepted by the client"""
+    rows = _mimetype_rows(swh_indexer_storage, 10)
+    swh_indexer_storage.content_mimetype_add(rows)
+    client = app_server.app.test_client()
+    body = msgpack_dumps({"ids": [row.id for row in rows]})
+    headers = {
+        "Content-Type": "application/x-msgpack",
+        "Accept": "application/x-msgpack",
+        "Accept-Encoding": "gzip",
+    }
+
+    response = client.post("/content_mimetype", data=body, headers=headers)
+    assert "Content-Encoding" not in response.headers
+    assert "gzip" in response.headers["Accept-Encoding"]
+    uncompressed = response.data
+
+    app_server.app.config["compression"] = {"min_size": 100}
+    try:
+        response = client.post("/content_mimetype", data=body, headers=headers)
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(response.data) == uncompressed
+        assert len(msgpack_loads(uncompressed)) == 10
+
+        response = client.post(
+            "/content_mimetype", data=body, headers={**headers, "Accept-Encoding": ""}
+        )
+        assert "Content-Encoding" not in response.headers
+    finally:
+        del app_server.app.config["compression"]
+
+    response = client.post(
+        "/content_mimetype",
+        data=body,
+        headers={**headers, "Content-Encoding": "unknown"},
+    )
+    assert response.status_code == 415
+
+
+def test_add_split(app_server, swh_indexer_storage, mocker):
+    """Checks lists of rows larger than the maximum request size are sent in
+    several requests"""
+    rows = _mimetype_rows(swh_indexer_storage, 100)
+    swh_indexer_storage.max_request_size = 1000
+    add = mocker.spy(app_server.storage, "content_mimetype_add")
+
+    assert swh_indexer_storage.content_mimetype_add(rows) == {
+        "content_mimetype:add": 100
+    }
+    assert add.call_count > 1
+    assert sum(len(call[1]["mimetypes"]) for call in add.call_args_list) == 100
+    assert (
+        len(swh_indexer_storage.content_mimetype_get([row.id for row in rows])) == 100
+    )
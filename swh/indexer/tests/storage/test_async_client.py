@@ -0,0 +1,98 @@
+# Copyright (C) 2026  The Software Heritage developers
+# See the AUTHORS file at the top-level directory of this distribution
+# License: GNU General Public License version 3, or any later version
+# See top-level LICENSE file for more information
+
+import asyncio
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+from swh.indexer.storage import gather, get_indexer_storage
+from swh.indexer.storage.api import server
+from swh.indexer.storage.api.async_client import (
+    AsyncRemoteStorage,
+    ConcurrentRemoteStorage,
+)
+from swh.indexer.storage.exc import DuplicateId, IndexerStorageAPIError
+
+from .test_storage import *  # noqa
+
+
+@pytest.fixture
+def app_server():
+    """Serves an in-memory storage on localhost, with a server like the one
+    deployed (instead of a Flask test client), so requests are concurrent."""
+    storage = server.storage = get_indexer_storage(
+        "memory", journal_writer={"cls": "memory"}
+    )
+    http_server = make_server("127.0.0.1", 0, server.app, threaded=True)
+    thread = threading.Thread(
+        target=http_server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    yield (f"http://127.0.0.1:{http_server.server_port}/", storage)
+    http_server.shutdown()
+    thread.join()
+    server.storage = None
+
+
+@pytest.fixture
+def swh_indexer_storage(app_server):
+    (url, backend) = app_server
+    storage = get_indexer_storage("async_remote", url=url)
+    assert isinstance(storage, ConcurrentRemoteStorage)
+    storage.journal_writer = backend.journal_writer
+    yield storage
+    storage.close()
+
+
+def test_gather(swh_indexer_storage_with_data, mocker):
+    storage, data = swh_indexer_storage_with_data
+    ids = [[mimetype.id] for mimetype in data.mimetypes[:3]]
+    async_get = mocker.spy(storage.async_storage, "content_mimetype_get")
+
+    results = gather(storage, "content_mimetype_get", [(id_,) for id_ in ids])
+
+    assert [[row.id for row in rows] for rows in results] == ids
+    assert async_get.call_count == 3
+
+
+def test_gather_sequential(mocker):
+    """Storages which do not support concurrent calls are called in order"""
+    backend = get_indexer_storage("memory")
+    get = mocker.spy(backend, "content_mimetype_get")
+    ids = [[bytes([i]) * 20] for i in range(3)]
+
+    results = gather(backend, "content_mimetype_get", [(id_,) for id_ in ids])
+
+    assert results == [[], [], []]
+    assert [call[0][0] for call in get.call_args_list] == ids
+
+
+def test_async_client(app_server, swh_indexer_storage_with_data):
+    (url, _) = app_server
+    _, data = swh_indexer_storage_with_data
+
+    async def run():
+        async with AsyncRemoteStorage(url, pool_size=2) as storage:
+            results = await asyncio.gather(
+                *(storage.content_mimetype_get([row.id]) for row in data.mimetypes)
+            )
+            with pytest.raises(DuplicateId):
+                await storage.content_mimetype_add(data.mimetypes[:1] * 2)
+            return results
+
+    results = asyncio.run(run())
+
+    assert [rows[0].id for rows in results] == [row.id for row in data.mimetypes]
+
+
+def test_connection_error():
+    storage = ConcurrentRemoteStorage("http://127.0.0.1:1/")
+    try:
+        with pytest.raises(IndexerStorageAPIError):
+            storage.content_mimetype_get([b"\x01" * 20])
+    finally:
+        storage.close()
@@ -0,0 +1,168 @@
+# Copyright (C) 2026  The Software Heritage developers
+# See the AUTHORS file at the top-level directory of this distribution
+# License: GNU General Public License version 3, or any later version
+# See top-level LICENSE file for more information
+
+import attr
+import pytest
+
+from swh.indexer.storage import get_indexer_storage
+from swh.indexer.storage.model import (
+    ContentMimetypeRow,
+    DirectoryIntrinsicMetadataRow,
+    OriginIntrinsicMetadataRow,
+)
+from swh.indexer.storage.proxies.buffer import BufferingIndexerStorage
+
+from .generate_data_test import TOOLS
+
+
+def get_buffering_storage(**kwargs):
+    storage = get_indexer_storage("buffer", storage={"cls": "memory"}, **kwargs)
+    assert isinstance(storage, BufferingIndexerStorage)
+    return storage
+
+
+def tool_ids(storage):
+    return {
+        tool["tool_name"]: tool["id"]
+        for tool in storage.indexer_configuration_add(TOOLS)
+    }
+
+
+def mimetype_rows(tool_id, nb_rows):
+    return [
+        ContentMimetypeRow(
+            id=bytes([i]) * 20,
+            mimetype="text/plain",
+            encoding="utf-8",
+            indexer_configuration_id=tool_id,
+        )
+        for i in range(nb_rows)
+    ]
+
+
+def test_buffer_coalesce(mocker):
+    storage = get_buffering_storage()
+    rows = mimetype_rows(tool_ids(storage)["file"], 3)
+    backend_add = mocker.spy(storage.storage, "content_mimetype_add")
+
+    assert storage.content_mimetype_add(rows[:1]) == {}
+    assert storage.content_mimetype_add(rows[1:]) == {}
+    backend_add.assert_not_called()
+    assert storage.storage.content_mimetype_get([row.id for row in rows]) == []
+
+    assert storage.flush() == {"content_mimetype:add": 3}
+    backend_add.assert_called_once_with(rows)
+    assert len(storage.storage.content_mimetype_get([row.id for row in rows])) == 3
+
+    # buffers were emptied
+    assert storage.flush() == {}
+    backend_add.assert_called_once()
+
+
+def test_buffer_deduplicate():
+    storage = get_buffering_storage()
+    tools = tool_ids(storage)
+    (row,) = mimetype_rows(tools["file"], 1)
+    row_other_tool = attr.evolve(row, indexer_configuration_id=tools["nomos"])
+
+    storage.content_mimetype_add([row, attr.evolve(row, mimetype="text/x-other")])
+    storage.content_mimetype_add([row_other_tool])
+
+    assert storage.flush() == {"content_mimetype:add": 2}
+    results = storage.content_mimetype_get([row.id])
+    assert sorted((result.tool["name"], result.mimetype) for result in results) == [
+        ("file", "text/x-other"),
+        ("nomos", "text/plain"),
+    ]
+
+
+def test_buffer_min_batch_size(mocker):
+    storage = get_buffering_storage(min_batch_size={"content_mimetype": 2})
+    tools = tool_ids(storage)
+    rows = mimetype_rows(tools["file"], 7)
+    directory_row = DirectoryIntrinsicMetadataRow(
+        id=b"\x01" * 20,
+        metadata={"name": "foo"},
+        mappings=["npm"],
+        indexer_configuration_id=tools["swh-metadata-detector"],
+    )
+    backend_add = mocker.spy(storage.storage, "content_mimetype_add")
+
+    assert storage.directory_intrinsic_metadata_add([directory_row]) == {}
+    assert storage.content_mimetype_add(rows[:1]) == {}
+    # rows of all tables are flushed
+    assert storage.content_mimetype_add(rows[1:2]) == {
+        "content_mimetype:add": 2,
+        "directory_intrinsic_metadata:add": 1,
+    }
+
+    # in batches of at most min_batch_size rows
+    assert storage.content_mimetype_add(rows[2:]) == {"content_mimetype:add": 5}
+    assert [len(call[0][0]) for call in backend_add.call_args_list] == [2, 2, 2, 1]
+
+
+def test_buffer_max_age(mocker):
+    monotonic = mocker.patch("swh.indexer.storage.proxies.buffer.time.monotonic")
+    storage = get_buffering_storage(max_age=10)
+    rows = mimetype_rows(tool_ids(storage)["file"], 3)
+
+    monotonic.return_value = 100.0
+    assert storage.content_mimetype_add(rows[:1]) == {}
+    monotonic.return_value = 109.0
+    assert storage.content_mimetype_add(rows[1:2]) == {}
+    monotonic.return_value = 110.0
+    assert storage.content_mimetype_add(rows[2:]) == {"content_mimetype:add": 3}
+
+    # the age of the next rows is counted from when they are added
+    monotonic.return_value = 115.0
+    assert storage.content_mimetype_add(rows[:1]) == {}
+    storage.clear_buffers()
+
+
+def test_buffer_flush_order(mocker):
+    storage = get_buffering_storage()
+    tool_id = tool_ids(storage)["swh-metadata-detector"]
+    directory_row = DirectoryIntrinsicMetadataRow(
+        id=b"\x01" * 20,
+        metadata={"name": "foo"},
+        mappings=["npm"],
+        indexer_configuration_id=tool_id,
+    )
+    origin_row = OriginIntrinsicMetadataRow(
+        id="https://example.org/foo",
+        metadata={"name": "foo"},
+        from_directory=directory_row.id,
+        mappings=["npm"],
+        indexer_configuration_id=tool_id,
+    )
+    manager = mocker.Mock()
+    for table in ("directory_intrinsic_metadata", "origin_intrinsic_metadata"):
+        manager.attach_mock(mocker.spy(storage.storage, f"{table}_add"), table)
+    manager.attach_mock(mocker.spy(storage.storage, "flush"), "flush")
+
+    storage.origin_intrinsic_metadata_add([origin_row])
+    storage.directory_intrinsic_metadata_add([directory_row])
+    storage.flush()
+
+    assert manager.mock_calls == [
+        mocker.call.directory_intrinsic_metadata([directory_row]),
+        mocker.call.origin_intrinsic_metadata([origin_row]),
+        mocker.call.flush(),
+    ]
+
+
+def test_buffer_leftovers():
+    storage = get_buffering_storage()
+    backend = storage.storage
+    (row,) = mimetype_rows(tool_ids(storage)["file"], 1)
+    storage.content_mimetype_add([row])
+
+    with pytest.warns(UserWarning, match="flush"):
+        storage.__del__()
+    assert len(backend.content_mimetype_get([row.id])) == 1
+
+    storage.content_mimetype_add([row])
+    storage.clear_buffers()
+    assert storage.flush() == {}
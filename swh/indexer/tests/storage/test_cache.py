@@ -0,0 +1,121 @@
+# Copyright (C) 2026  The Software Heritage developers
+# See the AUTHORS file at the top-level directory of this distribution
+# License: GNU General Public License version 3, or any later version
+# See top-level LICENSE file for more information
+
+import attr
+import pytest
+
+from swh.indexer.storage import get_indexer_storage
+from swh.indexer.storage.metrics import CACHE_LOOKUPS_METRIC
+from swh.indexer.storage.proxies.cache import CachingIndexerStorage
+
+from .test_storage import *  # noqa
+
+
+@pytest.fixture
+def swh_indexer_storage():
+    storage = get_indexer_storage(
+        "cache", storage={"cls": "memory", "journal_writer": {"cls": "memory"}}
+    )
+    assert isinstance(storage, CachingIndexerStorage)
+    return storage
+
+
+def test_get_cached(swh_indexer_storage_with_data, mocker):
+    storage, data = swh_indexer_storage_with_data
+    backend_get = mocker.spy(storage.storage, "content_mimetype_get")
+    increment = mocker.patch("swh.indexer.storage.metrics.statsd.increment")
+    (row1, row2) = data.mimetypes[:2]
+    unknown_id = b"\x00" * 20
+
+    assert storage.content_mimetype_get([row1.id, unknown_id]) == [
+        storage.storage.content_mimetype_get([row1.id])[0]
+    ]
+    backend_get.reset_mock()
+    results = storage.content_mimetype_get([row1.id, row2.id, unknown_id])
+
+    assert [row.id for row in results] == [row1.id, row2.id]
+    backend_get.assert_called_once_with([row2.id])
+    increment.assert_called_with(
+        CACHE_LOOKUPS_METRIC,
+        1,
+        tags={"endpoint": "content_mimetype_get", "result": "miss"},
+    )
+    assert increment.call_args_list[-2] == mocker.call(
+        CACHE_LOOKUPS_METRIC,
+        2,
+        tags={"endpoint": "content_mimetype_get", "result": "hit"},
+    )
+
+    # returned rows can be modified without changing cached ones
+    del results[0].tool["id"]
+    assert "id" in storage.content_mimetype_get([row1.id])[0].tool
+
+
+def test_get_invalidated(swh_indexer_storage_with_data):
+    storage, data = swh_indexer_storage_with_data
+    row = data.mimetypes[0]
+    assert storage.content_mimetype_get([row.id])[0].mimetype == row.mimetype
+
+    storage.content_mimetype_add([attr.evolve(row, mimetype="text/x-other")])
+
+    assert storage.content_mimetype_get([row.id])[0].mimetype == "text/x-other"
+
+
+def test_get_expired(swh_indexer_storage_with_data, mocker):
+    storage, data = swh_indexer_storage_with_data
+    monotonic = mocker.patch("swh.indexer.storage.utils.time.monotonic")
+    monotonic.return_value = 100.0
+    row = data.mimetypes[0]
+    storage.content_mimetype_get([row.id])
+
+    # added by another client
+    storage.storage.content_mimetype_add([attr.evolve(row, mimetype="text/x-other")])
+    assert storage.content_mimetype_get([row.id])[0].mimetype == row.mimetype
+
+    monotonic.return_value = 100.0 + 301
+    assert storage.content_mimetype_get([row.id])[0].mimetype == "text/x-other"
+
+
+def test_missing_cached(swh_indexer_storage_with_data, mocker):
+    storage, data = swh_indexer_storage_with_data
+    backend_missing = mocker.spy(storage.storage, "content_mimetype_missing")
+    tool_id = data.tools["file"]["id"]
+    (row1, row2) = data.mimetypes[:2]
+    entries = [
+        {"id": id_, "indexer_configuration_id": tool_id}
+        for id_ in (row1.id, b"\x00" * 20)
+    ]
+
+    assert storage.content_mimetype_missing(entries) == [b"\x00" * 20]
+    assert storage.content_mimetype_missing(entries) == [b"\x00" * 20]
+    # only the missing entry was sent again
+    assert backend_missing.call_args_list[1] == mocker.call(entries[1:])
+
+    # rows added through the proxy are known to be present
+    backend_missing.reset_mock()
+    storage.content_mimetype_add([attr.evolve(row2, id=b"\x00" * 20)])
+    assert storage.content_mimetype_missing(entries) == []
+    backend_missing.assert_not_called()
+
+
+def test_indexer_configuration_get_cached(swh_indexer_storage_with_data, mocker):
+    storage, data = swh_indexer_storage_with_data
+    backend_get = mocker.spy(storage.storage, "indexer_configuration_get")
+    tool = data.tools["file"]
+    query = {
+        "tool_name": tool["name"],
+        "tool_version": tool["version"],
+        "tool_configuration": tool["configuration"],
+    }
+
+    result = storage.indexer_configuration_get(query)
+    assert result["id"] == tool["id"]
+    del result["id"]
+    assert storage.indexer_configuration_get(query)["id"] == tool["id"]
+    backend_get.assert_not_called()  # cached by indexer_configuration_add
+
+    assert storage.indexer_configuration_get({**query, "tool_version": "0"}) is None
+    assert storage.indexer_configuration_get({**query, "tool_version": "0"}) is None
+    assert backend_get.call_count == 2
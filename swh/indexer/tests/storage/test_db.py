@@ -0,0 +1,180 @@
+# Copyright (C) 2026  The Software Heritage developers
+# See the AUTHORS file at the top-level directory of this distribution
+# License: GNU General Public License version 3, or any later version
+# See top-level LICENSE file for more information
+
+"""Tests of the queries sent to PostgreSQL by the indexer storage, checking
+they can be answered efficiently."""
+
+from typing import Any, Dict, Iterator, List
+
+import pytest
+
+from swh.indexer.storage.model import OriginIntrinsicMetadataRow
+
+NB_ORIGINS = 5000
+
+
+def _iter_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for subplan in plan.get("Plans", []):
+        yield from _iter_nodes(subplan)
+
+
+def _explain(storage, query: str, args) -> Dict[str, Any]:
+    db = storage.get_db()
+    try:
+        with db.transaction() as cur:
+            cur.execute("EXPLAIN (FORMAT JSON) " + query, args)
+            ((plan,),) = cur.fetchall()
+    finally:
+        storage.put_db(db)
+    return plan[0]["Plan"]
+
+
+def _oim_node_types(plan: Dict[str, Any]) -> List[str]:
+    return [
+        node["Node Type"]
+        for node in _iter_nodes(plan)
+        if node.get("Relation Name") == "origin_intrinsic_metadata"
+    ]
+
+
+def _explain_search_by_producer(
+    storage, last, ids_only, mappings, tool_ids, all_tool_ids
+) -> Dict[str, Any]:
+    after: Any = last
+    if last and not ids_only:
+        after = (last, all_tool_ids[0])
+    db = storage.get_db()
+    try:
+        query, args = db.origin_intrinsic_metadata_search_by_producer_query(
+            after, 101, ids_only, mappings, tool_ids
+        )
+    finally:
+        storage.put_db(db)
+
+    return _explain(storage, query, args)
+
+
+@pytest.fixture
+def swh_indexer_storage_with_origins(swh_indexer_storage_with_data):
+    storage, data = swh_indexer_storage_with_data
+    tool_ids = [
+        data.tools["swh-metadata-detector"]["id"],
+        data.tools["swh-metadata-detector2"]["id"],
+    ]
+    storage.origin_intrinsic_metadata_add(
+        [
+            OriginIntrinsicMetadataRow(
+                id=f"https://example.org/{i:06}",
+                metadata={"name": f"origin {i}"},
+                indexer_configuration_id=tool_ids[i % 2],
+                from_directory=b"\x00" * 20,
+                mappings=[f"mapping{i % 10}"] + (["rare"] if i % 1000 == 0 else []),
+            )
+            for i in range(NB_ORIGINS)
+        ]
+    )
+
+    db = storage.get_db()
+    try:
+        with db.transaction() as cur:
+            cur.execute("ANALYZE origin_intrinsic_metadata")
+    finally:
+        storage.put_db(db)
+
+    return storage, data, tool_ids
+
+
+@pytest.mark.parametrize("ids_only", [True, False])
+@pytest.mark.parametrize("last", ["", "https://example.org/002500"])
+@pytest.mark.parametrize(
+    "mappings,tool_ids",
+    [(None, None), (["mapping1", "mapping2"], None), (None, "first")],
+)
+def test_origin_intrinsic_metadata_search_by_producer_plan(
+    swh_indexer_storage_with_origins, ids_only, last, mappings, tool_ids
+):
+    """Pages must be read by walking the primary key index, and not by sorting
+    all matching rows."""
+    storage, data, all_tool_ids = swh_indexer_storage_with_origins
+    if tool_ids == "first":
+        tool_ids = all_tool_ids[:1]
+
+    plan = _explain_search_by_producer(
+        storage, last, ids_only, mappings, tool_ids, all_tool_ids
+    )
+    node_types = [node["Node Type"] for node in _iter_nodes(plan)]
+
+    assert plan["Node Type"] == "Limit"
+    assert "Sort" not in node_types
+    assert "Seq Scan" not in _oim_node_types(plan)
+    assert any(
+        node.get("Index Name") == "origin_intrinsic_metadata_pkey"
+        for node in _iter_nodes(plan)
+    ), node_types
+
+
+@pytest.mark.parametrize("ids_only", [True, False])
+@pytest.mark.parametrize("last", ["", "https://example.org/002500"])
+def test_origin_intrinsic_metadata_search_by_producer_plan_rare_mapping(
+    swh_indexer_storage_with_origins, ids_only, last
+):
+    """Walking the primary key would read most of the table before finding a
+    page of origins with a rare mapping; only these origins should be read,
+    from the GIN index on mappings, then sorted."""
+    storage, data, all_tool_ids = swh_indexer_storage_with_origins
+
+    plan = _explain_search_by_producer(
+        storage, last, ids_only, ["rare"], None, all_tool_ids
+    )
+    node_types = [node["Node Type"] for node in _iter_nodes(plan)]
+
+    assert plan["Node Type"] == "Limit"
+    assert "Seq Scan" not in _oim_node_types(plan)
+    assert any(
+        node.get("Index Name") == "origin_intrinsic_metadata_mappings_idx"
+        for node in _iter_nodes(plan)
+    ), node_types
+
+
+def test_origin_intrinsic_metadata_search_by_producer_pages(
+    swh_indexer_storage_with_origins,
+):
+    storage, data, tool_ids = swh_indexer_storage_with_origins
+
+    urls = []
+    next_page_token = ""
+    while next_page_token is not None:
+        result = storage.origin_intrinsic_metadata_search_by_producer(
+            page_token=next_page_token,
+            limit=1000,
+            ids_only=True,
+            mappings=["mapping3"],
+        )
+        urls.extend(result.results)
+        next_page_token = result.next_page_token
+
+    assert urls == [f"https://example.org/{i:06}" for i in range(3, NB_ORIGINS, 10)]
+
+
+@pytest.mark.parametrize("ids_only", [True, False])
+def test_origin_intrinsic_metadata_search_by_producer_rare_mapping_pages(
+    swh_indexer_storage_with_origins, ids_only
+):
+    storage, data, tool_ids = swh_indexer_storage_with_origins
+
+    urls = []
+    next_page_token = ""
+    while next_page_token is not None:
+        result = storage.origin_intrinsic_metadata_search_by_producer(
+            page_token=next_page_token,
+            limit=2,
+            ids_only=ids_only,
+            mappings=["rare"],
+        )
+        urls.extend(url if ids_only else url.id for url in result.results)
+        next_page_token = result.next_page_token
+
+    assert urls == [f"https://example.org/{i:06}" for i in range(0, NB_ORIGINS, 1000)]
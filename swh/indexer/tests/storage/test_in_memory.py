@@ -6,7 +6,9 @@
 import pytest
 
 from swh.indexer.storage import get_indexer_storage
+from swh.indexer.storage.model import OriginIntrinsicMetadataRow
 
+from .memory_benchmark import measure_content_mimetype
 from .test_storage import *  # noqa
 
 
@@ -18,3 +20,164 @@ def swh_indexer_storage():
             "cls": "memory",
         },
     )
+
+
+def test_origin_intrinsic_metadata_postings_replaced(swh_indexer_storage_with_data):
+    """Tokens of replaced rows are removed from the inverted index"""
+    storage, data = swh_indexer_storage_with_data
+    tool_id = data.tools["swh-metadata-detector"]["id"]
+
+    for name in ("foo baz", "bar baz"):
+        storage.origin_intrinsic_metadata_add(
+            [
+                OriginIntrinsicMetadataRow(
+                    id=data.origin_url_1,
+                    metadata={"name": name},
+                    mappings=[],
+                    indexer_configuration_id=tool_id,
+                    from_directory=data.directory_id_1,
+                )
+            ]
+        )
+
+    postings = storage._origin_intrinsic_metadata._postings
+    assert "foo" not in postings
+    assert set(postings) == {"bar", "baz", "name"}
+    assert all(len(docs) == 1 for docs in postings.values())
+    assert [
+        row.id
+        for row in storage.origin_intrinsic_metadata_search_fulltext(["bar", "baz"])
+    ] == [data.origin_url_1]
+
+
+def test_content_mimetype_memory():
+    """Rows are stored compactly; this used to take over 1300 bytes per row"""
+    (retained, _) = measure_content_mimetype(5000)
+    assert retained / 5000 < 200
+
+
+def test_origin_intrinsic_metadata_search_by_producer_lazy(
+    swh_indexer_storage_with_data, mocker
+):
+    """Pages are read from the page token on, and rows are only built for
+    results"""
+    storage, data = swh_indexer_storage_with_data
+    tool_id = data.tools["swh-metadata-detector"]["id"]
+    storage.origin_intrinsic_metadata_add(
+        [
+            OriginIntrinsicMetadataRow(
+                id=f"https://example.org/{i:03}",
+                metadata={"name": str(i)},
+                mappings=["npm"] if i % 10 == 0 else ["cff"],
+                indexer_configuration_id=tool_id,
+                from_directory=data.directory_id_1,
+            )
+            for i in range(100)
+        ]
+    )
+    sub_storage = storage._origin_intrinsic_metadata
+    make_row = mocker.spy(sub_storage, "make_row")
+    iter_from = mocker.spy(sub_storage._records, "iter_from")
+
+    page = storage.origin_intrinsic_metadata_search_by_producer(
+        limit=3, mappings=["npm"]
+    )
+    assert [row.id for row in page.results] == [
+        "https://example.org/000",
+        "https://example.org/010",
+        "https://example.org/020",
+    ]
+    assert make_row.call_count == 3
+
+    page = storage.origin_intrinsic_metadata_search_by_producer(
+        page_token=page.next_page_token, limit=3, mappings=["npm"]
+    )
+    assert [row.id for row in page.results] == [
+        "https://example.org/030",
+        "https://example.org/040",
+        "https://example.org/050",
+    ]
+    assert make_row.call_count == 6
+    assert iter_from.call_args_list[-1] == mocker.call("https://example.org/020")
+
+
+def test_dump_load(swh_indexer_storage_with_data, tmp_path):
+    storage, data = swh_indexer_storage_with_data
+    tool_id = data.tools["swh-metadata-detector"]["id"]
+    storage.origin_intrinsic_metadata_add(
+        [
+            OriginIntrinsicMetadataRow(
+                id=url,
+                metadata={"name": f"foo {i}", "keywords": ["bar", "baz"]},
+                mappings=["npm"],
+                indexer_configuration_id=tool_id,
+                from_directory=data.directory_id_1,
+            )
+            for (i, url) in enumerate([data.origin_url_1, data.origin_url_2])
+        ]
+    )
+    storage.indexer_configuration_add(
+        [{"tool_name": "unused", "tool_version": "1", "tool_configuration": {}}]
+    )
+    path = str(tmp_path / "dump")
+    storage.dump(path)
+
+    loaded = get_indexer_storage("memory")
+    loaded.load(path)
+
+    for name, sub_storage in storage._sub_storages().items():
+        assert loaded._sub_storages()[name].get_all() == sub_storage.get_all(), name
+    assert loaded._tools == storage._tools
+    sha1s = [row.id for row in data.mimetypes[:2]]
+    assert loaded.content_mimetype_get(sha1s) == storage.content_mimetype_get(sha1s)
+    assert loaded.content_mimetype_get(sha1s)
+    assert (
+        loaded.origin_intrinsic_metadata_stats()
+        == storage.origin_intrinsic_metadata_stats()
+    )
+    assert [
+        row.id for row in loaded.origin_intrinsic_metadata_search_fulltext(["foo"])
+    ] == [data.origin_url_1, data.origin_url_2]
+
+    # loaded storages can still be written to
+    new_row = OriginIntrinsicMetadataRow(
+        id=data.origin_url_1,
+        metadata={"name": "qux"},
+        mappings=["cff"],
+        indexer_configuration_id=tool_id,
+        from_directory=data.directory_id_1,
+    )
+    storage.origin_intrinsic_metadata_add([new_row])
+    loaded.origin_intrinsic_metadata_add([new_row])
+    assert loaded.origin_intrinsic_metadata_get(
+        [data.origin_url_1]
+    ) == storage.origin_intrinsic_metadata_get([data.origin_url_1])
+    assert [
+        row.id for row in loaded.origin_intrinsic_metadata_search_fulltext(["foo"])
+    ] == [data.origin_url_2]
+    assert (
+        loaded.origin_intrinsic_metadata_stats()
+        == storage.origin_intrinsic_metadata_stats()
+    )
+
+
+def test_dump_load_empty(tmp_path):
+    storage = get_indexer_storage("memory")
+    path = str(tmp_path / "dump")
+    storage.dump(path)
+
+    loaded = get_indexer_storage("memory")
+    loaded.load(path)
+    assert loaded.content_mimetype_get([b"\x00" * 20]) == []
+    assert loaded.origin_intrinsic_metadata_stats() == {
+        "total": 0,
+        "non_empty": 0,
+        "per_mapping": {},
+    }
+
+
+def test_load_invalid(tmp_path):
+    path = tmp_path / "dump"
+    path.write_bytes(b"not a dump")
+    with pytest.raises(ValueError, match="not an indexer storage dump"):
+        get_indexer_storage("memory").load(str(path))
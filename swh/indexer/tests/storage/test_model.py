@@ -3,9 +3,22 @@
 # License: GNU General Public License version 3, or any later version
 # See top-level LICENSE file for more information
 
+from unittest.mock import Mock
+
+import attr
 import pytest
 
-from swh.indexer.storage.model import BaseRow, ContentLicenseRow
+from swh.core.api.serializers import msgpack_dumps, msgpack_loads
+from swh.indexer.storage import check_id_duplicates
+from swh.indexer.storage.api.serializers import DECODERS, ENCODERS
+from swh.indexer.storage.exc import DuplicateId
+from swh.indexer.storage.model import (
+    BaseRow,
+    ContentLicenseRow,
+    RowBatch,
+    attach_tools,
+    rows_to_dicts,
+)
 
 
 def test_unique_key__no_tool_dict():
@@ -55,3 +68,105 @@ def test_unique_key():
         "tool_version": "1.2.3",
         "tool_configuration": '{"bar": 2, "foo": 1}',
     }
+
+
+def test_to_dict():
+    row = ContentLicenseRow(id=b"foo", indexer_configuration_id=34, license="BSD")
+    assert row.to_dict() == {
+        "id": b"foo",
+        "indexer_configuration_id": 34,
+        "license": "BSD",
+    }
+    assert ContentLicenseRow.from_dict(row.to_dict()) == row
+
+
+def test_attach_tools():
+    tools = {
+        1: {"name": "foo", "version": "1", "configuration": {}},
+        2: {"name": "bar", "version": "2", "configuration": {}},
+    }
+    get_tool = Mock(side_effect=tools.__getitem__)
+    rows = [
+        ContentLicenseRow(id=b"a", indexer_configuration_id=1, license="BSD"),
+        ContentLicenseRow(id=b"b", indexer_configuration_id=2, license="GPL"),
+        ContentLicenseRow(id=b"c", indexer_configuration_id=1, license="MIT"),
+    ]
+    results = attach_tools(rows, get_tool)
+
+    assert results == [
+        attr.evolve(
+            row, tool=tools[row.indexer_configuration_id], indexer_configuration_id=None
+        )
+        for row in rows
+    ]
+    assert results[0].tool is results[2].tool
+    assert get_tool.call_count == 2
+    # rows are copied
+    assert rows[0].indexer_configuration_id == 1
+
+
+@pytest.mark.parametrize("tool_ids", [(1, 1, 1), (1, 2, 1)])
+def test_row_batch(tool_ids):
+    tools = {
+        1: {"name": "foo", "version": "1", "configuration": {}},
+        2: {"name": "bar", "version": "2", "configuration": {}},
+    }
+    rows = [
+        ContentLicenseRow(id=id_, indexer_configuration_id=tool_id, license=license)
+        for (id_, tool_id, license) in zip(
+            [b"a", b"b", b"c"], tool_ids, ["BSD", "GPL", "MIT"]
+        )
+    ]
+    batch = RowBatch.from_rows(rows)
+
+    assert len(batch) == 3
+    assert list(batch) == rows
+    assert (batch[1], batch[-1]) == (rows[1], rows[-1])
+    assert list(batch[1:]) == rows[1:]
+    assert rows_to_dicts(batch) == rows_to_dicts(rows)
+
+    get_tool = Mock(side_effect=tools.__getitem__)
+    with_tools = attach_tools(batch, get_tool)
+    assert isinstance(with_tools, RowBatch)
+    assert list(with_tools) == attach_tools(rows, tools.__getitem__)
+    assert rows_to_dicts(with_tools) == rows_to_dicts(attach_tools(rows, tools.get))
+    assert get_tool.call_count == len(set(tool_ids))
+
+    decoded = msgpack_loads(
+        msgpack_dumps(batch, extra_encoders=ENCODERS), extra_decoders=DECODERS
+    )
+    assert isinstance(decoded, RowBatch)
+    assert list(decoded) == rows
+
+
+def test_row_batch_check_id_duplicates():
+    tool = {"name": "foo", "version": "1", "configuration": {}}
+    rows = [
+        ContentLicenseRow(id=b"a", tool=tool, license="BSD"),
+        ContentLicenseRow(id=b"a", tool=tool, license="GPL"),
+    ]
+    check_id_duplicates(RowBatch.from_rows(rows))
+    with pytest.raises(DuplicateId) as excinfo:
+        check_id_duplicates(RowBatch.from_rows(rows + rows[:1]))
+    assert excinfo.value.args[0] == [dict(sorted(rows[0].unique_key().items()))]
+
+
+def test_row_batch_invalid():
+    with pytest.raises(ValueError, match="empty"):
+        RowBatch.from_rows([])
+    with pytest.raises(ValueError, match="different classes"):
+        RowBatch.from_rows(
+            [
+                ContentLicenseRow(id=b"a", indexer_configuration_id=1, license="BSD"),
+                BaseRow(id=b"b", indexer_configuration_id=1),
+            ]
+        )
+    with pytest.raises(ValueError, match="do not match the fields"):
+        RowBatch(ContentLicenseRow, 1, {"id": [b"a"]}, {"tool": None})
+    with pytest.raises(ValueError, match="unequal sizes"):
+        RowBatch(
+            ContentLicenseRow,
+            2,
+            {"id": [b"a", b"b"], "license": ["BSD"]},
+            {"indexer_configuration_id": 1, "tool": None},
+        )
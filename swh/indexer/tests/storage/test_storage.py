@@ -5,7 +5,7 @@
 
 import math
 import threading
-from typing import Any, Dict, List, Tuple, Type
+from typing import Any, Dict, List, Optional, Tuple, Type
 
 import attr
 import pytest
@@ -87,6 +87,10 @@ def test_check_config(swh_indexer_storage) -> None:
     assert swh_indexer_storage.check_config(check_write=False)
 
 
+def test_flush(swh_indexer_storage) -> None:
+    assert swh_indexer_storage.flush() == {}
+
+
 class StorageETypeTester:
     """Base class for testing a series of common behaviour between a bunch of
     endpoint types supported by an IndexerStorage.
@@ -375,6 +379,58 @@ class StorageETypeTester:
         ]
         assert list(sorted(actual_journal_data)) == list(sorted(expected_journal_data))
 
+    def test_get_partition_rows(
+        self, swh_indexer_storage_with_data: Tuple[IndexerStorageInterface, Any]
+    ) -> None:
+        """get_partition_rows should return full rows of the given tool only,
+        sorted by id"""
+        storage, data = swh_indexer_storage_with_data
+        etype = self.endpoint_type
+        # not used by the fixture, so the table has no row of this tool yet
+        tool = data.tools["swh-metadata-translator"]
+        other_tool_id = data.tools[self.tool_name]["id"]
+
+        ids = [bytes([i]) * 20 for i in range(0, 256, 16)]
+        endpoint(storage, etype, "add")(
+            [
+                self.row_class.from_dict(
+                    {
+                        "id": id_,
+                        **self.example_data[i % 2],
+                        "indexer_configuration_id": tool_id,
+                    }
+                )
+                for (i, id_) in enumerate(ids)
+                for tool_id in (tool["id"], other_tool_id)
+                if tool_id == tool["id"] or i % 3 == 0
+            ]
+        )
+        expected_rows = [
+            row for row in endpoint(storage, etype, "get")(ids) if row.tool == tool
+        ]
+        expected_rows.sort(key=lambda row: row.id)
+        assert len(expected_rows) == len(ids)
+
+        nb_partitions = 4
+        actual_rows = []
+        for partition_id in range(nb_partitions):
+            next_page_token = None
+            while True:
+                actual_result = endpoint(storage, etype, "get_partition_rows")(
+                    tool["id"],
+                    partition_id,
+                    nb_partitions,
+                    limit=3,
+                    page_token=next_page_token,
+                )
+                assert len(actual_result.results) <= 3
+                actual_rows.extend(actual_result.results)
+                next_page_token = actual_result.next_page_token
+                if next_page_token is None:
+                    break
+
+        assert actual_rows == expected_rows
+
 
 class TestIndexerStorageContentMimetypes(StorageETypeTester):
     """Test Indexer Storage content_mimetype related methods"""
@@ -512,6 +568,50 @@ class TestIndexerStorageContentMimetypes(StorageETypeTester):
         for actual_id in actual_ids:
             assert actual_id in expected_ids
 
+    def test_generate_content_mimetype_get_partition_rows_with_pagination(
+        self, swh_indexer_storage_with_data: Tuple[IndexerStorageInterface, Any]
+    ) -> None:
+        """get_partition_rows should return full rows, sorted by id"""
+        storage, data = swh_indexer_storage_with_data
+        mimetypes = data.mimetypes
+        tool = data.tools["file"]
+        expected_ids = sorted(row.id for row in mimetypes)
+
+        nb_partitions = 4
+
+        actual_rows = []
+        for partition_id in range(nb_partitions):
+            next_page_token = None
+            while True:
+                actual_result = storage.content_mimetype_get_partition_rows(
+                    tool["id"],
+                    partition_id,
+                    nb_partitions,
+                    limit=3,
+                    page_token=next_page_token,
+                )
+                assert len(actual_result.results) <= 3
+                actual_rows.extend(actual_result.results)
+                next_page_token = actual_result.next_page_token
+                if next_page_token is None:
+                    break
+
+        assert [row.id for row in actual_rows] == expected_ids
+        assert all(row.tool == tool for row in actual_rows)
+        assert actual_rows == sorted(
+            storage.content_mimetype_get(expected_ids), key=lambda row: row.id
+        )
+
+    def test_generate_content_mimetype_get_partition_rows_other_tool(
+        self, swh_indexer_storage_with_data: Tuple[IndexerStorageInterface, Any]
+    ) -> None:
+        storage, data = swh_indexer_storage_with_data
+
+        actual_result = storage.content_mimetype_get_partition_rows(
+            data.tools["nomos"]["id"], 0, 1
+        )
+        assert actual_result == PagedResult(results=[], next_page_token=None)
+
 
 class TestIndexerStorageContentMetadata(StorageETypeTester):
     """Test Indexer Storage content_metadata related methods"""
@@ -645,6 +745,11 @@ class TestIndexerStorageContentFossologyLicense(StorageETypeTester):
     def test_missing(self):
         pass
 
+    # content_fossology_license_get_partition_rows does not exist
+    @pytest.mark.skip
+    def test_get_partition_rows(self):
+        pass
+
     def test_content_fossology_license_add__new_license_added(
         self, swh_indexer_storage_with_data: Tuple[IndexerStorageInterface, Any]
     ) -> None:
@@ -1131,6 +1236,13 @@ class TestIndexerStorageOriginIntrinsicMetadata:
         ):
             assert item in (expected_item_v1, expected_item_v2)
 
+        # counters must not have lost or counted twice any concurrent update
+        stats = storage.origin_intrinsic_metadata_stats()
+        assert stats["total"] == len(origins)
+        assert stats["non_empty"] == len(
+            [item for item in actual_data if item.metadata == example_data2["metadata"]]
+        )
+
     def test_origin_intrinsic_metadata_add__duplicate_twice(
         self, swh_indexer_storage_with_data: Tuple[IndexerStorageInterface, Any]
     ) -> None:
@@ -1288,6 +1400,85 @@ class TestIndexerStorageOriginIntrinsicMetadata:
         ]
         assert [res.id for res in search(["John", "Jane"])] == [data.origin_url_1]
 
+    def test_origin_intrinsic_metadata_search_fulltext_weights(
+        self, swh_indexer_storage_with_data: Tuple[IndexerStorageInterface, Any]
+    ) -> None:
+        storage, data = swh_indexer_storage_with_data
+        tool_id = data.tools["swh-metadata-detector"]["id"]
+
+        # same words, in different fields
+        documents: List[Tuple[str, Dict[str, Any]]] = [
+            (
+                data.origin_url_1,
+                {"name": "foo", "keywords": ["bar"], "author": "baz"},
+            ),
+            (
+                data.origin_url_2,
+                {"name": "bar", "description": "baz", "author": "foo"},
+            ),
+            (
+                data.origin_url_3,
+                {"name": "baz", "description": "foo", "author": "bar"},
+            ),
+        ]
+        storage.origin_intrinsic_metadata_add(
+            [
+                OriginIntrinsicMetadataRow(
+                    id=url,
+                    metadata=metadata,
+                    mappings=[],
+                    indexer_configuration_id=tool_id,
+                    from_directory=data.directory_id_1,
+                )
+                for (url, metadata) in documents
+            ]
+        )
+
+        search = storage.origin_intrinsic_metadata_search_fulltext
+        assert [res.id for res in search(["foo"])] == [
+            data.origin_url_1,
+            data.origin_url_3,
+            data.origin_url_2,
+        ]
+        assert [res.id for res in search(["bar"])] == [
+            data.origin_url_2,
+            data.origin_url_1,
+            data.origin_url_3,
+        ]
+        assert [res.id for res in search(["baz"], limit=2)] == [
+            data.origin_url_3,
+            data.origin_url_2,
+        ]
+
+    def test_origin_intrinsic_metadata_search_fulltext_after_add(
+        self, swh_indexer_storage_with_data: Tuple[IndexerStorageInterface, Any]
+    ) -> None:
+        """Results of previous searches must not be returned after a write"""
+        storage, data = swh_indexer_storage_with_data
+        tool_id = data.tools["swh-metadata-detector"]["id"]
+        search = storage.origin_intrinsic_metadata_search_fulltext
+
+        def add(url, name):
+            storage.origin_intrinsic_metadata_add(
+                [
+                    OriginIntrinsicMetadataRow(
+                        id=url,
+                        metadata={"name": name},
+                        mappings=[],
+                        indexer_configuration_id=tool_id,
+                        from_directory=data.directory_id_1,
+                    )
+                ]
+            )
+
+        assert search(["foo"]) == []
+        add(data.origin_url_1, "foo")
+        assert [res.id for res in search(["foo"])] == [data.origin_url_1]
+        assert [res.id for res in search(["foo"])] == [data.origin_url_1]
+        add(data.origin_url_1, "bar")
+        assert search(["foo"]) == []
+        assert [res.metadata for res in search(["bar"])] == [{"name": "bar"}]
+
     def _fill_origin_intrinsic_metadata(
         self, swh_indexer_storage_with_data: Tuple[IndexerStorageInterface, Any]
     ) -> None:
@@ -1482,6 +1673,183 @@ class TestIndexerStorageOriginIntrinsicMetadata:
             next_page_token=None,
         )
 
+    def test_origin_intrinsic_metadata_search_by_producer_several_tools(
+        self, swh_indexer_storage_with_data: Tuple[IndexerStorageInterface, Any]
+    ) -> None:
+        storage, data = swh_indexer_storage_with_data
+        self._fill_origin_intrinsic_metadata(swh_indexer_storage_with_data)
+        tool1 = data.tools["swh-metadata-detector"]
+        tool2 = data.tools["swh-metadata-detector2"]
+        storage.origin_intrinsic_metadata_add(
+            [
+                OriginIntrinsicMetadataRow(
+                    id=data.origin_url_1,
+                    metadata={"author": "Joe Doe"},
+                    mappings=["cff"],
+                    indexer_configuration_id=tool2["id"],
+                    from_directory=data.directory_id_1,
+                )
+            ]
+        )
+        endpoint = storage.origin_intrinsic_metadata_search_by_producer
+
+        # origins are listed once, even if they were indexed by several tools
+        result = endpoint(ids_only=True, limit=2)
+        assert result == PagedResult(
+            results=[data.origin_url_1, data.origin_url_2],
+            next_page_token=data.origin_url_2,
+        )
+
+        def row_key(row):
+            return (row.id, row.tool["id"])
+
+        expected_keys = sorted(
+            [
+                (data.origin_url_1, tool1["id"]),
+                (data.origin_url_1, tool2["id"]),
+                (data.origin_url_2, tool2["id"]),
+                (data.origin_url_3, tool2["id"]),
+            ]
+        )
+
+        # pages may end between two rows of the same origin, none is lost
+        for limit in (1, 2, 3):
+            actual_keys: List[Tuple[str, int]] = []
+            next_page_token: Optional[str] = ""
+            while next_page_token is not None:
+                result = endpoint(limit=limit, page_token=next_page_token)
+                assert len(result.results) <= limit
+                actual_keys.extend(map(row_key, result.results))
+                next_page_token = result.next_page_token
+            assert actual_keys == expected_keys
+
+        actual_keys = []
+        next_page_token = ""
+        while next_page_token is not None:
+            result = endpoint(limit=1, page_token=next_page_token, mappings=["npm"])
+            actual_keys.extend(map(row_key, result.results))
+            next_page_token = result.next_page_token
+        assert actual_keys == [
+            (data.origin_url_1, tool1["id"]),
+            (data.origin_url_2, tool2["id"]),
+        ]
+
+        # tokens of full-row pages are not origin URLs
+        with pytest.raises(IndexerStorageArgumentException):
+            endpoint(limit=1, page_token=data.origin_url_1)
+
+    def test_origin_intrinsic_metadata_search_by_producer_more_tools_than_limit(
+        self, swh_indexer_storage_with_data: Tuple[IndexerStorageInterface, Any]
+    ) -> None:
+        storage, data = swh_indexer_storage_with_data
+        tools = storage.indexer_configuration_add(
+            [
+                {
+                    "tool_name": "tool",
+                    "tool_version": str(i),
+                    "tool_configuration": {},
+                }
+                for i in range(3)
+            ]
+        )
+        storage.origin_intrinsic_metadata_add(
+            [
+                OriginIntrinsicMetadataRow(
+                    id=url,
+                    metadata={"name": url},
+                    mappings=["npm"],
+                    indexer_configuration_id=tool["id"],
+                    from_directory=data.directory_id_1,
+                )
+                for url in ("https://a", "https://b")
+                for tool in tools
+                if url == "https://a" or tool == tools[0]
+            ]
+        )
+        expected_keys = sorted(
+            [("https://a", tool["id"]) for tool in tools]
+            + [("https://b", tools[0]["id"])]
+        )
+
+        def row_key(row):
+            return (row.id, row.tool["id"])
+
+        actual_keys: List[Tuple[str, int]] = []
+        next_page_token: Optional[str] = ""
+        while next_page_token is not None:
+            result = storage.origin_intrinsic_metadata_search_by_producer(
+                limit=2, page_token=next_page_token
+            )
+            assert len(result.results) <= 2
+            actual_keys.extend(map(row_key, result.results))
+            next_page_token = result.next_page_token
+        assert actual_keys == expected_keys
+
+    def test_origin_intrinsic_metadata_stream(
+        self, swh_indexer_storage_with_data: Tuple[IndexerStorageInterface, Any]
+    ) -> None:
+        storage, data = swh_indexer_storage_with_data
+        self._fill_origin_intrinsic_metadata(swh_indexer_storage_with_data)
+        tool1 = data.tools["swh-metadata-detector"]
+        tool2 = data.tools["swh-metadata-detector2"]
+
+        # a second row for the same origin, to check pagination over the
+        # full primary key
+        storage.origin_intrinsic_metadata_add(
+            [
+                OriginIntrinsicMetadataRow(
+                    id=data.origin_url_1,
+                    metadata={"author": "Joe Doe"},
+                    mappings=["cff"],
+                    indexer_configuration_id=tool2["id"],
+                    from_directory=data.directory_id_1,
+                )
+            ]
+        )
+
+        expected_keys = sorted(
+            [
+                (data.origin_url_1, tool1["id"]),
+                (data.origin_url_1, tool2["id"]),
+                (data.origin_url_2, tool2["id"]),
+                (data.origin_url_3, tool2["id"]),
+            ]
+        )
+
+        def row_key(row):
+            return (row.id, row.tool["id"])
+
+        result = storage.origin_intrinsic_metadata_stream()
+        assert result.next_page_token is None
+        assert list(map(row_key, result.results)) == expected_keys
+        assert result.results[-1] == OriginIntrinsicMetadataRow(
+            id=data.origin_url_3,
+            metadata={"@context": "foo"},
+            mappings=["pkg-info"],
+            tool=tool2,
+            from_directory=data.directory_id_3,
+        )
+
+        for limit in (1, 2, 3):
+            actual_keys: List[Tuple[str, int]] = []
+            next_page_token = None
+            while True:
+                result = storage.origin_intrinsic_metadata_stream(
+                    page_token=next_page_token, limit=limit
+                )
+                assert len(result.results) <= limit
+                actual_keys.extend(map(row_key, result.results))
+                next_page_token = result.next_page_token
+                if next_page_token is None:
+                    break
+            assert actual_keys == expected_keys
+
+        result = storage.origin_intrinsic_metadata_stream(tool_ids=[tool1["id"]])
+        assert list(map(row_key, result.results)) == [(data.origin_url_1, tool1["id"])]
+
+        with pytest.raises(IndexerStorageArgumentException):
+            storage.origin_intrinsic_metadata_stream(page_token=data.origin_url_1)
+
     def test_origin_intrinsic_metadata_stats(
         self, swh_indexer_storage_with_data: Tuple[IndexerStorageInterface, Any]
     ) -> None:
@@ -1491,17 +1859,80 @@ class TestIndexerStorageOriginIntrinsicMetadata:
         result = storage.origin_intrinsic_metadata_stats()
         assert result == {
             "per_mapping": {
-                "cff": 0,
                 "gemspec": 1,
                 "npm": 2,
                 "pkg-info": 1,
-                "codemeta": 0,
-                "maven": 0,
             },
             "total": 3,
             "non_empty": 2,
         }
 
+        # mappings are not limited to a predefined list
+        storage.origin_intrinsic_metadata_add(
+            [
+                OriginIntrinsicMetadataRow(
+                    id="https://example.org/composer",
+                    metadata={"name": "foo/bar"},
+                    mappings=["composer", "npm"],
+                    indexer_configuration_id=data.tools["swh-metadata-detector"]["id"],
+                    from_directory=data.directory_id_1,
+                )
+            ]
+        )
+        result = storage.origin_intrinsic_metadata_stats()
+        assert result == {
+            "per_mapping": {
+                "composer": 1,
+                "gemspec": 1,
+                "npm": 3,
+                "pkg-info": 1,
+            },
+            "total": 4,
+            "non_empty": 3,
+        }
+
+    def test_origin_intrinsic_metadata_stats_update(
+        self, swh_indexer_storage_with_data: Tuple[IndexerStorageInterface, Any]
+    ) -> None:
+        storage, data = swh_indexer_storage_with_data
+        self._fill_origin_intrinsic_metadata(swh_indexer_storage_with_data)
+        tool2_id = data.tools["swh-metadata-detector2"]["id"]
+
+        # overwrite origin 2 (npm + gemspec, non-empty) with an empty row
+        # using a single mapping, and origin 3 (pkg-info, empty) with itself
+        storage.origin_intrinsic_metadata_add(
+            [
+                OriginIntrinsicMetadataRow(
+                    id=data.origin_url_2,
+                    metadata={"@context": "foo"},
+                    mappings=["gemspec"],
+                    indexer_configuration_id=tool2_id,
+                    from_directory=data.directory_id_2,
+                ),
+                OriginIntrinsicMetadataRow(
+                    id=data.origin_url_3,
+                    metadata={"@context": "foo"},
+                    mappings=["pkg-info"],
+                    indexer_configuration_id=tool2_id,
+                    from_directory=data.directory_id_3,
+                ),
+            ]
+        )
+
+        expected = {
+            "per_mapping": {
+                "gemspec": 1,
+                "npm": 1,
+                "pkg-info": 1,
+            },
+            "total": 3,
+            "non_empty": 1,
+        }
+        assert storage.origin_intrinsic_metadata_stats() == expected
+
+        storage.origin_intrinsic_metadata_stats_rebuild()
+        assert storage.origin_intrinsic_metadata_stats() == expected
+
 
 class TestIndexerStorageOriginExtrinsicMetadata:
     def test_origin_extrinsic_metadata_add(
@@ -1753,6 +2184,141 @@ class TestIndexerStorageOriginExtrinsicMetadata:
         with pytest.raises(DuplicateId):
             storage.origin_extrinsic_metadata_add([metadata_origin, metadata_origin])
 
+    def test_origin_extrinsic_metadata_stream(
+        self, swh_indexer_storage_with_data: Tuple[IndexerStorageInterface, Any]
+    ) -> None:
+        storage, data = swh_indexer_storage_with_data
+        tool = data.tools["swh-metadata-detector"]
+
+        rows = [
+            OriginExtrinsicMetadataRow(
+                id=url,
+                metadata={"name": url},
+                indexer_configuration_id=tool["id"],
+                from_remd_id=b"\x02" * 20,
+                mappings=["github"],
+            )
+            for url in (data.origin_url_3, data.origin_url_1, data.origin_url_2)
+        ]
+        storage.origin_extrinsic_metadata_add(rows)
+
+        result = storage.origin_extrinsic_metadata_stream(limit=2)
+        assert [row.id for row in result.results] == [
+            data.origin_url_1,
+            data.origin_url_2,
+        ]
+        assert result.next_page_token is not None
+
+        result = storage.origin_extrinsic_metadata_stream(
+            page_token=result.next_page_token, limit=2
+        )
+        assert result == PagedResult(
+            results=[
+                OriginExtrinsicMetadataRow(
+                    id=data.origin_url_3,
+                    metadata={"name": data.origin_url_3},
+                    tool=tool,
+                    from_remd_id=b"\x02" * 20,
+                    mappings=["github"],
+                )
+            ],
+            next_page_token=None,
+        )
+
+    def test_origin_extrinsic_metadata_search_fulltext(
+        self, swh_indexer_storage_with_data: Tuple[IndexerStorageInterface, Any]
+    ) -> None:
+        storage, data = swh_indexer_storage_with_data
+        tool = data.tools["swh-metadata-detector"]
+
+        storage.origin_extrinsic_metadata_add(
+            [
+                OriginExtrinsicMetadataRow(
+                    id=url,
+                    metadata=metadata,
+                    indexer_configuration_id=tool["id"],
+                    from_remd_id=b"\x02" * 20,
+                    mappings=["github"],
+                )
+                for (url, metadata) in [
+                    (data.origin_url_1, {"author": "John Doe"}),
+                    (data.origin_url_2, {"name": "Doe", "author": "Jane Doe"}),
+                ]
+            ]
+        )
+
+        search = storage.origin_extrinsic_metadata_search_fulltext
+        assert [res.id for res in search(["Doe"])] == [
+            data.origin_url_2,
+            data.origin_url_1,
+        ]
+        assert search(["John"]) == [
+            OriginExtrinsicMetadataRow(
+                id=data.origin_url_1,
+                metadata={"author": "John Doe"},
+                tool=tool,
+                from_remd_id=b"\x02" * 20,
+                mappings=["github"],
+            )
+        ]
+        assert search(["John", "Jane"]) == []
+
+    def test_origin_extrinsic_metadata_stream_tool_ids(
+        self, swh_indexer_storage_with_data: Tuple[IndexerStorageInterface, Any]
+    ) -> None:
+        storage, data = swh_indexer_storage_with_data
+        tool1 = data.tools["swh-metadata-detector"]
+        tool2 = data.tools["swh-metadata-detector2"]
+
+        storage.origin_extrinsic_metadata_add(
+            [
+                OriginExtrinsicMetadataRow(
+                    id=url,
+                    metadata={"name": url},
+                    indexer_configuration_id=tool["id"],
+                    from_remd_id=b"\x02" * 20,
+                    mappings=["github"],
+                )
+                for url in (data.origin_url_1, data.origin_url_2)
+                for tool in (tool1, tool2)
+                if url == data.origin_url_1 or tool == tool2
+            ]
+        )
+
+        result = storage.origin_extrinsic_metadata_stream(tool_ids=[tool2["id"]])
+        assert [(row.id, row.tool) for row in result.results] == [
+            (data.origin_url_1, tool2),
+            (data.origin_url_2, tool2),
+        ]
+        assert result.next_page_token is None
+
+        # pages may end between two rows of the same origin
+        rows: List[Tuple[str, Any]] = []
+        next_page_token = None
+        while True:
+            result = storage.origin_extrinsic_metadata_stream(
+                page_token=next_page_token, limit=1
+            )
+            rows.extend((row.id, row.tool) for row in result.results)
+            next_page_token = result.next_page_token
+            if next_page_token is None:
+                break
+        assert sorted(rows, key=lambda row: (row[0], row[1]["id"])) == rows
+        assert len(rows) == 3
+
+    @pytest.mark.parametrize(
+        "page_token", ["", "not-a-tool-id file:///dev/0/zero", "42"]
+    )
+    def test_origin_extrinsic_metadata_stream_invalid_page_token(
+        self,
+        swh_indexer_storage_with_data: Tuple[IndexerStorageInterface, Any],
+        page_token: str,
+    ) -> None:
+        storage, data = swh_indexer_storage_with_data
+
+        with pytest.raises(IndexerStorageArgumentException):
+            storage.origin_extrinsic_metadata_stream(page_token=page_token)
+
 
 class TestIndexerStorageIndexerConfiguration:
     def test_indexer_configuration_add(
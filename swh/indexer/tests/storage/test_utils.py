@@ -0,0 +1,67 @@
+# Copyright (C) 2026  The Software Heritage developers
+# See the AUTHORS file at the top-level directory of this distribution
+# License: GNU General Public License version 3, or any later version
+# See top-level LICENSE file for more information
+
+import hashlib
+import random
+
+import pytest
+
+from swh.indexer.storage.utils import LRUCache, SortedMapping
+
+
+def test_lru_cache_ttl(mocker) -> None:
+    monotonic = mocker.patch("swh.indexer.storage.utils.time.monotonic")
+    monotonic.return_value = 100.0
+    cache: LRUCache[str, int] = LRUCache(maxsize=10, ttl=60)
+    cache.put("a", 1)
+
+    monotonic.return_value = 160.0
+    assert cache.get("a") == 1
+
+    monotonic.return_value = 160.1
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_lru_cache_disabled() -> None:
+    cache: LRUCache[str, int] = LRUCache(maxsize=0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+
+
+def test_lru_cache_pop() -> None:
+    cache: LRUCache[str, int] = LRUCache(maxsize=10)
+    cache.put("a", 1)
+    generation = cache.generation
+    cache.pop("a")
+    cache.pop("b")
+    assert cache.get("a") is None
+    cache.put("a", 2, generation=generation)  # outdated, ignored
+    assert cache.get("a") is None
+
+
+@pytest.mark.parametrize("key_size", [None, 20])
+def test_sorted_mapping(key_size) -> None:
+    """Compares a SortedMapping with a dict, while it merges new keys several
+    times"""
+    mapping: SortedMapping[bytes, int] = SortedMapping(key_size=key_size)
+    expected = {}
+    rng = random.Random(42)
+    for i in range(5000):
+        key = hashlib.sha1(str(rng.randrange(3000)).encode()).digest()
+        mapping[key] = i
+        expected[key] = i
+        if i % 1000 == 0:
+            start = min(expected)
+            assert list(mapping.iter_from(start)) == sorted(expected.items())
+
+    assert len(mapping) == len(expected)
+    assert all(mapping.get(key) == value for (key, value) in expected.items())
+    assert list(mapping) == sorted(expected)
+    start = sorted(expected)[len(expected) // 2]
+    assert list(mapping.iter_from(start)) == [
+        (key, value) for (key, value) in sorted(expected.items()) if key >= start
+    ]
+    assert list(mapping.iter_from(b"\xff" * 20)) == []
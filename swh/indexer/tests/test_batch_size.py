@@ -0,0 +1,76 @@
+# Copyright (C) 2026  The Software Heritage developers
+# See the AUTHORS file at the top-level directory of this distribution
+# License: GNU General Public License version 3, or any later version
+# See top-level LICENSE file for more information
+
+import pytest
+
+from swh.indexer.batch_size import BATCH_SIZE_METRIC, AdaptiveBatchSize, current_memory
+from swh.indexer.metadata import fetch_in_batches
+
+
+def test_adaptive_batch_size_bounds():
+    batch_size = AdaptiveBatchSize("test", initial=1000, min_size=10, max_size=100)
+    assert batch_size.size == 100
+    assert batch_size.increment == 100
+
+    for _ in range(10):
+        batch_size.update(nb_objects=batch_size.size, duration=100.0)
+    assert batch_size.size == 10
+
+    batch_size.update(nb_objects=10, duration=1.0)
+    assert batch_size.size == 100
+
+    with pytest.raises(ValueError, match="bounds"):
+        AdaptiveBatchSize("test", initial=10, min_size=10, max_size=5)
+    with pytest.raises(ValueError, match="factor"):
+        AdaptiveBatchSize("test", initial=10, decrease_factor=1)
+
+
+def test_adaptive_batch_size_memory(mocker):
+    gauge = mocker.patch("swh.indexer.batch_size.statsd.gauge")
+    batch_size = AdaptiveBatchSize("test", initial=100, max_memory=1000)
+
+    assert batch_size.update(nb_objects=100, duration=1.0, memory=1000) == 110
+    assert batch_size.update(nb_objects=100, duration=1.0, memory=1001) == 55
+
+    assert gauge.call_args_list == [
+        mocker.call(BATCH_SIZE_METRIC, 110, tags={"name": "test"}),
+        mocker.call(BATCH_SIZE_METRIC, 55, tags={"name": "test"}),
+    ]
+
+
+def test_adaptive_batch_size_measure(mocker):
+    monotonic = mocker.patch("swh.indexer.batch_size.time.monotonic")
+    batch_size = AdaptiveBatchSize("test", initial=100, target_duration=10)
+
+    monotonic.side_effect = [0.0, 11.0]
+    with batch_size.measure(nb_objects=100):
+        pass
+    assert batch_size.size == 50
+
+    monotonic.side_effect = [0.0, 1.0]
+    with pytest.raises(ValueError):
+        with batch_size.measure(nb_objects=50):
+            raise ValueError()
+    assert batch_size.size == 50  # failed batches are not measured
+
+    assert current_memory() is None or current_memory() > 0
+
+
+def test_fetch_in_batches_adaptive(mocker):
+    monotonic = mocker.patch("swh.indexer.batch_size.time.monotonic")
+    # start and end of each batch; the third one is slow
+    monotonic.side_effect = [0.0, 1.0, 0.0, 1.0, 0.0, 20.0, 0.0, 1.0, 0.0, 1.0]
+    batch_size = AdaptiveBatchSize("test", initial=2, target_duration=10, increment=2)
+    batches = []
+
+    def fetch(ids):
+        batches.append(ids)
+        return [id_ * 10 for id_ in ids]
+
+    assert list(fetch_in_batches(fetch, list(range(18)), batch_size)) == [
+        id_ * 10 for id_ in range(18)
+    ]
+    # grows while batches are fast, then halves after the slow one
+    assert [len(batch) for batch in batches] == [2, 4, 6, 3, 3]
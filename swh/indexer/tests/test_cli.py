@@ -4,6 +4,7 @@
 # See top-level LICENSE file for more information
 
 import datetime
+import json
 import re
 from typing import Any, Dict, List
 
@@ -11,9 +12,10 @@ import attr
 from click.testing import CliRunner
 from confluent_kafka import Consumer
 import pytest
+import yaml
 
 from swh.indexer import fossology_license
-from swh.indexer.cli import indexer_cli_group
+from swh.indexer.cli import indexer_cli_group, list_origins_by_producer
 from swh.indexer.storage.interface import IndexerStorageInterface
 from swh.indexer.storage.model import (
     ContentLicenseRow,
@@ -155,6 +157,215 @@ def now():
     return datetime.datetime.now(tz=datetime.timezone.utc)
 
 
+def test_list_origins_by_producer(idx_storage):
+    tool_ids = fill_idx_storage(idx_storage, 100)
+
+    assert list(list_origins_by_producer(idx_storage, [], [], page_size=7)) == [
+        "file://dev/%04d" % origin_id for origin_id in range(100)
+    ]
+    assert list(
+        list_origins_by_producer(
+            idx_storage, ["mapping1", "mapping4"], [tool_ids[1]], page_size=3
+        )
+    ) == ["file://dev/%04d" % origin_id for origin_id in range(1, 100, 10)]
+
+
+def test_cli_export_origin_intrinsic_metadata(
+    cli_runner, swh_config, idx_storage, tmp_path
+):
+    tool_ids = fill_idx_storage(idx_storage, 25)
+    output = tmp_path / "export.jsonl"
+
+    result = cli_runner.invoke(
+        indexer_cli_group,
+        [
+            "-C",
+            swh_config,
+            "export",
+            "origin_intrinsic_metadata",
+            "--page-size",
+            "10",
+            "--output",
+            str(output),
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.output
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [record["id"] for record in records] == [
+        "file://dev/%04d" % origin_id for origin_id in range(25)
+    ]
+    assert records[3] == {
+        "id": "file://dev/0003",
+        "metadata": {"name": "origin 3"},
+        "from_directory": "abcd000000000000000000000000000000000003",
+        "mappings": ["mapping3"],
+        "tool_id": tool_ids[1],
+        "tool_name": "tool 1",
+        "tool_version": "0.0.1",
+        "tool_configuration": {},
+    }
+
+    result = cli_runner.invoke(
+        indexer_cli_group,
+        [
+            "-C",
+            swh_config,
+            "export",
+            "origin_intrinsic_metadata",
+            "--tool-id",
+            str(tool_ids[0]),
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.output
+    records = [json.loads(line) for line in result.output.splitlines()]
+    assert [record["id"] for record in records] == [
+        "file://dev/%04d" % origin_id for origin_id in range(0, 25, 2)
+    ]
+
+
+def test_cli_export_directory_intrinsic_metadata(
+    cli_runner, swh_config, idx_storage, tmp_path
+):
+    tool_ids = fill_idx_storage(idx_storage, 25)
+
+    result = cli_runner.invoke(
+        indexer_cli_group,
+        ["-C", swh_config, "export", "directory_intrinsic_metadata"],
+    )
+    assert result.exit_code != 0
+    assert "--tool-id is mandatory" in result.output
+
+    result = cli_runner.invoke(
+        indexer_cli_group,
+        [
+            "-C",
+            swh_config,
+            "export",
+            "directory_intrinsic_metadata",
+            "--tool-id",
+            str(tool_ids[0]),
+            "--tool-id",
+            str(tool_ids[1]),
+            "--page-size",
+            "4",
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.output
+    records = [json.loads(line) for line in result.output.splitlines()]
+    assert [record["id"] for record in records] == [
+        "abcd{:0>36}".format(origin_id)
+        for origin_id in list(range(0, 25, 2)) + list(range(1, 25, 2))
+    ]
+
+
+def test_cli_export_parquet(cli_runner, swh_config, idx_storage, tmp_path):
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+    fill_idx_storage(idx_storage, 25)
+    output = tmp_path / "export.parquet"
+
+    result = cli_runner.invoke(
+        indexer_cli_group,
+        [
+            "-C",
+            swh_config,
+            "export",
+            "origin_intrinsic_metadata",
+            "--page-size",
+            "10",
+            "--format",
+            "parquet",
+            "--output",
+            str(output),
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.output
+
+    table = pyarrow_parquet.read_table(output)
+    assert table.num_rows == 25
+    assert table.column("id").to_pylist() == [
+        "file://dev/%04d" % origin_id for origin_id in range(25)
+    ]
+    assert json.loads(table.column("metadata")[3].as_py()) == {"name": "origin 3"}
+
+
+def test_cli_export_parquet_empty_first_page(
+    cli_runner, swh_config, idx_storage, tmp_path
+):
+    """Columns that are empty in the first rows must not make later rows fail"""
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+    (tool,) = idx_storage.indexer_configuration_add(
+        [{"tool_name": "tool", "tool_version": "0.0.1", "tool_configuration": {}}]
+    )
+    idx_storage.origin_intrinsic_metadata_add(
+        [
+            OriginIntrinsicMetadataRow(
+                id="file://dev/%04d" % origin_id,
+                from_directory=hash_to_bytes("abcd{:0>36}".format(origin_id)),
+                indexer_configuration_id=tool["id"],
+                metadata={},
+                mappings=[] if origin_id < 10 else ["npm"],
+            )
+            for origin_id in range(20)
+        ]
+    )
+    output = tmp_path / "export.parquet"
+
+    result = cli_runner.invoke(
+        indexer_cli_group,
+        [
+            "-C",
+            swh_config,
+            "export",
+            "origin_intrinsic_metadata",
+            "--page-size",
+            "5",
+            "--format",
+            "parquet",
+            "--output",
+            str(output),
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.output
+
+    table = pyarrow_parquet.read_table(output)
+    assert table.column("mappings").to_pylist() == [[]] * 10 + [["npm"]] * 10
+
+
+def test_cli_stats_rebuild(cli_runner, swh_config, idx_storage):
+    fill_idx_storage(idx_storage, 25)
+    expected = idx_storage.origin_intrinsic_metadata_stats()
+    assert expected["total"] == expected["non_empty"] == 25
+
+    db = idx_storage.get_db()
+    try:
+        with db.transaction() as cur:
+            cur.execute("DELETE FROM origin_intrinsic_metadata_counter")
+    finally:
+        idx_storage.put_db(db)
+    assert idx_storage.origin_intrinsic_metadata_stats()["total"] == 0
+
+    result = cli_runner.invoke(
+        indexer_cli_group,
+        ["-C", swh_config, "stats", "rebuild"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.output
+
+    result = cli_runner.invoke(
+        indexer_cli_group,
+        ["-C", swh_config, "stats", "show"],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0, result.output
+    assert json.loads(result.output) == expected
+
+
 def test_cli_journal_client_without_brokers(
     cli_runner, swh_config, kafka_prefix: str, kafka_server, consumer: Consumer
 ):
@@ -380,6 +591,7 @@ def test_cli_journal_client_index__origin_extrinsic_metadata(
     assert sorted(results, key=lambda r: r.id) == expected_results
 
 
+@pytest.mark.parametrize("buffered", [False, True])
 def test_cli_journal_client_index__content_mimetype(
     cli_runner,
     swh_config,
@@ -391,8 +603,19 @@ def test_cli_journal_client_index__content_mimetype(
     storage,
     mocker,
     swh_indexer_config,
+    buffered,
 ):
     """Test the 'swh indexer journal-client' cli tool."""
+    if buffered:
+        # rows are only written by the flush before offsets are committed
+        swh_indexer_config["indexer_storage"] = {
+            "cls": "buffer",
+            "max_age": None,
+            "storage": swh_indexer_config["indexer_storage"],
+        }
+        with open(swh_config, "w") as f:
+            yaml.dump(swh_indexer_config, f)
+
     journal_writer = get_journal_writer(
         "kafka",
         brokers=[kafka_server],
@@ -464,6 +687,90 @@ def test_cli_journal_client_index__content_mimetype(
         assert result in expected_results
 
 
+@pytest.mark.parametrize("adaptive_batch_size", [False, True])
+def test_cli_journal_client_dispatch(
+    cli_runner,
+    swh_config,
+    kafka_prefix: str,
+    kafka_server,
+    consumer: Consumer,
+    idx_storage,
+    mocker,
+    swh_indexer_config,
+    adaptive_batch_size,
+):
+    """Each indexer only gets the objects of the types it processes, and is not
+    run on batches without any"""
+    if adaptive_batch_size:
+        swh_indexer_config["adaptive_batch_size"] = {
+            "journal_client": {"min_size": 2, "max_size": 5}
+        }
+        with open(swh_config, "w") as f:
+            yaml.dump(swh_indexer_config, f)
+    gauge = mocker.patch("swh.indexer.batch_size.statsd.gauge")
+    journal_writer = get_journal_writer(
+        "kafka",
+        brokers=[kafka_server],
+        prefix=kafka_prefix,
+        client_id="test producer",
+        value_sanitizer=lambda object_type, value: value,
+        flush_timeout=3,  # fail early if something is going wrong
+    )
+    contents = [Content.from_data(raw_content) for _, raw_content, _, _ in RAW_CONTENTS]
+    origins = [Origin(url="file:///dev/zero")]
+    journal_writer.write_additions("content", contents)
+    journal_writer.write_additions("origin", origins)
+
+    mimetype_process = mocker.patch(
+        "swh.indexer.mimetype.MimetypeIndexer.process_journal_objects",
+        return_value={},
+    )
+    origin_process = mocker.patch(
+        "swh.indexer.metadata.OriginMetadataIndexer.process_journal_objects",
+        return_value={},
+    )
+
+    result = cli_runner.invoke(
+        indexer_cli_group,
+        [
+            "-C",
+            swh_config,
+            "journal-client",
+            "content_mimetype",
+            "origin_intrinsic_metadata",
+            "--broker",
+            kafka_server,
+            "--prefix",
+            kafka_prefix,
+            "--group-id",
+            "test-consumer",
+            "--stop-after-objects",
+            len(contents) + len(origins),
+        ],
+        catch_exceptions=False,
+    )
+
+    assert result.exit_code == 0, result.output
+    mimetype_objects = [call[0][0] for call in mimetype_process.call_args_list]
+    assert all(objects.keys() == {"content"} for objects in mimetype_objects)
+    assert sum(len(objects.get("content", [])) for objects in mimetype_objects) == len(
+        contents
+    )
+    origin_objects = [call[0][0] for call in origin_process.call_args_list]
+    assert all(objects.keys() == {"origin"} for objects in origin_objects)
+    assert sum(len(objects.get("origin", [])) for objects in origin_objects) == len(
+        origins
+    )
+
+    if adaptive_batch_size:
+        # batches are at most of max_size objects
+        assert gauge.call_args_list
+        assert {call[0][1] for call in gauge.call_args_list} <= {2, 3, 4, 5}
+        assert all(len(objects["content"]) <= 5 for objects in mimetype_objects)
+    else:
+        gauge.assert_not_called()
+
+
 def test_cli_journal_client_index__fossology_license(
     cli_runner,
     swh_config,
@@ -189,3 +189,20 @@ def test_indexers_define_object_types(swh_config):
             f"Indexer class {indexer_class} should declare a non-empty"
             " `object_types` class attribute"
         )
+
+
+@pytest.mark.parametrize(
+    "indexer_class,objects",
+    [
+        (CrashingContentIndexer, {"content": []}),
+        (CrashingDirectoryIndexer, {"directory": []}),
+        (CrashingOriginIndexer, {"origin": []}),
+    ],
+)
+def test_indexer_persist_no_results(indexer_class, objects, mocker):
+    """Indexers do not call persist_index_computations without results"""
+    indexer = indexer_class(config=BASE_TEST_CONFIG)
+    persist = mocker.spy(indexer, "persist_index_computations")
+
+    assert indexer.process_journal_objects(objects) == {"status": "uneventful"}
+    persist.assert_not_called()
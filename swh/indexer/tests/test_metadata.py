@@ -338,7 +338,7 @@ class TestMetadata:
 
         assert metadata_indexer.process_journal_objects(
             {"raw_extrinsic_metadata": [DEPOSIT_REMD.to_dict()]}
-        ) == {"status": "uneventful", "origin_extrinsic_metadata:add": 0}
+        ) == {"status": "uneventful"}
 
         assert metadata_indexer.storage.method_calls == [
             call.origin_get_by_sha1(
@@ -385,7 +385,7 @@ class TestMetadata:
                     ).to_dict(),
                 ]
             }
-        ) == {"status": "uneventful", "origin_extrinsic_metadata:add": 0}
+        ) == {"status": "uneventful"}
 
         assert metadata_indexer.storage.method_calls == [
             call.origin_get_by_sha1([hashlib.sha1(origin.encode()).digest()])
@@ -9,6 +9,7 @@ from unittest.mock import patch
 import attr
 import pytest
 
+from swh.indexer.batch_size import BATCH_SIZE_METRIC, AdaptiveBatchSize
 from swh.indexer.metadata import OriginMetadataIndexer
 from swh.indexer.storage.interface import IndexerStorageInterface
 from swh.indexer.storage.model import (
@@ -115,6 +116,26 @@ def test_origin_metadata_indexer_revision(
     assert orig_results == [origin_metadata]
 
 
+def test_origin_metadata_indexer_adaptive_batch_size(
+    swh_indexer_config,
+    idx_storage: IndexerStorageInterface,
+    storage: StorageInterface,
+    obj_storage,
+    mocker,
+) -> None:
+    gauge = mocker.patch("swh.indexer.batch_size.statsd.gauge")
+    swh_indexer_config["adaptive_batch_size"] = {"revision": {"max_size": 10}}
+    indexer = OriginMetadataIndexer(config=swh_indexer_config)
+    assert isinstance(indexer.batch_size["revision"], AdaptiveBatchSize)
+    assert indexer.batch_size["release"] == 20
+
+    origin = "https://github.com/librariesio/yarn-parser"
+    indexer.run([origin])
+
+    assert len(idx_storage.origin_intrinsic_metadata_get([origin])) == 1
+    gauge.assert_called_once_with(BATCH_SIZE_METRIC, 10, tags={"name": "revision"})
+
+
 def test_origin_metadata_indexer_duplicate_origin(
     swh_indexer_config,
     idx_storage: IndexerStorageInterface,